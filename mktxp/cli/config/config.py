@@ -147,6 +147,8 @@ class MKTXPConfigKeys:
     FE_ROUTING_STATS_KEY = 'routing_stats'
     FE_CUSTOM_LABELS_KEY = 'custom_labels'
     FE_MODULE_ONLY_KEY = 'module_only'
+    FE_COLLECTOR_REFRESH_INTERVALS = 'collector_refresh_intervals'
+    FE_CONNECTION_STATS_TOP_K_KEY = 'connection_stats_top_k'
 
     MKTXP_SOCKET_TIMEOUT = 'socket_timeout'
     MKTXP_INITIAL_DELAY = 'initial_delay_on_failure'
@@ -169,6 +171,16 @@ class MKTXPConfigKeys:
     MKTXP_PROBE_CONNECTION_POOL = 'probe_connection_pool'
     MKTXP_PROBE_CONNECTION_POOL_TTL = 'probe_connection_pool_ttl'
     MKTXP_PROBE_CONNECTION_POOL_MAX_SIZE = 'probe_connection_pool_max_size'
+    MKTXP_BACKGROUND_COLLECTION = 'background_collection'
+    MKTXP_BACKGROUND_COLLECTION_INTERVAL = 'background_collection_interval'
+    MKTXP_ASYNCIO_API_TRANSPORT = 'asyncio_api_transport'
+    MKTXP_PIPELINED_API_REQUESTS = 'pipelined_api_requests'
+    MKTXP_SLOW_COLLECTORS_INTERVAL = 'slow_collectors_interval'
+    MKTXP_STATIC_COLLECTORS_INTERVAL = 'static_collectors_interval'
+    MKTXP_ROUTER_FACTS_TTL = 'router_facts_ttl'
+    MKTXP_FIREWALL_RULES_METADATA_TTL = 'firewall_rules_metadata_ttl'
+    MKTXP_DIRECT_EXPOSITION_ENCODER = 'direct_exposition_encoder'
+    MKTXP_SCRAPE_RESPONSE_CACHE = 'scrape_response_cache'
 
     # UnRegistered entries placeholder
     NO_ENTRIES_REGISTERED = 'NoEntriesRegistered'
@@ -199,6 +211,8 @@ class MKTXPConfigKeys:
     DEFAULT_FE_IPV6_ADDRESS_LIST_KEY = 'None'
     DEFAULT_FE_CUSTOM_LABELS_KEY = 'None'
     DEFAULT_FE_INTERFACE_NAME_FORMAT = 'name'
+    DEFAULT_FE_COLLECTOR_REFRESH_INTERVALS = 'None'
+    DEFAULT_FE_CONNECTION_STATS_TOP_K_KEY = 0
 
     DEFAULT_MKTXP_PORT = 49090
     DEFAULT_MKTXP_SOCKET_TIMEOUT = 2
@@ -214,6 +228,11 @@ class MKTXPConfigKeys:
     DEFAULT_MKTXP_HTTP_SERVER_THREADS = 16
     DEFAULT_MKTXP_PROBE_CONNECTION_POOL_TTL = 300
     DEFAULT_MKTXP_PROBE_CONNECTION_POOL_MAX_SIZE = 128
+    DEFAULT_MKTXP_BACKGROUND_COLLECTION_INTERVAL = 30
+    DEFAULT_MKTXP_SLOW_COLLECTORS_INTERVAL = 0
+    DEFAULT_MKTXP_STATIC_COLLECTORS_INTERVAL = 0
+    DEFAULT_MKTXP_ROUTER_FACTS_TTL = 3600
+    DEFAULT_MKTXP_FIREWALL_RULES_METADATA_TTL = 300
 
 
     BOOLEAN_KEYS_NO = {ENABLED_KEY, SSL_KEY, NO_SSL_CERTIFICATE, FE_CHECK_FOR_UPDATES, FE_KID_CONTROL_DEVICE, FE_KID_CONTROL_DYNAMIC, FE_WG_PEER_KEY,
@@ -228,16 +247,21 @@ class MKTXPConfigKeys:
 
     SYSTEM_BOOLEAN_KEYS_YES = {MKTXP_PERSISTENT_ROUTER_CONNECTION_POOL, MKTXP_PERSISTENT_DHCP_CACHE}
     SYSTEM_BOOLEAN_KEYS_NO = {MKTXP_BANDWIDTH_KEY, MKTXP_VERBOSE_MODE, MKTXP_FETCH_IN_PARALLEL, MKTXP_COMPACT_CONFIG, MKTXP_PROMETHEUS_HEADERS_DEDUPLICATION,
-                              MKTXP_PROBE_CONNECTION_POOL}
+                              MKTXP_PROBE_CONNECTION_POOL, MKTXP_BACKGROUND_COLLECTION, MKTXP_ASYNCIO_API_TRANSPORT, MKTXP_PIPELINED_API_REQUESTS, MKTXP_DIRECT_EXPOSITION_ENCODER, MKTXP_SCRAPE_RESPONSE_CACHE}
 
-    STR_KEYS = (HOST_KEY, USER_KEY, PASSWD_KEY, CREDENTIALS_FILE_KEY, SSL_CA_FILE, FE_REMOTE_DHCP_ENTRY, FE_REMOTE_CAPSMAN_ENTRY, FE_ADDRESS_LIST_KEY, FE_IPV6_ADDRESS_LIST_KEY, FE_CUSTOM_LABELS_KEY, FE_INTERFACE_NAME_FORMAT)
+    STR_KEYS = (HOST_KEY, USER_KEY, PASSWD_KEY, CREDENTIALS_FILE_KEY, SSL_CA_FILE, FE_REMOTE_DHCP_ENTRY, FE_REMOTE_CAPSMAN_ENTRY, FE_ADDRESS_LIST_KEY, FE_IPV6_ADDRESS_LIST_KEY, FE_CUSTOM_LABELS_KEY, FE_INTERFACE_NAME_FORMAT, FE_COLLECTOR_REFRESH_INTERVALS)
     MKTXP_STR_KEYS = (MKTXP_BANDWIDTH_TEST_DNS_SERVER,)
-    INT_KEYS =  ()
+    INT_KEYS =  (FE_CONNECTION_STATS_TOP_K_KEY,)
     MKTXP_INT_KEYS = (PORT_KEY, MKTXP_SOCKET_TIMEOUT, MKTXP_INITIAL_DELAY, MKTXP_MAX_DELAY,
                       MKTXP_INC_DIV, MKTXP_BANDWIDTH_TEST_INTERVAL, MKTXP_MIN_COLLECT_INTERVAL,
                       MKTXP_MAX_WORKER_THREADS, MKTXP_MAX_SCRAPE_DURATION, MKTXP_TOTAL_MAX_SCRAPE_DURATION,
                       MKTXP_PROBE_CONNECTION_POOL_TTL, MKTXP_PROBE_CONNECTION_POOL_MAX_SIZE,
-                      MKTXP_HTTP_SERVER_THREADS)
+                      MKTXP_HTTP_SERVER_THREADS,
+                      MKTXP_BACKGROUND_COLLECTION_INTERVAL,
+                      MKTXP_SLOW_COLLECTORS_INTERVAL,
+                      MKTXP_STATIC_COLLECTORS_INTERVAL,
+                      MKTXP_ROUTER_FACTS_TTL,
+                      MKTXP_FIREWALL_RULES_METADATA_TTL)
 
     # MKTXP configs entry names
     DEFAULT_ENTRY_KEY = 'default'
@@ -260,7 +284,7 @@ class ConfigEntry:
                                                        MKTXPConfigKeys.FE_KID_CONTROL_DEVICE, MKTXPConfigKeys.FE_KID_CONTROL_DYNAMIC, MKTXPConfigKeys.FE_EOIP_KEY, MKTXPConfigKeys.FE_GRE_KEY, MKTXPConfigKeys.FE_IPIP_KEY, MKTXPConfigKeys.FE_LTE_KEY, MKTXPConfigKeys.FE_IPSEC_KEY, MKTXPConfigKeys.FE_SWITCH_PORT_KEY,
                                                        MKTXPConfigKeys.FE_ROUTING_STATS_KEY, MKTXPConfigKeys.FE_CERTIFICATE_KEY, MKTXPConfigKeys.FE_CONTAINER_KEY,
                                                        MKTXPConfigKeys.FE_BRIDGE_VLAN_KEY,
-                                                       MKTXPConfigKeys.FE_CUSTOM_LABELS_KEY, MKTXPConfigKeys.FE_MODULE_ONLY_KEY, MKTXPConfigKeys.FE_INTERFACE_WITH_DEFAULT_NAME
+                                                       MKTXPConfigKeys.FE_CUSTOM_LABELS_KEY, MKTXPConfigKeys.FE_MODULE_ONLY_KEY, MKTXPConfigKeys.FE_INTERFACE_WITH_DEFAULT_NAME, MKTXPConfigKeys.FE_COLLECTOR_REFRESH_INTERVALS, MKTXPConfigKeys.FE_CONNECTION_STATS_TOP_K_KEY
                                                        ])
     MKTXPSystemEntry = namedtuple('MKTXPSystemEntry', [MKTXPConfigKeys.PORT_KEY, MKTXPConfigKeys.LISTEN_KEY, MKTXPConfigKeys.MKTXP_SOCKET_TIMEOUT,
                                                        MKTXPConfigKeys.MKTXP_INITIAL_DELAY, MKTXPConfigKeys.MKTXP_MAX_DELAY,
@@ -273,7 +297,17 @@ class ConfigEntry:
                                                        MKTXPConfigKeys.MKTXP_PERSISTENT_DHCP_CACHE, MKTXPConfigKeys.MKTXP_BANDWIDTH_TEST_DNS_SERVER,
                                                        MKTXPConfigKeys.MKTXP_PROBE_CONNECTION_POOL, MKTXPConfigKeys.MKTXP_PROBE_CONNECTION_POOL_TTL,
                                                        MKTXPConfigKeys.MKTXP_PROBE_CONNECTION_POOL_MAX_SIZE,
-                                                       MKTXPConfigKeys.MKTXP_HTTP_SERVER_THREADS])
+                                                       MKTXPConfigKeys.MKTXP_HTTP_SERVER_THREADS,
+                                                       MKTXPConfigKeys.MKTXP_BACKGROUND_COLLECTION,
+                                                       MKTXPConfigKeys.MKTXP_BACKGROUND_COLLECTION_INTERVAL,
+                                                       MKTXPConfigKeys.MKTXP_ASYNCIO_API_TRANSPORT,
+                                                       MKTXPConfigKeys.MKTXP_PIPELINED_API_REQUESTS,
+                                                       MKTXPConfigKeys.MKTXP_SLOW_COLLECTORS_INTERVAL,
+                                                       MKTXPConfigKeys.MKTXP_STATIC_COLLECTORS_INTERVAL,
+                                                       MKTXPConfigKeys.MKTXP_ROUTER_FACTS_TTL,
+                                                       MKTXPConfigKeys.MKTXP_FIREWALL_RULES_METADATA_TTL,
+                                                       MKTXPConfigKeys.MKTXP_DIRECT_EXPOSITION_ENCODER,
+                                                       MKTXPConfigKeys.MKTXP_SCRAPE_RESPONSE_CACHE])
 
 
 class OSConfig(metaclass=ABCMeta):
@@ -361,7 +395,17 @@ mockSystemEntry = ConfigEntry.MKTXPSystemEntry(
             probe_connection_pool=False,
             probe_connection_pool_ttl=MKTXPConfigKeys.DEFAULT_MKTXP_PROBE_CONNECTION_POOL_TTL,
             probe_connection_pool_max_size=MKTXPConfigKeys.DEFAULT_MKTXP_PROBE_CONNECTION_POOL_MAX_SIZE,
-            http_server_threads=MKTXPConfigKeys.DEFAULT_MKTXP_HTTP_SERVER_THREADS
+            http_server_threads=MKTXPConfigKeys.DEFAULT_MKTXP_HTTP_SERVER_THREADS,
+            background_collection=False,
+            background_collection_interval=MKTXPConfigKeys.DEFAULT_MKTXP_BACKGROUND_COLLECTION_INTERVAL,
+            asyncio_api_transport=False,
+            pipelined_api_requests=False,
+            slow_collectors_interval=MKTXPConfigKeys.DEFAULT_MKTXP_SLOW_COLLECTORS_INTERVAL,
+            static_collectors_interval=MKTXPConfigKeys.DEFAULT_MKTXP_STATIC_COLLECTORS_INTERVAL,
+            router_facts_ttl=MKTXPConfigKeys.DEFAULT_MKTXP_ROUTER_FACTS_TTL,
+            firewall_rules_metadata_ttl=MKTXPConfigKeys.DEFAULT_MKTXP_FIREWALL_RULES_METADATA_TTL,
+            direct_exposition_encoder=False,
+            scrape_response_cache=False
         )
 
 class MKTXPConfigHandler:
@@ -736,6 +780,13 @@ class MKTXPConfigHandler:
             MKTXPConfigKeys.MKTXP_PROBE_CONNECTION_POOL_TTL: lambda _: MKTXPConfigKeys.DEFAULT_MKTXP_PROBE_CONNECTION_POOL_TTL,
             MKTXPConfigKeys.MKTXP_PROBE_CONNECTION_POOL_MAX_SIZE: lambda _: MKTXPConfigKeys.DEFAULT_MKTXP_PROBE_CONNECTION_POOL_MAX_SIZE,
             MKTXPConfigKeys.MKTXP_HTTP_SERVER_THREADS: lambda _: MKTXPConfigKeys.DEFAULT_MKTXP_HTTP_SERVER_THREADS,
+            MKTXPConfigKeys.MKTXP_BACKGROUND_COLLECTION_INTERVAL: lambda _: MKTXPConfigKeys.DEFAULT_MKTXP_BACKGROUND_COLLECTION_INTERVAL,
+            MKTXPConfigKeys.MKTXP_SLOW_COLLECTORS_INTERVAL: lambda _: MKTXPConfigKeys.DEFAULT_MKTXP_SLOW_COLLECTORS_INTERVAL,
+            MKTXPConfigKeys.MKTXP_STATIC_COLLECTORS_INTERVAL: lambda _: MKTXPConfigKeys.DEFAULT_MKTXP_STATIC_COLLECTORS_INTERVAL,
+            MKTXPConfigKeys.FE_COLLECTOR_REFRESH_INTERVALS: lambda _: MKTXPConfigKeys.DEFAULT_FE_COLLECTOR_REFRESH_INTERVALS,
+            MKTXPConfigKeys.MKTXP_ROUTER_FACTS_TTL: lambda _: MKTXPConfigKeys.DEFAULT_MKTXP_ROUTER_FACTS_TTL,
+            MKTXPConfigKeys.FE_CONNECTION_STATS_TOP_K_KEY: lambda _: MKTXPConfigKeys.DEFAULT_FE_CONNECTION_STATS_TOP_K_KEY,
+            MKTXPConfigKeys.MKTXP_FIREWALL_RULES_METADATA_TTL: lambda _: MKTXPConfigKeys.DEFAULT_MKTXP_FIREWALL_RULES_METADATA_TTL,
         }[key](value)
 
 
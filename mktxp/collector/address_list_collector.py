@@ -59,7 +59,8 @@ class AddressListCollector(BaseCollector):
                                                                 records, 'timeout', reduced_metric_labels)
 
         # Collect and yield address list counts
-        counts = AddressListMetricsDataSource.count_metric_records(router_entry, address_list_names, ip_version)
+        # the selected lists counts come from the entries fetched above
+        counts = AddressListMetricsDataSource.count_metric_records(router_entry, address_list_names, ip_version, list_records = records)
         if not counts:
             return
 
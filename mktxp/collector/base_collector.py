@@ -12,111 +12,227 @@
 ## GNU General Public License for more details.
 
 import itertools
-from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily, InfoMetricFamily
+from operator import itemgetter
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily, InfoMetricFamily, Metric
+from prometheus_client.samples import Sample
 from mktxp.cli.config.config import MKTXPConfigKeys, config_handler
+from mktxp.datasource.base_ds import RecordBatch
+
+
+class RecordSchema:
+    ''' Label values extraction for a metric family, compiled once per label set
+    '''
+    def __init__(self, metric_labels, custom_labels = ()):
+        self.metric_labels = list(metric_labels)
+        self.custom_labels = tuple(custom_labels)
+        self._record_values = RecordSchema._tuple_getter([label for label in self.metric_labels if label not in self.custom_labels])
+        self._custom_values = RecordSchema._tuple_getter(self.custom_labels) if self.custom_labels else None
+
+    def label_values(self, record):
+        try:
+            label_values = self._record_values(record)
+            if self._custom_values:
+                # record fields take precedence over the custom labels
+                if any(label in record for label in self.custom_labels):
+                    raise KeyError
+                label_values += self._custom_values(record[MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID])
+            return label_values
+        except (KeyError, TypeError):
+            # missing fields, falling back to the custom labels and then to empty values
+            custom_labels_dict = record.get(MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID) or {}
+            return tuple(record.get(label, custom_labels_dict.get(label, '')) for label in self.metric_labels)
+
+    def unique_records(self, router_records, verbose_reporting = False):
+        ''' Label values and records, de-duplicated by the label values in a single pass
+        '''
+        unique_records = {}
+        for record in router_records:
+            label_values = self.label_values(record)
+            if verbose_reporting and label_values in unique_records:
+                print(f"Warning: Duplicate metric record found for labels {dict(zip(self.metric_labels, label_values))}. Keeping last.")
+            unique_records[label_values] = record
+        return unique_records.items()
+
+    def unique_batch_values(self, batch, metric_key = None, verbose_reporting = False):
+        ''' Label values and metric values of a RecordBatch, straight from its columns
+        '''
+        custom_labels_dict = batch.constants.get(MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID) or {}
+        label_columns = []
+        for label in self.metric_labels:
+            column = batch.columns.get(label)
+            if column is None:
+                column = itertools.repeat(batch.constants.get(label, custom_labels_dict.get(label, '')), len(batch))
+            elif None in column:
+                column = [custom_labels_dict.get(label, '') if value is None else value for value in column]
+            label_columns.append(column)
+        metric_values = batch.columns.get(metric_key) if metric_key else None
+        if metric_values is None:
+            metric_values = itertools.repeat(batch.constants.get(metric_key, 0) if metric_key else None, len(batch))
+
+        unique_values = {}
+        for label_values, metric_value in zip(zip(*label_columns) if label_columns else itertools.repeat((), len(batch)), metric_values):
+            if verbose_reporting and label_values in unique_values:
+                print(f"Warning: Duplicate metric record found for labels {dict(zip(self.metric_labels, label_values))}. Keeping last.")
+            unique_values[label_values] = 0 if metric_value is None else metric_value
+        return unique_values.items()
+
+    @staticmethod
+    def _tuple_getter(labels):
+        if not labels:
+            return lambda record: ()
+        if len(labels) == 1:
+            getter = itemgetter(labels[0])
+            return lambda record: (getter(record),)
+        return itemgetter(*labels)
+
+
+class RowsMetricFamily:
+    ''' Metric family keeping its samples as (label values, value) rows, which the ExpositionEncoder writes out as is.
+        The samples are only built when asked for, e.g. by prometheus_client
+    '''
+    sample_suffix = ''
+
+    def __init__(self, *args, **kwargs):
+        self.rows = []
+        super().__init__(*args, **kwargs)
+
+    def add_row(self, label_values, value):
+        self.rows.append((label_values, value))
+
+    @property
+    def samples(self):
+        sample_name = f'{self.name}{self.sample_suffix}'
+        return self.extra_samples + [Sample(sample_name, dict(zip(self._labelnames, label_values)), value, None) for label_values, value in self.rows]
+    @samples.setter
+    def samples(self, samples):
+        self.extra_samples = samples
+
+class GaugeRowsFamily(RowsMetricFamily, GaugeMetricFamily):
+    pass
+
+class CounterRowsFamily(RowsMetricFamily, CounterMetricFamily):
+    sample_suffix = '_total'
+
+class InfoRowsFamily(RowsMetricFamily, InfoMetricFamily):
+    sample_suffix = '_info'
+
 
 class BaseCollector:
     """ Base Collector methods
         For use by custom collector
     """
-    @staticmethod
-    def _smart_tee(router_records):
-        # Check if it's already subscriptable (list/tuple)
-        if hasattr(router_records, '__getitem__'):
-            # It's subscriptable - safe to use multiple times
-            return router_records, router_records
-        else:
-            # It's not subscriptable - need to tee it
-            return itertools.tee(router_records)
+    # record schemas by (family name, metric labels, custom labels)
+    _record_schemas = {}
 
     @staticmethod
     def _de_duplicate_records(router_records, metric_labels, verbose_reporting = None):
-        unique_records = {}
         if verbose_reporting is None:
             verbose_reporting = config_handler.system_entry.verbose_mode
-
-        for record in router_records:
-            custom_labels_dict = record.get(MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID, {})
-            label_values_tuple = tuple(record.get(label, custom_labels_dict.get(label, '')) for label in metric_labels)
-
-            if label_values_tuple in unique_records:
-                if verbose_reporting:
-                    print(f"Warning: Duplicate metric record found for labels {dict(zip(metric_labels, label_values_tuple))}. Keeping last.")
-            unique_records[label_values_tuple] = record
-        return unique_records.values()
+        unique_records = RecordSchema(metric_labels).unique_records(router_records, verbose_reporting)
+        return [record for _, record in unique_records]
 
     @staticmethod
-    def info_collector(name: str, documentation: str, router_records, metric_labels=None, add_id_labels = True, add_custom_labels=True, verbose_reporting=None):
+    def _family_records(name, router_records, metric_labels, metric_key = None, add_id_labels = True, add_custom_labels = True, verbose_reporting = None):
+        ''' Family labels, and the de-duplicated (label values, metric value) pairs
+        '''
         metric_labels = metric_labels or []
-        router_records = router_records or []
+        if verbose_reporting is None:
+            verbose_reporting = config_handler.system_entry.verbose_mode
 
-        records_for_labels, records_for_processing = BaseCollector._smart_tee(router_records)
+        # only the first record is needed upfront, for the custom labels
+        family_labels = BaseCollector._add_id_labels(metric_labels) if add_id_labels else list(metric_labels)
+        batch = router_records if isinstance(router_records, RecordBatch) else None
+        if batch is not None:
+            if not batch:
+                return family_labels, ()
+            # the custom labels are batch constants
+            first_record = batch.constants
+        else:
+            router_records = iter(router_records or [])
+            first_record = next(router_records, None)
+            if first_record is None:
+                return family_labels, ()
+            router_records = itertools.chain((first_record,), router_records)
 
-        if add_id_labels:
-            metric_labels = BaseCollector._add_id_labels(metric_labels)
+        custom_labels = ()
         if add_custom_labels:
-            metric_labels = BaseCollector._add_custom_labels(metric_labels, records_for_labels)
-
-        collector = InfoMetricFamily(f'mktxp_{name}', documentation=documentation, labels=metric_labels)
-
-        deduplicated_records = BaseCollector._de_duplicate_records(records_for_processing, metric_labels, verbose_reporting)
-        for router_record in deduplicated_records:
-            label_values = {}
-            custom_labels_dict = router_record.get(MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID, {})
-            for label in metric_labels:
-                value = router_record.get(label, custom_labels_dict.get(label, ''))
-                label_values[label] = value
-            collector.add_metric(metric_labels, label_values)
+            extended_labels = BaseCollector._add_custom_labels(family_labels, (first_record,), metric_key)
+            custom_labels = tuple(extended_labels[len(family_labels):])
+            family_labels = extended_labels
+
+        schema_key = (name, tuple(family_labels), custom_labels)
+        schema = BaseCollector._record_schemas.get(schema_key)
+        if schema is None:
+            schema = BaseCollector._record_schemas[schema_key] = RecordSchema(family_labels, custom_labels)
+        if batch is not None:
+            return schema.metric_labels, schema.unique_batch_values(batch, metric_key, verbose_reporting)
+        unique_records = schema.unique_records(router_records, verbose_reporting)
+        return schema.metric_labels, ((label_values, router_record.get(metric_key, 0) if metric_key else None) for label_values, router_record in unique_records)
+
+    @staticmethod
+    def info_collector(name: str, documentation: str, router_records, metric_labels=None, add_id_labels = True, add_custom_labels=True, verbose_reporting=None):
+        metric_labels, family_records = BaseCollector._family_records(name, router_records, metric_labels, None, add_id_labels, add_custom_labels, verbose_reporting)
+
+        collector = InfoRowsFamily(f'mktxp_{name}', documentation=documentation, labels=metric_labels)
+        for label_values, _ in family_records:
+            collector.add_row(label_values, 1)
         return collector
 
     @staticmethod
     def counter_collector(name: str, documentation: str, router_records, metric_key, metric_labels=None, add_id_labels = True, add_custom_labels=True, verbose_reporting=None):
-        metric_labels = metric_labels or []
-        router_records = router_records or []
+        metric_labels, family_records = BaseCollector._family_records(name, router_records, metric_labels, metric_key, add_id_labels, add_custom_labels, verbose_reporting)
 
-        records_for_labels, records_for_processing = BaseCollector._smart_tee(router_records)
-
-        if add_id_labels:
-            metric_labels = BaseCollector._add_id_labels(metric_labels)
-        if add_custom_labels:
-            metric_labels = BaseCollector._add_custom_labels(metric_labels, records_for_labels, metric_key)
-
-        collector = CounterMetricFamily(f'mktxp_{name}', documentation=documentation, labels=metric_labels)
-
-        deduplicated_records = BaseCollector._de_duplicate_records(records_for_processing, metric_labels, verbose_reporting)
-        for router_record in deduplicated_records:
-            label_values = []
-            custom_labels_dict = router_record.get(MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID, {})
-            for label in metric_labels:
-                value = router_record.get(label, custom_labels_dict.get(label, ''))
-                label_values.append(value)
-            collector.add_metric(label_values, router_record.get(metric_key, 0))
+        collector = CounterRowsFamily(f'mktxp_{name}', documentation=documentation, labels=metric_labels)
+        for label_values, metric_value in family_records:
+            collector.add_row(label_values, metric_value)
         return collector
 
     @staticmethod
     def gauge_collector(name: str, documentation: str, router_records, metric_key, metric_labels = None, add_id_labels = True, add_custom_labels = True, verbose_reporting=None):
-        metric_labels = metric_labels or []
-        router_records = router_records or []
+        metric_labels, family_records = BaseCollector._family_records(name, router_records, metric_labels, metric_key, add_id_labels, add_custom_labels, verbose_reporting)
 
-        records_for_labels, records_for_processing = BaseCollector._smart_tee(router_records)
-
-        if add_id_labels:
-            metric_labels = BaseCollector._add_id_labels(metric_labels)
-        if add_custom_labels:
-            metric_labels = BaseCollector._add_custom_labels(metric_labels, records_for_labels, metric_key)
-
-        collector = GaugeMetricFamily(f'mktxp_{name}', documentation=documentation, labels=metric_labels)
-
-        deduplicated_records = BaseCollector._de_duplicate_records(records_for_processing, metric_labels, verbose_reporting)
-        for router_record in deduplicated_records:
-            label_values = []
-            custom_labels_dict = router_record.get(MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID, {})
-            for label in metric_labels:
-                value = router_record.get(label, custom_labels_dict.get(label, ''))
-                label_values.append(value)
-            collector.add_metric(label_values, router_record.get(metric_key, 0))
+        collector = GaugeRowsFamily(f'mktxp_{name}', documentation=documentation, labels=metric_labels)
+        for label_values, metric_value in family_records:
+            collector.add_row(label_values, metric_value)
         return collector
 
+    @staticmethod
+    def merged_families(metric_families):
+        ''' Merges same named metric families (e.g. of different routers) into one, in the order first seen,
+            so each family is exposed under a single HELP / TYPE header.
+            The source families are left untouched, as slow / static collectors replay them from cache
+        '''
+        families_by_name = {}
+        for metric_family in metric_families:
+            families_by_name.setdefault((metric_family.name, metric_family.type), []).append(metric_family)
+        return [families[0] if len(families) == 1 else BaseCollector._merged_family(families) for families in families_by_name.values()]
+
+    @staticmethod
+    def _merged_family(metric_families):
+        first_family = metric_families[0]
+        if not all(isinstance(metric_family, RowsMetricFamily) for metric_family in metric_families):
+            merged_family = Metric(first_family.name, first_family.documentation, first_family.type, first_family.unit)
+            for metric_family in metric_families:
+                merged_family.samples.extend(metric_family.samples)
+            return merged_family
+
+        # families of routers with different custom labels are merged over all of their labels,
+        # a missing label is exposed with an empty value (same as no label to Prometheus)
+        labels = list(first_family._labelnames)
+        for metric_family in metric_families[1:]:
+            labels.extend(label for label in metric_family._labelnames if label not in labels)
+
+        merged_family = type(first_family)(first_family.name, documentation = first_family.documentation, labels = labels)
+        for metric_family in metric_families:
+            if list(metric_family._labelnames) == labels:
+                merged_family.rows.extend(metric_family.rows)
+            else:
+                positions = [metric_family._labelnames.index(label) if label in metric_family._labelnames else None for label in labels]
+                merged_family.rows.extend((tuple('' if position is None else label_values[position] for position in positions), value)
+                                          for label_values, value in metric_family.rows)
+            merged_family.extra_samples.extend(metric_family.extra_samples)
+        return merged_family
+
     # Helpers
     @staticmethod
     def _add_custom_labels(metric_labels, router_records, metric_key = None):
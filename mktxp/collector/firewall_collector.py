@@ -81,14 +81,8 @@ class FirewallCollector(BaseCollector):
     # Helpers
     @staticmethod
     def metric_record(router_entry, firewall_record):
-        name = f"| {firewall_record.get('chain', ' ')} | {firewall_record.get('action', ' ')} | {firewall_record.get('comment', ' ')}"
+        name = firewall_record.get('name') or FirewallMetricsDataSource.rule_name(firewall_record)
         bytes = firewall_record.get('bytes', 0)
-        out_interface = firewall_record.get('out_interface')
-        protocol = firewall_record.get('protocol')
-        if out_interface:
-            name = f"{name} | {out_interface}"
-        if protocol:
-            name = f"{name} | {protocol}"
         return {MKTXPConfigKeys.ROUTERBOARD_NAME: router_entry.router_id[MKTXPConfigKeys.ROUTERBOARD_NAME],
                 MKTXPConfigKeys.ROUTERBOARD_ADDRESS: router_entry.router_id[MKTXPConfigKeys.ROUTERBOARD_ADDRESS],
                 'name': name, 'log': firewall_record['log'], 'bytes': bytes}
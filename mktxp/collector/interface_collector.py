@@ -36,6 +36,8 @@ class InterfaceCollector(BaseCollector):
             router_entry,
             metric_labels=interface_traffic_labels,
             translation_table=interface_traffic_translation_table,
+            numeric_labels=['disabled', 'rx_byte', 'tx_byte', 'rx_packet', 'tx_packet', 'rx_error', 'tx_error',
+                            'rx_drop', 'tx_drop', 'link_downs', 'running', 'actual_mtu'],
         )
 
         if not interface_traffic_records:
@@ -24,7 +24,8 @@ class QueueTreeCollector(BaseCollector):
             return
 
         qt_labels = ['name', 'parent', 'packet_mark', 'limit_at', 'max_limit', 'priority', 'bytes', 'queued_bytes', 'dropped', 'rate', 'disabled']
-        qt_records = QueueMetricsDataSource.metric_records(router_entry, metric_labels=qt_labels, kind = 'tree')
+        qt_records = QueueMetricsDataSource.metric_records(router_entry, metric_labels=qt_labels, kind = 'tree',
+                                                           numeric_labels = ['rate', 'bytes', 'queued_bytes', 'dropped'])
 
         if qt_records:
             qt_rate_metric = BaseCollector.counter_collector('queue_tree_rates', 'Average passing data rate in bytes per second', qt_records, 'rate', ['name'])
@@ -49,7 +50,9 @@ class QueueSimpleCollector(BaseCollector):
             return
 
         qt_labels = ['name', 'parent', 'packet_mark', 'limit_at', 'max_limit', 'priority', 'bytes', 'packets', 'queued_bytes', 'queued_packets','dropped', 'rate', 'packet_rate', 'disabled']
-        qt_records = QueueMetricsDataSource.metric_records(router_entry, metric_labels=qt_labels, kind = 'simple')
+        qt_records = QueueMetricsDataSource.metric_records(router_entry, metric_labels=qt_labels, kind = 'simple',
+                                                           numeric_labels = [f'{label}_{direction}' for label in ('rate', 'bytes', 'queued_bytes', 'dropped')
+                                                                                                    for direction in ('up', 'down')])
 
         if qt_records:
             qt_rate_metric = BaseCollector.counter_collector('queue_simple_rates_upload', 'Average passing upload data rate in bytes per second', qt_records, 'rate_up', ['name'])
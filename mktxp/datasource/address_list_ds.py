@@ -22,14 +22,12 @@ class AddressListMetricsDataSource:
         if metric_labels is None:
             metric_labels = []
         
-        all_records = []
         try:
             api_path = f"/{ip_version}/firewall/address-list"
-            resource = router_entry.api_connection.router_api().get_resource(api_path)
-            for list_name in address_lists:
-                # Use memory-safe fetching by querying specific list
-                records = resource.get(list=list_name)
-                all_records.extend(records)
+            arguments = BaseDSProcessor.print_arguments(metric_labels)
+            # Use memory-safe fetching by querying specific lists, streaming the entries as they arrive
+            all_records = (record for list_name in address_lists
+                            for record in router_entry.api_connection.stream(api_path, 'print', arguments, {'list': list_name}))
 
             return BaseDSProcessor.trimmed_records(router_entry, router_records=all_records,
                                                    metric_labels=metric_labels, translation_table=translation_table)
@@ -38,33 +36,40 @@ class AddressListMetricsDataSource:
             return None
 
     @staticmethod
-    def count_metric_records(router_entry, address_lists, ip_version):
+    def count_metric_records(router_entry, address_lists, ip_version, *, list_records = None):
+        """ Counts entries in all address lists and in the selected ones.
+            The selected lists counts are taken from their already fetched entries (list_records) when available,
+            static entries in all lists are counted as the difference to the total.
+        """
         api_path = f'/{ip_version}/firewall/address-list'
-        queries = {
-            'total': {},
-            'dynamic': {'dynamic': 'yes'},
-            'static': {'dynamic': 'no'}
-        }
-        
+
         # Count entries in all lists
-        all_lists_counts = {}
-        for count_type, query in queries.items():
-            count = BaseDSProcessor.count_records(router_entry, api_path=api_path, api_query=query)
-            if count is None:
-                return None  # Some error occurred
-            all_lists_counts[count_type] = count
+        total = BaseDSProcessor.count_records(router_entry, api_path=api_path)
+        dynamic = BaseDSProcessor.count_records(router_entry, api_path=api_path, api_query={'dynamic': 'yes'})
+        if total is None or dynamic is None:
+            return None  # Some error occurred
+        all_lists_counts = {'total': total, 'dynamic': dynamic, 'static': max(total - dynamic, 0)}
 
         # Count entries in selected lists
         selected_lists_counts = {}
-        for list_name in address_lists:
-            selected_lists_counts[list_name] = {}
-            for count_type, query in queries.items():
-                query['list'] = list_name
-                count = BaseDSProcessor.count_records(router_entry, api_path=api_path, api_query=query)
-                if count is None:
+        if list_records is not None:
+            for list_name in address_lists:
+                selected_lists_counts[list_name] = {'total': 0, 'dynamic': 0, 'static': 0}
+            for record in list_records:
+                list_counts = selected_lists_counts.get(record.get('list'))
+                if list_counts is None:
+                    continue
+                list_counts['total'] += 1
+                # list records can already be translated by the caller
+                list_counts['dynamic' if str(record.get('dynamic')) in ('true', '1') else 'static'] += 1
+        else:
+            for list_name in address_lists:
+                total = BaseDSProcessor.count_records(router_entry, api_path=api_path, api_query={'list': list_name})
+                dynamic = BaseDSProcessor.count_records(router_entry, api_path=api_path, api_query={'list': list_name, 'dynamic': 'yes'})
+                if total is None or dynamic is None:
                     return None  # Some error occurred
-                selected_lists_counts[list_name][count_type] = count
-        
+                selected_lists_counts[list_name] = {'total': total, 'dynamic': dynamic, 'static': max(total - dynamic, 0)}
+
         return {
             'all_lists': all_lists_counts,
             'selected_lists': selected_lists_counts
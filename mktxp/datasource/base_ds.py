@@ -11,41 +11,98 @@
 ## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 ## GNU General Public License for more details.
 
+import sys
+from array import array
+from functools import lru_cache
+from itertools import compress
 from mktxp.cli.config.config import MKTXPConfigKeys
 from mktxp.cli.config.config import config_handler
 
+
+@lru_cache(maxsize = 4096)
+def _normalise_key(key):
+    # bounded, as routers can return any number of distinct keys
+    for chr in ".-":
+        if chr in key:
+            key = key.replace(chr, "_")
+    return key
+
+
 class BaseDSProcessor:
     ''' Base Metrics DataSource processing
     '''
+    # custom labels by router entry & their config value
+    _custom_labels = {}
 
     @staticmethod
     def trimmed_records(router_entry, *, router_records = None, metric_labels = None, add_router_id = True, translation_table = None, translate_if_no_value = True):
-        metric_labels = metric_labels or []
+        metric_labels = set(metric_labels or [])
         router_records = router_records or []
-        translation_table = translation_table or {}
+        translate = BaseDSProcessor._translation(translation_table, translate_if_no_value)
 
-        if len(metric_labels) == 0 and len(router_records) > 0:
-            metric_labels = [BaseDSProcessor._normalise_keys(key) for key in router_records[0].keys()]
-        metric_labels = set(metric_labels)
+        # labels shared by all of the records
+        shared_labels = dict(router_entry.router_id) if add_router_id else {}
+        custom_labels = BaseDSProcessor.custom_labels(router_entry)
+        if custom_labels:
+            shared_labels[MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID] = custom_labels
 
+        # router records can be any iterable, including streamed API responses
         labeled_records = []
         for router_record in router_records:
-            translated_record = {BaseDSProcessor._normalise_keys(key): value for (key, value) in router_record.items() if BaseDSProcessor._normalise_keys(key) in metric_labels}
+            if not metric_labels:
+                metric_labels = {_normalise_key(key) for key in router_record.keys()}
+            translated_record = {}
+            for key, value in router_record.items():
+                label = _normalise_key(key)
+                if label in metric_labels:
+                    translated_record[label] = value
+            translated_record.update(shared_labels)
+            if translate:
+                translate(translated_record)
+            labeled_records.append(translated_record)
+        return labeled_records
+
+    @staticmethod
+    def trimmed_batch(router_entry, *, router_records = None, metric_labels = None, numeric_labels = (), add_router_id = True, translation_table = None):
+        ''' Same as trimmed_records, as a columnar RecordBatch.
+            Router id and custom labels are kept once as batch constants, translations are applied per column
+        '''
+        constants = dict(router_entry.router_id) if add_router_id else {}
+        custom_labels = BaseDSProcessor.custom_labels(router_entry)
+        if custom_labels:
+            constants[MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID] = custom_labels
 
-            if add_router_id:
-                translated_record.update(router_entry.router_id)
+        batch = RecordBatch.from_records(router_records or [], metric_labels, constants = constants)
+        for key, func in (translation_table or {}).items():
+            batch = batch.translate(key, func)
+        return batch.numeric(*numeric_labels)
 
-            if router_entry.config_entry.custom_labels:
-                custom_labels = BaseDSProcessor._parse_custom_labels(router_entry.config_entry.custom_labels, router_entry)
-                if custom_labels:
-                    translated_record[MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID] = custom_labels
+    @staticmethod
+    def print_arguments(metric_labels, arguments = None, *, source_fields = (), field_names = None):
+        ''' Print arguments with a `.proplist` derived from the metric labels, so only the needed fields are fetched.
+            Source fields are the API fields a datasource reads before trimming the records.
+            Field names map the labels whose API fields are not the dashed label names (e.g. `remote.address` on ROS7 BGP sessions).
+            With no metric labels all fields are needed and no `.proplist` is sent.
+        '''
+        arguments = dict(arguments or {})
+        proplist = BaseDSProcessor.proplist(metric_labels, source_fields, field_names)
+        if proplist:
+            arguments['.proplist'] = proplist
+        return arguments
 
-            # translate fields if needed
-            for key, func in translation_table.items():
-                if translate_if_no_value or translated_record.get(key) is not None:
-                    translated_record[key] = func(translated_record.get(key))
-            labeled_records.append(translated_record)
-        return labeled_records
+    @staticmethod
+    def proplist(metric_labels, source_fields = (), field_names = None):
+        if not metric_labels:
+            return None
+        field_names = field_names or {}
+        fields = {}
+        for label in list(metric_labels) + list(source_fields):
+            if label in field_names:
+                field = field_names[label]
+            else:
+                field = '.id' if label in ('id', '.id') else label.replace('_', '-')
+            fields[field] = None
+        return ','.join(fields)
 
     @staticmethod
     def count_records(router_entry, *, api_path, api_query=None):
@@ -60,13 +117,70 @@ class BaseDSProcessor:
             print(f'Error getting record count for {api_path} from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
             return None
 
+    @staticmethod
+    def monitor_records(resource, numbers, *, names = None, monitor_action = 'monitor', numbers_key = 'numbers'):
+        ''' Runs a single `monitor once` for all of the numbers, falling back to per-item calls
+            where RouterOS rejects the batch form. Returns the monitor records in the numbers order.
+            With names given, the batch records are matched to them by name, and unless they all match one-to-one
+            the per-item calls are used instead, as the batch reply order is not guaranteed
+        '''
+        numbers = list(numbers)
+        if len(numbers) > 1 and numbers_key == 'numbers':
+            try:
+                records = resource.call(monitor_action, {'once':'', numbers_key: ','.join(f'{num}' for num in numbers)})
+                if len(records) == len(numbers):
+                    if not names:
+                        return list(records)
+                    by_name = {record.get('name'): record for record in records}
+                    if len(by_name) == len(names) and all(name in by_name for name in names):
+                        return [by_name[name] for name in names]
+            except Exception:
+                # older or more specific monitor commands only take a single item
+                pass
+        return [resource.call(monitor_action, {'once':'', numbers_key: f'{num}'})[0] for num in numbers]
+
+    @staticmethod
+    def custom_labels(router_entry):
+        ''' Parsed custom labels of a router entry, only parsed again when its config value changes
+        '''
+        custom_labels = router_entry.config_entry.custom_labels
+        if not custom_labels or custom_labels == 'None':
+            return {}
+        config_value = tuple(custom_labels) if isinstance(custom_labels, (list, tuple)) else custom_labels
+        try:
+            cache_key = (router_entry.router_name, config_value)
+            parsed_labels = BaseDSProcessor._custom_labels.get(cache_key)
+        except TypeError:
+            # not hashable, nothing to cache
+            return BaseDSProcessor._parse_custom_labels(custom_labels, router_entry)
+        if parsed_labels is None:
+            parsed_labels = BaseDSProcessor._custom_labels[cache_key] = BaseDSProcessor._parse_custom_labels(custom_labels, router_entry)
+        return parsed_labels
+
     @staticmethod
     def _normalise_keys(key):
-        chars = ".-"
-        for chr in chars:
-            if chr in key:
-                key = key.replace(chr, "_")
-        return key
+        return _normalise_key(key)
+
+    @staticmethod
+    def _translation(translation_table, translate_if_no_value = True):
+        ''' The translation table compiled into a single per-record function, None with nothing to translate
+        '''
+        translations = tuple((translation_table or {}).items())
+        if not translations:
+            return None
+        if translate_if_no_value:
+            def translate(record):
+                get = record.get
+                for key, func in translations:
+                    record[key] = func(get(key))
+        else:
+            def translate(record):
+                get = record.get
+                for key, func in translations:
+                    value = get(key)
+                    if value is not None:
+                        record[key] = func(value)
+        return translate
 
     @staticmethod
     def _parse_custom_labels(custom_labels, router_entry):
@@ -93,3 +207,118 @@ class BaseDSProcessor:
             except Exception as e:
                 print(f"Warning: Could not parse custom label '{item} for {router_entry.router_name}'. Error: {e}. Ignoring.")
         return labels_dict
+
+
+class RecordBatch:
+    ''' Columnar router records: label columns as tuples of interned strings, numeric columns as float arrays,
+        and the values shared by all of the records (router id, custom labels) as constants.
+        Iterating a batch yields the records as dicts, for the code that works with records
+    '''
+    def __init__(self, columns, length, constants = None):
+        self.columns = columns
+        self.length = length
+        self.constants = constants or {}
+
+    @staticmethod
+    def from_records(router_records, metric_labels = None, *, constants = None):
+        router_records = router_records if isinstance(router_records, list) else list(router_records)
+        length = len(router_records)
+        metric_labels = set(metric_labels or [])
+        constants = constants or {}
+
+        # filled in place, without per record dicts
+        columns = {}
+        labels = {}
+        for index, router_record in enumerate(router_records):
+            for key, value in router_record.items():
+                label = labels.get(key)
+                if label is None:
+                    label = labels[key] = BaseDSProcessor._normalise_keys(key)
+                if (metric_labels and label not in metric_labels) or label in constants:
+                    continue
+                column = columns.get(label)
+                if column is None:
+                    column = columns[label] = [None] * length
+                column[index] = value
+        return RecordBatch({label: RecordBatch._label_column(column) for label, column in columns.items()}, length, constants)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        labels = list(self.columns)
+        for row in zip(*self.columns.values()) if labels else ((),) * self.length:
+            record = dict(self.constants)
+            record.update((label, value) for label, value in zip(labels, row) if value is not None)
+            yield record
+
+    def column(self, label):
+        column = self.columns.get(label)
+        if column is None:
+            return (self.constants.get(label),) * self.length
+        return column
+
+    def where(self, label, predicate):
+        ''' The batch of records whose label value satisfies the predicate
+        '''
+        mask = [predicate(value) for value in self.column(label)]
+        return RecordBatch({label: RecordBatch._same_type(column, compress(column, mask)) for label, column in self.columns.items()},
+                           sum(mask), self.constants)
+
+    def translate(self, label, func):
+        columns = dict(self.columns)
+        columns[label] = RecordBatch._same_type(self.columns.get(label, ()), (func(value) for value in self.column(label)))
+        return RecordBatch(columns, self.length, self.constants)
+
+    def numeric(self, *labels):
+        ''' Converts the label columns to float arrays, missing values are 0 and non-numeric values NaN
+        '''
+        columns = dict(self.columns)
+        for label in labels:
+            column = columns.get(label)
+            if column is not None and not isinstance(column, array):
+                columns[label] = array('d', (RecordBatch._float(value) for value in column))
+        return RecordBatch(columns, self.length, self.constants)
+
+    def split(self, label, separator = '/', suffixes = ('_up', '_down')):
+        ''' Splits the paired values (like upload / download) of a label column into two columns
+        '''
+        column = self.columns.get(label)
+        if column is None or not any(isinstance(value, str) and separator in value for value in column):
+            return self
+        plain, first, second = [], [], []
+        for value in column:
+            split_values = value.split(separator) if isinstance(value, str) else [value]
+            if len(split_values) > 1:
+                plain.append(None)
+                first.append(split_values[0])
+                second.append(split_values[1])
+            else:
+                plain.append(value)
+                first.append(None)
+                second.append(None)
+        columns = dict(self.columns)
+        if all(value is None for value in plain):
+            del columns[label]
+        else:
+            columns[label] = RecordBatch._label_column(plain)
+        columns[f'{label}{suffixes[0]}'] = RecordBatch._label_column(first)
+        columns[f'{label}{suffixes[1]}'] = RecordBatch._label_column(second)
+        return RecordBatch(columns, self.length, self.constants)
+
+    @staticmethod
+    def _label_column(values):
+        return tuple(sys.intern(value) if type(value) is str else value for value in values)
+
+    @staticmethod
+    def _same_type(column, values):
+        return array('d', values) if isinstance(column, array) else RecordBatch._label_column(values)
+
+    @staticmethod
+    def _float(value):
+        if value is None or value == '':
+            return 0.0
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float('nan')
@@ -13,7 +13,6 @@
 
 
 from mktxp.datasource.base_ds import BaseDSProcessor
-from mktxp.datasource.system_resource_ds import SystemResourceMetricsDataSource
 from mktxp.utils.utils import routerOS7_version
 
 
@@ -26,13 +25,13 @@ class BFDMetricsDataSource:
         try:
             bfd_routing_path = "/routing/bfd/session"
 
-            is_ros7 = routerOS7_version(SystemResourceMetricsDataSource.os_version(router_entry))
+            is_ros7 = routerOS7_version(router_entry.os_version)
 
             # legacy 6.x versions use a different path
             if not is_ros7:
                 bfd_routing_path = "/routing/bfd/neighbor"
 
-            bfd_records = router_entry.api_connection.router_api().get_resource(bfd_routing_path).get()
+            bfd_records = router_entry.api_connection.router_api().get_resource(bfd_routing_path).call('print', BaseDSProcessor.print_arguments(metric_labels, source_fields = [] if is_ros7 else ['address']))
 
             if not is_ros7:
                 # Normalize ROS 6 records to match ROS 7 keys
@@ -13,25 +13,40 @@
 
 
 from mktxp.datasource.base_ds import BaseDSProcessor
-from mktxp.datasource.system_resource_ds import SystemResourceMetricsDataSource
 from mktxp.utils.utils import routerOS7_version
 
 class BGPMetricsDataSource:
     ''' Wireless Metrics data provider
-    '''             
+    '''
+    # ROS7 BGP session fields with dotted names
+    SESSION_FIELD_NAMES = {
+        'remote_address': 'remote.address',
+        'remote_as': 'remote.as',
+        'local_as': 'local.as',
+        'remote_afi': 'remote.afi',
+        'local_afi': 'local.afi',
+        'remote_messages': 'remote.messages',
+        'remote_bytes': 'remote.bytes',
+        'local_messages': 'local.messages',
+        'local_bytes': 'local.bytes',
+    }
+
     @staticmethod
     def metric_records(router_entry, *, metric_labels = None, translation_table = None):
         if metric_labels is None:
             metric_labels = []                
         try:
             bgp_routing_path = '/routing/bgp/session'
+            field_names = BGPMetricsDataSource.SESSION_FIELD_NAMES
 
             # legacy 6.x versions use a different path
-            ver = SystemResourceMetricsDataSource.os_version(router_entry)
+            ver = router_entry.os_version
             if not routerOS7_version(ver):
                 bgp_routing_path = '/routing/bgp/peer'
+                field_names = None
 
-            bgp_records = router_entry.api_connection.router_api().get_resource(bgp_routing_path).get()
+            print_arguments = BaseDSProcessor.print_arguments(metric_labels, field_names = field_names)
+            bgp_records = router_entry.api_connection.router_api().get_resource(bgp_routing_path).call('print', print_arguments)
             return BaseDSProcessor.trimmed_records(router_entry, router_records = bgp_records, metric_labels = metric_labels, translation_table = translation_table)
         except Exception as exc:
             print(f'Error getting BGP sessions info from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
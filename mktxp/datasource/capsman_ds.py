@@ -48,7 +48,7 @@ class CapsmanCapsMetricsDataSource:
         try:
             remote_caps_records = []
             for capsman_path in CapsmanInfo.capsman_paths(router_entry.capsman_entry):
-                remote_caps_records.extend(router_entry.capsman_entry.api_connection.router_api().get_resource(f'{capsman_path}/remote-cap').get())
+                remote_caps_records.extend(router_entry.capsman_entry.api_connection.router_api().get_resource(f'{capsman_path}/remote-cap').call('print', BaseDSProcessor.print_arguments(metric_labels)))
             return BaseDSProcessor.trimmed_records(router_entry, router_records = remote_caps_records, metric_labels = metric_labels)
         except Exception as exc:
             print(f'Error getting CAPsMAN remote caps info from router {router_entry.capsman_entry.router_name}@{router_entry.capsman_entry.config_entry.hostname}: {exc}')
@@ -64,7 +64,7 @@ class CapsmanRegistrationsMetricsDataSource:
         try:
             registration_table_records = []
             for registration_table_path in CapsmanInfo.registration_table_paths(router_entry.capsman_entry):
-                registration_table_records.extend(router_entry.capsman_entry.api_connection.router_api().get_resource(f'{registration_table_path}').get())
+                registration_table_records.extend(router_entry.capsman_entry.api_connection.router_api().get_resource(f'{registration_table_path}').call('print', BaseDSProcessor.print_arguments(metric_labels, source_fields = ['signal'])))
             
             # With wifiwave2, Mikrotik renamed the field 'rx-signal' to 'signal' 
             # For backward compatibility, including both variants
@@ -88,7 +88,7 @@ class CapsmanInterfacesDatasource:
         if metric_labels is None:
             metric_labels = []                
         try:
-            caps_interfaces = router_entry.capsman_entry.api_connection.router_api().get_resource('/caps-man/interface').get()
+            caps_interfaces = router_entry.capsman_entry.api_connection.router_api().get_resource('/caps-man/interface').call('print', BaseDSProcessor.print_arguments(metric_labels))
             return BaseDSProcessor.trimmed_records(router_entry, router_records = caps_interfaces, metric_labels = metric_labels)
         except Exception as exc:
             print(f'Error getting CAPsMAN interfaces info from router {router_entry.capsman_entry.router_name}@{router_entry.capsman_entry.config_entry.hostname}: {exc}')
@@ -23,7 +23,7 @@ class CertificateMetricsDataSource:
         if metric_labels is None:
             metric_labels = []                
         try:
-            certificates_records = router_entry.api_connection.router_api().get_resource('/certificate').call('print', {'detail':''})
+            certificates_records = router_entry.api_connection.router_api().get_resource('/certificate').call('print', BaseDSProcessor.print_arguments(metric_labels, {'detail':''}))
             return BaseDSProcessor.trimmed_records(router_entry, router_records = certificates_records, 
                                                             metric_labels = metric_labels, translation_table=translation_table)
         except Exception as exc:
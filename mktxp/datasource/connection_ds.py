@@ -89,31 +89,21 @@ class IPConnectionStatsDatasource:
             else:
                 proplist = 'src-address'
 
-            api = router_entry.api_connection.router_api()
-            connection_records = api.get_resource('/ip/firewall/connection/').call('print', {'.proplist': proplist})
+            # calculate number of connections per src-address, folding the records in as they arrive
+            top_k = router_entry.config_entry.connection_stats_top_k
+            connections_per_src_address = SpaceSavingCounter(top_k) if top_k > 0 else ConnectionsCounter()
+            api_connection = router_entry.api_connection
+            IPConnectionStatsDatasource._count_connections(router_entry, connections_per_src_address,
+                                                            api_connection.stream('/ip/firewall/connection/', 'print', {'.proplist': proplist}))
             try:
-                connection_records_v6 = api.get_resource('/ipv6/firewall/connection/').call('print', {'.proplist': proplist})
-                connection_records.extend(connection_records_v6)
+                IPConnectionStatsDatasource._count_connections(router_entry, connections_per_src_address,
+                                                                api_connection.stream('/ipv6/firewall/connection/', 'print', {'.proplist': proplist}))
             except Exception:
                 pass
 
-             # calculate number of connections per src-address
-            connections_per_src_address = {}
-            for connection_record in connection_records:
-                address = IPConnectionStatsDatasource.strip_port(connection_record.get('src-address', ''))
-
-                count, destinations = 0, set()
-                if connections_per_src_address.get(address):
-                    count, destinations = connections_per_src_address[address]
-                count += 1
-                if router_entry.config_entry.connection_stats_destinations:
-                    destination = f"{connection_record.get('dst-address')}({connection_record.get('protocol')})"
-                    destinations.add(destination)
-                connections_per_src_address[address] = ConnStatsEntry(count, destinations)
-
             # compile connections-per-interface records
             records = []
-            for key, entry in connections_per_src_address.items():
+            for key, entry in connections_per_src_address.entries():
                 record = {'src_address': key, 'connection_count': entry.count, 'dst_addresses': ', '.join(entry.destinations)}
                 if add_router_id:
                     for router_key, router_value in router_entry.router_id.items():
@@ -124,5 +114,85 @@ class IPConnectionStatsDatasource:
             print(f'Error getting IP connection stats info from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
             return None
 
+    @staticmethod
+    def _count_connections(router_entry, connections_per_src_address, connection_records):
+        for connection_record in connection_records:
+            address = IPConnectionStatsDatasource.strip_port(connection_record.get('src-address', ''))
+            destination = None
+            if router_entry.config_entry.connection_stats_destinations:
+                destination = f"{connection_record.get('dst-address')}({connection_record.get('protocol')})"
+            connections_per_src_address.add(address, destination)
+
+
+class ConnectionsCounter:
+    ''' Exact number of connections per source address
+    '''
+    def __init__(self):
+        self.counters = {}
+
+    def add(self, address, destination = None):
+        count, destinations = self.counters.get(address, (0, set()))
+        if destination:
+            destinations.add(destination)
+        self.counters[address] = ConnStatsEntry(count + 1, destinations)
+
+    def entries(self):
+        return self.counters.items()
+
+
+class SpaceSavingCounter:
+    ''' Space-Saving heavy hitters, keeping at most k source address counters.
+        A new address takes over the smallest counter, inheriting its count as the possible error.
+    '''
+    OTHER = 'other'
+
+    def __init__(self, k):
+        self.k = k
+        self.total = 0
+        self.min_count = 0
+        self.counters = {}      # address -> [count, error, destinations]
+        self.buckets = {}       # count -> addresses with that count
+
+    def add(self, address, destination = None):
+        self.total += 1
+        counter = self.counters.get(address)
+        if counter is None:
+            if len(self.counters) < self.k:
+                counter = self.counters[address] = [0, 0, set()]
+            else:
+                evicted = self.buckets[self.min_count].pop()
+                del self.counters[evicted]
+                counter = self.counters[address] = [self.min_count, self.min_count, set()]
+                self.buckets[self.min_count].add(address)
+        if destination:
+            counter[2].add(destination)
+        self._increment(address, counter)
+
+    def entries(self):
+        ''' Source addresses by guaranteed connection counts, with the remaining connections as the `other` entry
+        '''
+        entries, counted = [], 0
+        for address, (count, error, destinations) in sorted(self.counters.items(), key = lambda item: item[1][0], reverse = True):
+            if count > error:
+                entries.append((address, ConnStatsEntry(count - error, destinations)))
+                counted += count - error
+        if self.total > counted:
+            entries.append((SpaceSavingCounter.OTHER, ConnStatsEntry(self.total - counted, set())))
+        return entries
+
+    def _increment(self, address, counter):
+        count = counter[0]
+        if count:
+            bucket = self.buckets[count]
+            bucket.discard(address)
+            if not bucket:
+                del self.buckets[count]
+                if count == self.min_count:
+                    self.min_count = count + 1
+        else:
+            self.min_count = 1
+        counter[0] = count + 1
+        self.buckets.setdefault(count + 1, set()).add(address)
+
 
 ConnStatsEntry = namedtuple('ConnStatsEntry', ['count', 'destinations'])
\ No newline at end of file
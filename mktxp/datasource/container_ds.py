@@ -24,7 +24,7 @@ class ContainerDataSource:
         router_records = []
 
         try:
-            router_records = router_entry.api_connection.router_api().get_resource(f'/container').get()
+            router_records = router_entry.api_connection.router_api().get_resource(f'/container').call('print', BaseDSProcessor.print_arguments(metric_labels, source_fields = ['name', 'comment']))
             for record in router_records:
                 if 'comment' in record:
                     # Format name with comment using centralized function
@@ -13,25 +13,37 @@
 
 
 from mktxp.datasource.base_ds import BaseDSProcessor
+from mktxp.flow.router_connection import APIRequest
 from mktxp.utils.utils import parse_mkt_uptime
 
 
 class DHCPMetricsDataSource:
     ''' DHCP Metrics data provider
     '''
+    LEASES_PATH = '/ip/dhcp-server/lease'
+
+    # beyond that many new leases, a full refresh is cheaper than fetching them one by one
+    MAX_INCREMENTAL_LEASES = 100
+
     @staticmethod
     def metric_records(router_entry, *, metric_labels = None, add_router_id = True, dhcp_cache = True, translate = True, bound = False):
         if metric_labels is None or dhcp_cache:
-            metric_labels = ['host_name', 'comment', 'active_address', 'address', 'mac_address', 'server', 'expires_after', 'client_id', 'active_mac_address']
+            metric_labels = ['id', 'host_name', 'comment', 'active_address', 'address', 'mac_address', 'server', 'expires_after', 'client_id', 'active_mac_address']
+
+        # leases of a remote DHCP entry are shared with the other router entries using it, and get labelled per router entry
+        shared_leases = dhcp_cache and router_entry.dhcp_entry is not router_entry
+        with router_entry.dhcp_entry.lock:
+            records = DHCPMetricsDataSource._lease_records(router_entry, metric_labels = metric_labels, add_router_id = add_router_id and not shared_leases,
+                                                            dhcp_cache = dhcp_cache, translate = translate, bound = bound)
+        if records and shared_leases and add_router_id:
+            return BaseDSProcessor.trimmed_records(router_entry, router_records = records, metric_labels = metric_labels)
+        return records
 
+    @staticmethod
+    def _lease_records(router_entry, *, metric_labels, add_router_id, dhcp_cache, translate, bound):
         if dhcp_cache and router_entry.dhcp_records:
             return router_entry.dhcp_records
         try:
-            if bound:
-                dhcp_lease_records = router_entry.dhcp_entry.api_connection.router_api().get_resource('/ip/dhcp-server/lease').get(status='bound')
-            else:
-                dhcp_lease_records = router_entry.dhcp_entry.api_connection.router_api().get_resource('/ip/dhcp-server/lease').call('print', {'active':''})
-
             # translation rules
             translation_table = {}
             if 'comment' in metric_labels:
@@ -43,6 +55,29 @@ class DHCPMetricsDataSource:
             if 'active_address' in metric_labels:
                 translation_table['active_address'] = lambda c: c if c else ''
 
+            api_connection = router_entry.dhcp_entry.api_connection
+            if dhcp_cache and router_entry.dhcp_leases:
+                # known leases, only fetching the new ones
+                lease_ids = [record.get('id') for record in api_connection.stream(DHCPMetricsDataSource.LEASES_PATH, 'print', {'active':'', '.proplist':'.id'})]
+                new_lease_ids = router_entry.dhcp_leases.retain(lease_ids)
+                if len(new_lease_ids) <= DHCPMetricsDataSource.MAX_INCREMENTAL_LEASES:
+                    arguments = tuple(BaseDSProcessor.print_arguments(metric_labels, {'active':''}).items())
+                    requests = [APIRequest(DHCPMetricsDataSource.LEASES_PATH, 'print', arguments, (('.id', lease_id),)) for lease_id in new_lease_ids]
+                    new_lease_records = []
+                    for response in api_connection.pipeline(requests):
+                        if isinstance(response, Exception):
+                            raise response
+                        new_lease_records.extend(response)
+                    router_entry.dhcp_leases.update(BaseDSProcessor.trimmed_records(router_entry, router_records = new_lease_records, metric_labels = metric_labels,
+                                                                                    add_router_id = add_router_id, translation_table = translation_table))
+                    return router_entry.dhcp_records
+
+            # lease tables can be large, the records are trimmed as they arrive
+            if bound:
+                dhcp_lease_records = api_connection.stream(DHCPMetricsDataSource.LEASES_PATH, 'print', BaseDSProcessor.print_arguments(metric_labels), {'status':'bound'})
+            else:
+                dhcp_lease_records = api_connection.stream(DHCPMetricsDataSource.LEASES_PATH, 'print', BaseDSProcessor.print_arguments(metric_labels, {'active':''}))
+
             records = BaseDSProcessor.trimmed_records(router_entry, router_records = dhcp_lease_records, metric_labels = metric_labels, add_router_id = add_router_id, translation_table = translation_table)
             if dhcp_cache:
                 router_entry.dhcp_records = records
@@ -12,6 +12,9 @@
 # GNU General Public License for more details.
 
 
+from collections import namedtuple
+from time import monotonic
+from mktxp.cli.config.config import config_handler
 from mktxp.datasource.base_ds import BaseDSProcessor
 from mktxp.flow.router_entry import RouterEntry
 
@@ -20,9 +23,14 @@ TRANSLATION_TABLE = {
     'log': lambda value: '1' if value == 'true' else '0'
 }
 
+FirewallRules = namedtuple('FirewallRules', ['rule_ids', 'timestamp', 'rules'])
+
 class FirewallMetricsDataSource:
     ''' Firewall Metrics data provider, supports both IPv4 and IPv6
     '''
+    # with the rules metadata cached, only the counters are fetched on every scrape
+    COUNTERS_PROPLIST = '.id,bytes'
+
     @staticmethod
     def metric_records(router_entry, *, metric_labels=None, matching_only=True, filter_path='filter', ipv6 = False):
         if metric_labels is None:
@@ -36,11 +44,13 @@ class FirewallMetricsDataSource:
                 'mangle': f'/{ip_stack}/firewall/mangle'
             }
             filter_path = filter_paths[filter_path]
-            proplist = ','.join(label.replace('_', '-') for label in metric_labels)
+            if metric_labels and config_handler.system_entry.firewall_rules_metadata_ttl:
+                return FirewallMetricsDataSource._counter_records(router_entry, filter_path, metric_labels, matching_only = matching_only)
+
             firewall_records = FirewallMetricsDataSource._get_records(
                 router_entry,
                 filter_path,
-                {'stats': '', '.proplist': proplist},
+                BaseDSProcessor.print_arguments(metric_labels, {'stats': ''}, source_fields = ['bytes'] if matching_only else ()),
                 matching_only=matching_only
             )
 
@@ -51,7 +61,49 @@ class FirewallMetricsDataSource:
             )
             return None
 
+    @staticmethod
+    def rule_name(firewall_record):
+        name = f"| {firewall_record.get('chain', ' ')} | {firewall_record.get('action', ' ')} | {firewall_record.get('comment', ' ')}"
+        out_interface = firewall_record.get('out_interface')
+        protocol = firewall_record.get('protocol')
+        if out_interface:
+            name = f"{name} | {out_interface}"
+        if protocol:
+            name = f"{name} | {protocol}"
+        return name
+
     # helpers
+    @staticmethod
+    def _counter_records(router_entry, filter_path, metric_labels, matching_only = True):
+        ''' Rule counters joined with the cached rules metadata, which only gets refetched
+            when the rules change (by .id) or is older than firewall_rules_metadata_ttl
+        '''
+        counter_records = router_entry.api_connection.router_api().get_resource(filter_path).call('print', {'stats': '', '.proplist': FirewallMetricsDataSource.COUNTERS_PROPLIST})
+        rule_ids = tuple(record.get('id') for record in counter_records)
+
+        firewall_rules = router_entry.firewall_rules.get(filter_path)
+        if (not firewall_rules or firewall_rules.rule_ids != rule_ids or
+                monotonic() - firewall_rules.timestamp >= config_handler.system_entry.firewall_rules_metadata_ttl):
+            metadata_labels = [label for label in metric_labels if label != 'bytes'] + ['id']
+            counter_records = FirewallMetricsDataSource._get_records(router_entry, filter_path, BaseDSProcessor.print_arguments(metadata_labels, {'stats': ''}, source_fields = ['bytes']))
+            rules = {}
+            for record in BaseDSProcessor.trimmed_records(router_entry, router_records = counter_records, metric_labels = metadata_labels, translation_table = TRANSLATION_TABLE):
+                # the rendered rule name is cached along with the rest of the rule metadata
+                record['name'] = FirewallMetricsDataSource.rule_name(record)
+                rules[record['id']] = record
+            firewall_rules = FirewallRules(tuple(record.get('id') for record in counter_records), monotonic(), rules)
+            router_entry.firewall_rules[filter_path] = firewall_rules
+
+        firewall_records = []
+        for counter_record in counter_records:
+            bytes = counter_record.get('bytes', '0')
+            if matching_only and int(bytes) == 0:
+                continue
+            rule = firewall_rules.rules.get(counter_record.get('id'))
+            if rule:
+                firewall_records.append(dict(rule, bytes = bytes))
+        return firewall_records
+
     @staticmethod
     def _get_records(router_entry: RouterEntry, filter_path: str, args: dict, matching_only: bool = False):
         """
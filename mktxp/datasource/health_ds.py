@@ -23,7 +23,7 @@ class HealthMetricsDataSource:
         if metric_labels is None:
             metric_labels = []                
         try:
-            health_records = router_entry.api_connection.router_api().get_resource('/system/health').get()
+            health_records = router_entry.api_connection.router_api().get_resource('/system/health').call('print', BaseDSProcessor.print_arguments(metric_labels, source_fields = ['name', 'value']))
             for record in health_records:
                 if 'name' in record:
                     # Note: The API in RouterOS v7.X+ returns a response like this:
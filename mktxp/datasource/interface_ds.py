@@ -13,7 +13,6 @@
 
 
 from mktxp.datasource.base_ds import BaseDSProcessor
-from mktxp.datasource.system_resource_ds import SystemResourceMetricsDataSource
 from mktxp.utils.utils import routerOS7_version
 from mktxp.flow.processor.output import BaseOutputProcessor
 
@@ -73,7 +72,9 @@ class InterfaceTrafficMetricsDataSource(BaseInterfaceDataSource):
     """ Interface Traffic Metrics data provider
     """
     @staticmethod
-    def metric_records(router_entry, *, metric_labels, translation_table=None):
+    def metric_records(router_entry, *, metric_labels, translation_table=None, numeric_labels=None):
+        ''' With numeric_labels, returns a RecordBatch with these labels as numeric columns
+        '''
         metric_labels = metric_labels or []
         try:
             # get stats for all existing interfaces
@@ -81,9 +82,17 @@ class InterfaceTrafficMetricsDataSource(BaseInterfaceDataSource):
                 '/interface'
             ).call(
                 'print',
-                {'stats': 'detail'}
+                BaseDSProcessor.print_arguments(metric_labels, {'stats': 'detail'}, source_fields = ['name', 'comment', 'default-name'])
             )
             metric_stats_records = BaseInterfaceDataSource.rewrite_interface_names(router_entry, metric_stats_records)
+            if numeric_labels is not None:
+                return BaseDSProcessor.trimmed_batch(
+                    router_entry,
+                    router_records=metric_stats_records,
+                    metric_labels=metric_labels,
+                    numeric_labels=numeric_labels,
+                    translation_table=translation_table,
+                )
             return BaseDSProcessor.trimmed_records(
                 router_entry=router_entry,
                 router_records=metric_stats_records,
@@ -103,19 +112,26 @@ class InterfaceMonitorMetricsDataSource:
         if metric_labels is None:
             metric_labels = []
 
-        ver = SystemResourceMetricsDataSource.os_version(router_entry)
+        ver = router_entry.os_version
         # On RouterOS 7, the 'monitor' action was replaced with 'info' for LTE interfaces, and the 'number' key was replaced with 'numbers'
         monitor_action = 'info' if kind == 'lte' and not routerOS7_version(ver) else 'monitor'
         monitor_numbers_key = 'number' if kind == 'lte' and not routerOS7_version(ver) else 'numbers'
 
         try:
-            interfaces = router_entry.api_connection.router_api().get_resource(f'/interface/{kind}').call('print', {'.proplist':'name,comment,running'})
+            resource = router_entry.api_connection.router_api().get_resource(f'/interface/{kind}')
+            interfaces = resource.call('print', {'.proplist':'name,comment,running'})
+
+            # one monitor call for all the interfaces to monitor
+            monitored = [int_num for int_num, interface in enumerate(interfaces) if not running_only or interface['running'] == 'true']
+            monitor_records = BaseDSProcessor.monitor_records(resource, monitored, names = [interfaces[int_num]['name'] for int_num in monitored],
+                                                              monitor_action = monitor_action, numbers_key = monitor_numbers_key) if monitored else []
+            monitor_records = dict(zip(monitored, monitor_records))
 
             interface_monitor_records = []
             for int_num, interface in enumerate(interfaces):
                 interface_monitor_record = {}
-                if not running_only or interface['running'] == 'true':
-                    interface_monitor_record = router_entry.api_connection.router_api().get_resource(f'/interface/{kind}').call(monitor_action, {'once':'', monitor_numbers_key:f'{int_num}'})[0]
+                if int_num in monitor_records:
+                    interface_monitor_record = monitor_records[int_num]
                 else:
                     # unless explicitly requested, no need to do a monitor call for not running interfaces
                     interface_monitor_record = {'name': interface['name'], 'status': 'no-link'}
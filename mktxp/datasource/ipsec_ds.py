@@ -24,7 +24,7 @@ class IPSecMetricsDataSource:
             metric_labels = []
 
         try:
-            ipsec_records = router_entry.api_connection.router_api().get_resource('/ip/ipsec/active-peers').call('print', {'stats': ''})
+            ipsec_records = router_entry.api_connection.router_api().get_resource('/ip/ipsec/active-peers').call('print', BaseDSProcessor.print_arguments(metric_labels, {'stats': ''}, source_fields = ['name', 'comment']))
             for record in ipsec_records:
                 # Format name with comment using centralized function
                 if 'comment' in record:
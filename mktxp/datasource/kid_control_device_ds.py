@@ -25,7 +25,7 @@ class KidDeviceMetricsDataSource:
             metric_labels = []
         try:
             device_records = []
-            records = router_entry.api_connection.router_api().get_resource('/ip/kid-control/device').get()
+            records = router_entry.api_connection.router_api().get_resource('/ip/kid-control/device').call('print', BaseDSProcessor.print_arguments(metric_labels, source_fields = ['user']))
             for record in records:
                 # If cli_output is True (called from print command), show all devices
                 # Otherwise, respect the configuration settings
@@ -23,9 +23,9 @@ class NeighborDataSource:
         
         try:
             if ipv6:
-                router_records = router_entry.api_connection.router_api().get_resource(f'/ipv6/neighbor').get(status='reachable')
+                router_records = router_entry.api_connection.router_api().get_resource(f'/ipv6/neighbor').call('print', BaseDSProcessor.print_arguments(metric_labels), {'status':'reachable'})
             else:
-                router_records = router_entry.api_connection.router_api().get_resource(f'/ip/neighbor').get()
+                router_records = router_entry.api_connection.router_api().get_resource(f'/ip/neighbor').call('print', BaseDSProcessor.print_arguments(metric_labels))
             
             # Sanitize null bytes from all string fields (e.g. padded identity strings)
             for record in router_records:
@@ -24,7 +24,7 @@ class NetwatchMetricsDataSource:
         if metric_labels is None:
             metric_labels = []                
         try:
-            netwatch_records = router_entry.api_connection.router_api().get_resource('/tool/netwatch').get()
+            netwatch_records = router_entry.api_connection.router_api().get_resource('/tool/netwatch').call('print', BaseDSProcessor.print_arguments(metric_labels, source_fields = ['name', 'host', 'comment', 'disabled']))
             netwatch_records = [entry for entry in netwatch_records if entry.get('disabled', 'false') != 'true']
 
             # since addition in ROS v7.14, name is supported natively
@@ -32,11 +32,23 @@ class PackageMetricsDataSource:
 
     @staticmethod
     def is_package_installed (router_entry, package_name = None, enabled_only = True):
-        if package_name:
-            try:
-                get_params = {'disabled': 'false'} if enabled_only else {}
-                package_records = router_entry.api_connection.router_api().get_resource('/system/package').get(**get_params)
-                return any(pkg['name'] == package_name for pkg in package_records)
-            except Exception as exc:
-                print(f'Error getting an installed package status from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
+        if not package_name:
+            return False
+        if enabled_only:
+            # the enabled packages are a router entry fact
+            return router_entry.is_package_installed(package_name)
+        try:
+            package_records = router_entry.api_connection.router_api().get_resource('/system/package').get()
+            return any(pkg['name'] == package_name for pkg in package_records)
+        except Exception as exc:
+            print(f'Error getting an installed package status from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
         return False
+
+    @staticmethod
+    def installed_packages(router_entry):
+        try:
+            package_records = router_entry.api_connection.router_api().get_resource('/system/package').get(disabled='false')
+            return frozenset(pkg['name'] for pkg in package_records)
+        except Exception as exc:
+            print(f'Error getting installed packages from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
+            return None
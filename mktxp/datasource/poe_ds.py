@@ -24,28 +24,20 @@ class POEMetricsDataSource:
         if metric_labels is None:
             metric_labels = []                
         try:
-            poe_records = router_entry.api_connection.router_api().get_resource('/interface/ethernet/poe').get()
-            for int_num, poe_record in enumerate(poe_records):
-                poe_monitor_records = router_entry.api_connection.router_api().get_resource('/interface/ethernet/poe').call('monitor', {'once':'', 'numbers':f'{int_num}'})
-                poe_monitor_records = BaseDSProcessor.trimmed_records(router_entry, router_records = poe_monitor_records)
-
-                if poe_monitor_records[0].get('poe_out_status'):
-                    poe_record['poe_out_status'] = poe_monitor_records[0]['poe_out_status']
-
-                if poe_monitor_records[0].get('poe_out_voltage'):
-                    poe_record['poe_out_voltage'] = poe_monitor_records[0]['poe_out_voltage']
-
-                if poe_monitor_records[0].get('poe_out_current'):
-                    poe_record['poe_out_current'] = poe_monitor_records[0]['poe_out_current']
-
-                if poe_monitor_records[0].get('poe_out_power'):
-                    poe_record['poe_out_power'] = poe_monitor_records[0]['poe_out_power']
+            resource = router_entry.api_connection.router_api().get_resource('/interface/ethernet/poe')
+            poe_records = resource.get()
+            poe_monitor_records = BaseDSProcessor.monitor_records(resource, range(len(poe_records)),
+                                                                  names = [poe_record['name'] for poe_record in poe_records]) if poe_records else []
+            for poe_record, poe_monitor_record in zip(poe_records, poe_monitor_records):
+                for key in ('poe-out-status', 'poe-out-voltage', 'poe-out-current', 'poe-out-power'):
+                    if poe_monitor_record.get(key):
+                        poe_record[BaseDSProcessor._normalise_keys(key)] = poe_monitor_record[key]
 
             # Apply interface name formatting based on config
             interfaces = router_entry.api_connection.router_api().get_resource('/interface/ethernet').call('print', {'.proplist':'name,comment'})
-            comment_fn = lambda interface: interface['comment'] if interface.get('comment') else ''
+            comments = {interface['name']: interface.get('comment') for interface in interfaces}
             for poe_record in poe_records:
-                comment = [comment_fn(interface) for interface in interfaces if interface['name'] == poe_record['name']][0]       
+                comment = comments.get(poe_record['name'])
                 if comment:
                     # Format name with comment using centralized function
                     poe_record['name'] = BaseOutputProcessor.format_interface_name(
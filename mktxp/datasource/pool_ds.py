@@ -24,7 +24,7 @@ class PoolMetricsDataSource:
         if metric_labels is None:
             metric_labels = []
         try:
-            pool_records = router_entry.api_connection.router_api().get_resource(f'/{ip_stack}/pool').get()
+            pool_records = router_entry.api_connection.router_api().get_resource(f'/{ip_stack}/pool').call('print', BaseDSProcessor.print_arguments(metric_labels))
             return BaseDSProcessor.trimmed_records(router_entry, router_records = pool_records, metric_labels = metric_labels)
         except Exception as exc:
             print(f'Error getting {"IPv6" if ipv6 else "IPv4"} pool info from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
@@ -40,7 +40,7 @@ class PoolUsedMetricsDataSource:
         if metric_labels is None:
             metric_labels = []
         try:
-            pool_used_records = router_entry.api_connection.router_api().get_resource(f'/{ip_stack}/pool/used').get()
+            pool_used_records = router_entry.api_connection.router_api().get_resource(f'/{ip_stack}/pool/used').call('print', BaseDSProcessor.print_arguments(metric_labels))
             return BaseDSProcessor.trimmed_records(router_entry, router_records = pool_used_records, metric_labels = metric_labels)
         except Exception as exc:
             print(f'Error getting {"IPv6" if ipv6 else "IPv4"} pool used info from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
@@ -20,7 +20,7 @@ class PublicIPAddressDatasource:
             metric_labels = []
 
         try:
-            records = router_entry.api_connection.router_api().get_resource('/ip/cloud/').get()
+            records = router_entry.api_connection.router_api().get_resource('/ip/cloud/').call('print', BaseDSProcessor.print_arguments(metric_labels))
             return BaseDSProcessor.trimmed_records(router_entry, router_records=records, metric_labels = metric_labels)
         except Exception as exc:
             print(f'Error public IP address info from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
@@ -19,16 +19,28 @@ class QueueMetricsDataSource:
     ''' Queue Metrics data provider
     '''             
     @staticmethod    
-    def metric_records(router_entry, *, metric_labels = None, kind = 'tree'):
+    def metric_records(router_entry, *, metric_labels = None, kind = 'tree', numeric_labels = None):
+        ''' With numeric_labels, returns a RecordBatch with these labels as numeric columns
+        '''
         if metric_labels is None:
             metric_labels = []                
         try:
-            queue_records = router_entry.api_connection.router_api().get_resource(f'/queue/{kind}/').get()
-            queue_records = BaseDSProcessor.trimmed_records(router_entry, router_records = queue_records, metric_labels = metric_labels)            
+            queue_records = router_entry.api_connection.router_api().get_resource(f'/queue/{kind}/').call('print', BaseDSProcessor.print_arguments(metric_labels))
+            if numeric_labels is not None:
+                queue_batch = BaseDSProcessor.trimmed_batch(router_entry, router_records = queue_records, metric_labels = metric_labels)
+            else:
+                queue_records = BaseDSProcessor.trimmed_records(router_entry, router_records = queue_records, metric_labels = metric_labels)            
         except Exception as exc:
             print(f'Error getting system resource info from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
             return None
 
+        if numeric_labels is not None:
+            if kind != 'tree':
+                # simple queue values need splitting into upload/download columns
+                for label in list(queue_batch.columns):
+                    queue_batch = queue_batch.split(label)
+            return queue_batch.numeric(*numeric_labels)
+
         if kind == 'tree':            
             return queue_records
 
@@ -48,7 +60,3 @@ class QueueMetricsDataSource:
                     splitted_queue_record[key] = value
             splitted_queue_records.append(splitted_queue_record)            
         return splitted_queue_records
-
-        
-
-
@@ -12,7 +12,7 @@
 ## GNU General Public License for more details.
 
 
-from mktxp.datasource.base_ds import BaseDSProcessor
+from mktxp.flow.router_connection import APIRequest
 
 
 class RouteMetricsDataSource:
@@ -27,24 +27,20 @@ class RouteMetricsDataSource:
         api_path = f'/{ip_stack}/route'
 
         try:
-            # Get total routes
-            total_routes = BaseDSProcessor.count_records(router_entry, api_path=api_path)
-            if total_routes is None:
-                # Abort if there was an error
-                return None
-
-            # Get counts per protocol
-            routes_per_protocol = {}
-            for label in metric_labels:
-                count = BaseDSProcessor.count_records(router_entry, api_path=api_path, api_query={f'{label}': 'yes'})
-                if count is None:
+            # Get the total and per protocol counts in a single round trip
+            requests = [APIRequest(api_path, 'print', (('count-only', ''),), ())]
+            requests.extend(APIRequest(api_path, 'print', (('count-only', ''),), ((f'{label}', 'yes'),)) for label in metric_labels)
+            counts = []
+            for response in router_entry.api_connection.pipeline(requests):
+                if isinstance(response, Exception):
                     # Abort if there was an error
+                    print(f'Error getting {"IPv6" if ipv6 else "IPv4"} routes count from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {response}')
                     return None
-                routes_per_protocol[label] = count
+                counts.append(int(response.done_message.get('ret', 0)) if response.done_message else 0)
 
             return {
-                'total_routes': total_routes,
-                'routes_per_protocol': routes_per_protocol
+                'total_routes': counts[0],
+                'routes_per_protocol': dict(zip(metric_labels, counts[1:]))
             }
         except Exception as exc:
             print(f'Error getting {"IPv6" if ipv6 else "IPv4"} routes info from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
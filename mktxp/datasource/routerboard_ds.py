@@ -23,7 +23,7 @@ class RouterboardMetricsDataSource:
         if metric_labels is None:
             metric_labels = []                
         try:
-            routerboard_records = router_entry.api_connection.router_api().get_resource('/system/routerboard').get()
+            routerboard_records = router_entry.api_connection.router_api().get_resource('/system/routerboard').call('print', BaseDSProcessor.print_arguments(metric_labels))
             return BaseDSProcessor.trimmed_records(router_entry, router_records = routerboard_records, metric_labels = metric_labels)
         except Exception as exc:
             print(f'Error getting system routerboard info from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
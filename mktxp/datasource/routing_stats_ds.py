@@ -12,7 +12,6 @@
 ## GNU General Public License for more details.
 
 from mktxp.datasource.base_ds import BaseDSProcessor
-from mktxp.datasource.system_resource_ds import SystemResourceMetricsDataSource
 from mktxp.utils.utils import routerOS7_version
 
 
@@ -27,11 +26,11 @@ class RoutingStatsMetricsDataSource:
             routing_stats = '/routing/stats/process'
 
             # legacy 6.x versions are untested
-            ver = SystemResourceMetricsDataSource.os_version(router_entry)
+            ver = router_entry.os_version
             if not routerOS7_version(ver):
                 raise Exception("Routing stats for legacy 6.x versions are not supported at the moment")
 
-            routing_stats_records = router_entry.api_connection.router_api().get_resource(routing_stats).get()
+            routing_stats_records = router_entry.api_connection.router_api().get_resource(routing_stats).call('print', BaseDSProcessor.print_arguments(metric_labels))
             return BaseDSProcessor.trimmed_records(router_entry, router_records = routing_stats_records, metric_labels = metric_labels, translation_table = translation_table)
         except Exception as exc:
             print(f'Error getting routing stats sessions info from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
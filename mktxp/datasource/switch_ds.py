@@ -23,7 +23,7 @@ class SwitchPortMetricsDataSource:
         if metric_labels is None:
             metric_labels = []
         try:
-            active_users_records = router_entry.api_connection.router_api().get_resource('/interface/ethernet/switch/port').call('print', {'stats': 'detail'})
+            active_users_records = router_entry.api_connection.router_api().get_resource('/interface/ethernet/switch/port').call('print', BaseDSProcessor.print_arguments(metric_labels, {'stats': 'detail'}))
             return BaseDSProcessor.trimmed_records(router_entry, router_records = active_users_records,
                                                             metric_labels = metric_labels, translation_table = translation_table)
         except Exception as exc:
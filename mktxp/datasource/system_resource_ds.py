@@ -13,7 +13,7 @@
 
 
 from mktxp.datasource.base_ds import BaseDSProcessor
-from mktxp.utils.utils import builtin_wifi_capsman_version
+from mktxp.utils.utils import parse_mkt_uptime
 
 
 class SystemResourceMetricsDataSource:
@@ -24,7 +24,9 @@ class SystemResourceMetricsDataSource:
         if metric_labels is None:
             metric_labels = []                
         try:
-            system_resource_records = router_entry.api_connection.router_api().get_resource('/system/resource').get()
+            system_resource_records = router_entry.api_connection.router_api().get_resource('/system/resource').call('print', BaseDSProcessor.print_arguments(metric_labels, source_fields = ['uptime']))
+            if system_resource_records:
+                router_entry.observe_uptime(parse_mkt_uptime(system_resource_records[0].get('uptime')))
             return BaseDSProcessor.trimmed_records(router_entry, router_records = system_resource_records, metric_labels = metric_labels, translation_table=translation_table)
         except Exception as exc:
             print(f'Error getting system resource info from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
@@ -32,19 +34,19 @@ class SystemResourceMetricsDataSource:
 
     @staticmethod
     def os_version(router_entry):
+        return router_entry.os_version
+
+    @staticmethod
+    def system_facts(router_entry):
         try:
-            system_version_records = router_entry.api_connection.router_api().get_resource('/system/resource').call('print', {'.proplist':'version'})
-            for record in system_version_records:
-                ver = record.get('version', None)
-                if ver:
-                    return ver                    
+            records = router_entry.api_connection.router_api().get_resource('/system/resource').call('print', {'.proplist':'version,board-name'})
+            for record in records:
+                if record.get('version'):
+                    return {'version': record['version'], 'board_name': record.get('board-name')}
         except Exception as exc:
-            print(f'Error getting OS version info from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
+            print(f'Error getting system info from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
         return None
-    
+
     @staticmethod
     def has_builtin_wifi_capsman(router_entry):
-        ver = SystemResourceMetricsDataSource.os_version(router_entry)
-        if ver:
-            return builtin_wifi_capsman_version(ver)
-        return False
+        return router_entry.has_builtin_wifi_capsman
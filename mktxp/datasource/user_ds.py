@@ -23,7 +23,7 @@ class UserMetricsDataSource:
         if metric_labels is None:
             metric_labels = []                
         try:
-            active_users_records = router_entry.api_connection.router_api().get_resource('/user/active/').get()
+            active_users_records = router_entry.api_connection.router_api().get_resource('/user/active/').call('print', BaseDSProcessor.print_arguments(metric_labels))
             return BaseDSProcessor.trimmed_records(router_entry, router_records = active_users_records, metric_labels = metric_labels)
         except Exception as exc:
             print(f'Error getting system resource info from router {router_entry.router_name}@{router_entry.config_entry.hostname}: {exc}')
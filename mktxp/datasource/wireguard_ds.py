@@ -40,7 +40,8 @@ class WireguardPeerTrafficMetricsDataSource(BaseWireGuardPeerDataSource):
             metric_stats_records = router_entry.api_connection.router_api().get_resource(
                 '/interface/wireguard/peers'
             ).call(
-                'print'
+                'print',
+                BaseDSProcessor.print_arguments(metric_labels, source_fields = ['name', 'comment'])
             )
             metric_stats_records = BaseWireGuardPeerDataSource.rewrite_interface_names(router_entry, metric_stats_records)
             return BaseDSProcessor.trimmed_records(
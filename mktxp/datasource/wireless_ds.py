@@ -28,7 +28,7 @@ class WirelessMetricsDataSource:
             metric_labels = []                
         try:
             wireless_package = WirelessMetricsDataSource.wireless_package(router_entry)
-            registration_table_records = router_entry.api_connection.router_api().get_resource(f'/interface/{wireless_package}/registration-table').get()
+            registration_table_records = router_entry.api_connection.router_api().get_resource(f'/interface/{wireless_package}/registration-table').call('print', BaseDSProcessor.print_arguments(metric_labels, source_fields = ['signal']))
 
             # With wifiwave2, Mikrotik renamed the field 'signal-strength' to 'signal' 
             # For backward compatibility, including both variants
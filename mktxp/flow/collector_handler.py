@@ -11,16 +11,23 @@
 ## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 ## GNU General Public License for more details.
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import itertools
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from timeit import default_timer
 from datetime import datetime
-from threading import Event, Lock, Timer
+from time import monotonic
+from collections import namedtuple, OrderedDict
+from threading import Event, Lock, Thread, Timer, local
 from mktxp.cli.config.config import config_handler
 from mktxp.cli.config.config import MKTXPConfigKeys
+from mktxp.collector.base_collector import BaseCollector
 
 class CollectorHandler:
     ''' MKTXP Collectors Handler
     '''
+    # ids of the scrapes, for the router entries sharing child entries
+    _scrape_ids = itertools.count(1)
 
     def __init__(self, entries_handler, collector_registry):
         self.entries_handler = entries_handler
@@ -28,54 +35,71 @@ class CollectorHandler:
         self.last_collect_timestamp = 0
         self._metrics_cache = []
         self._cache_lock = Lock()
+        # bumped on each new metrics snapshot, for caching what is made of it (e.g. encoded responses)
+        self.generation = 0
+        self._served = local()
+        # the collection in progress, joined by concurrent scrapes
+        self._in_flight = None
+        self._in_flight_lock = Lock()
+        self._background_thread = None
+        self._background_stop = Event()
 
 
-    def collect_sync(self):
+    def collect_sync(self, router_entries = None, collectors = None, scrape_id = None):
         '''
         Collect the metrics of all router entries defined in the current users configuration synchronously.
         This function iterates over each router entry one-by-one.
         Thus, the total runtime of this function scales linearly with the number of registered routers.
         '''
-        for router_entry in self.entries_handler.router_entries:
+        router_entries = self.entries_handler.router_entries if router_entries is None else router_entries
+        collectors = self.collector_registry.registered_collectors if collectors is None else collectors
+        scrape_id = scrape_id or next(CollectorHandler._scrape_ids)
+        for router_entry in router_entries:
             if not router_entry.is_ready():
                 # let's pick up on things in the next run
                 continue
 
+            # one collection at a time per router entry, e.g. a full and a filtered scrape
+            with router_entry.lock:
+                try:
+                    router_entry.start_collection(scrape_id)
+                    for collector_ID, collect_func in collectors.items():
+                        start = default_timer()
+                        yield from self._collect_tiered(collector_ID, collect_func, router_entry)
+                        router_entry.time_spent[collector_ID] += default_timer() - start
+                    router_entry.is_done()
+                except Exception as e:
+                    print(f"Exception while scraping {router_entry.router_id[MKTXPConfigKeys.ROUTERBOARD_NAME]}: {e}")
+                    router_entry.is_done()
+                    continue
+
+    def collect_router_entry_async(self, router_entry, scrape_timeout_event, total_scrape_timeout_event, collectors = None, scrape_id = None):
+        collectors = self.collector_registry.registered_collectors if collectors is None else collectors
+        results = []
+        with router_entry.lock:
             try:
-                for collector_ID, collect_func in self.collector_registry.registered_collectors.items():
+                router_entry.start_collection(scrape_id)
+                for collector_ID, collect_func in collectors.items():
+                    if scrape_timeout_event.is_set():
+                        print(f'Hit timeout while scraping router entry: {router_entry.router_id[MKTXPConfigKeys.ROUTERBOARD_NAME]}')
+                        break
+
+                    if total_scrape_timeout_event.is_set():
+                        print(f'Hit overall timeout while scraping router entry: {router_entry.router_id[MKTXPConfigKeys.ROUTERBOARD_NAME]}')
+                        break
+
                     start = default_timer()
-                    yield from collect_func(router_entry)
+                    result = list(self._collect_tiered(collector_ID, collect_func, router_entry))
+                    results += result
                     router_entry.time_spent[collector_ID] += default_timer() - start
                 router_entry.is_done()
             except Exception as e:
                 print(f"Exception while scraping {router_entry.router_id[MKTXPConfigKeys.ROUTERBOARD_NAME]}: {e}")
                 router_entry.is_done()
-                continue
-
-    def collect_router_entry_async(self, router_entry, scrape_timeout_event, total_scrape_timeout_event):
-        results = []
-        try:
-            for collector_ID, collect_func in self.collector_registry.registered_collectors.items():
-                if scrape_timeout_event.is_set():
-                    print(f'Hit timeout while scraping router entry: {router_entry.router_id[MKTXPConfigKeys.ROUTERBOARD_NAME]}')
-                    break
-
-                if total_scrape_timeout_event.is_set():
-                    print(f'Hit overall timeout while scraping router entry: {router_entry.router_id[MKTXPConfigKeys.ROUTERBOARD_NAME]}')
-                    break
-
-                start = default_timer()
-                result = list(collect_func(router_entry))
-                results += result
-                router_entry.time_spent[collector_ID] += default_timer() - start
-            router_entry.is_done()
-        except Exception as e:
-            print(f"Exception while scraping {router_entry.router_id[MKTXPConfigKeys.ROUTERBOARD_NAME]}: {e}")
-            router_entry.is_done()
         return results
 
 
-    def collect_async(self, max_worker_threads=5):
+    def collect_async(self, max_worker_threads=5, router_entries = None, collectors = None, scrape_id = None):
         '''
         Collect the metrics of all router entries defined in the current users configuration in parallel.
         This function iterates over multiple routers in parallel (depending on the value of max_worker_threads).
@@ -90,10 +114,12 @@ class CollectorHandler:
         total_scrape_timer = Timer(config_handler.system_entry.total_max_scrape_duration, timeout, args=(total_scrape_timeout_event,))
         total_scrape_timer.start()
 
+        router_entries = self.entries_handler.router_entries if router_entries is None else router_entries
+        scrape_id = scrape_id or next(CollectorHandler._scrape_ids)
         with ThreadPoolExecutor(max_workers=max_worker_threads) as executor:
             futures = {}
 
-            for router_entry in self.entries_handler.router_entries:
+            for router_entry in router_entries:
                 if total_scrape_timeout_event.is_set():
                     print(f'Hit overall timeout while scraping router entry: {router_entry.router_id[MKTXPConfigKeys.ROUTERBOARD_NAME]}')
                     break
@@ -107,7 +133,7 @@ class CollectorHandler:
                 scrape_timer = Timer(config_handler.system_entry.max_scrape_duration, timeout, args=(scrape_timeout_event,))
                 scrape_timer.start()
 
-                futures[executor.submit(self.collect_router_entry_async, router_entry, scrape_timeout_event, total_scrape_timeout_event)] = scrape_timer
+                futures[executor.submit(self.collect_router_entry_async, router_entry, scrape_timeout_event, total_scrape_timeout_event, collectors, scrape_id)] = scrape_timer
 
             for future in as_completed(futures):
                 # cancel unused timers for scrapes finished regularly (within set duration)
@@ -118,34 +144,190 @@ class CollectorHandler:
         total_scrape_timer.cancel()
 
 
+    def collect_asyncio(self, max_worker_threads=5, router_entries = None, collectors = None, scrape_id = None):
+        '''
+        Collect the metrics of all router entries in parallel, same as collect_async but with the scrape timeouts
+        as event loop timers rather than a timer thread per router.
+        The collectors are synchronous and each router is still collected on a worker thread,
+        so at most max_worker_threads routers are in flight, same as with collect_async.
+        '''
+        yield from asyncio.run(self._collect_asyncio(max_worker_threads, router_entries, collectors, scrape_id))
+
+    async def _collect_asyncio(self, max_worker_threads, router_entries = None, collectors = None, scrape_id = None):
+        router_entries = self.entries_handler.router_entries if router_entries is None else router_entries
+        scrape_id = scrape_id or next(CollectorHandler._scrape_ids)
+        loop = asyncio.get_running_loop()
+
+        # overall scrape duration
+        total_scrape_timeout_event = Event()
+        total_scrape_timer = loop.call_later(config_handler.system_entry.total_max_scrape_duration, total_scrape_timeout_event.set)
+
+        async def collect_router_entry(router_entry):
+            if total_scrape_timeout_event.is_set():
+                print(f'Hit overall timeout while scraping router entry: {router_entry.router_id[MKTXPConfigKeys.ROUTERBOARD_NAME]}')
+                return []
+            if not await loop.run_in_executor(executor, router_entry.is_ready):
+                # let's pick up on things in the next run
+                return []
+
+            # Duration of individual scrapes
+            scrape_timeout_event = Event()
+            scrape_timer = loop.call_later(config_handler.system_entry.max_scrape_duration, scrape_timeout_event.set)
+            try:
+                return await loop.run_in_executor(executor, self.collect_router_entry_async, router_entry, scrape_timeout_event, total_scrape_timeout_event, collectors, scrape_id)
+            finally:
+                scrape_timer.cancel()
+
+        with ThreadPoolExecutor(max_workers=max_worker_threads) as executor:
+            results = await asyncio.gather(*(collect_router_entry(router_entry) for router_entry in router_entries))
+
+        total_scrape_timer.cancel()
+        return [metric for router_results in results for metric in router_results]
+
+
     def collect(self):
-        if not self._valid_collect_interval():
-            # Within minimal_collect_interval: replay the last successful collection
-            # so concurrent or closely-spaced scrapers do not see an empty registry
-            # (which would otherwise drop every mktxp_* series for that scrape and
-            # surface as phantom "down" gaps in dashboards).
-            with self._cache_lock:
-                cached = list(self._metrics_cache)
-            yield from cached
+        if self.background_collection_running:
+            # Background mode: routers are polled on their own cadence,
+            # so a scrape only serves the latest complete snapshot
+            yield from self._cached_metrics()
             return
 
+        yield from self._single_flight_collect()
+
+    def start_background_collection(self, interval):
+        '''
+        Start polling all router entries in a background thread, every `interval` seconds.
+        Once running, collect() no longer touches the routers and just serves the last complete snapshot.
+        '''
+        if self.background_collection_running:
+            return
+        self._background_stop.clear()
+        self._background_thread = Thread(target = self._background_collect_loop, args = (interval,),
+                                         name = 'mktxp-background-collection', daemon = True)
+        self._background_thread.start()
+
+    def stop_background_collection(self, timeout = None):
+        self._background_stop.set()
+        if self._background_thread:
+            self._background_thread.join(timeout)
+        self._background_thread = None
+
+    @property
+    def background_collection_running(self):
+        return self._background_thread is not None and self._background_thread.is_alive()
+
+    def _background_collect_loop(self, interval):
+        while not self._background_stop.is_set():
+            start = default_timer()
+            try:
+                self._refresh_metrics_cache()
+            except Exception as e:
+                print(f'Exception during background metrics collection: {e}')
+            elapsed = default_timer() - start
+            if config_handler.system_entry.verbose_mode:
+                print(f'Background metrics collection finished in {elapsed:.2f}s')
+            # keep the cadence, but never spin when a collection takes longer than the interval
+            self._background_stop.wait(max(interval - elapsed, 0.1))
+
+    @property
+    def served_generation(self):
+        ''' Generation of the metrics last collected by the calling thread, None when not a cached snapshot
+        '''
+        return getattr(self._served, 'generation', None)
+
+    def _single_flight_collect(self):
+        ''' Only one collection runs at a time, scrapes arriving while it is in progress wait for it and share its result
+        '''
+        with self._in_flight_lock:
+            in_flight = self._in_flight
+            joining = in_flight is not None
+            if not joining:
+                if not self._valid_collect_interval():
+                    # Within minimal_collect_interval: replay the last successful collection
+                    # so concurrent or closely-spaced scrapers do not see an empty registry
+                    # (which would otherwise drop every mktxp_* series for that scrape and
+                    # surface as phantom "down" gaps in dashboards).
+                    return self._cached_metrics()
+                in_flight = self._in_flight = CollectionInFlight()
+
+        if joining:
+            in_flight.done.wait()
+            if in_flight.metrics is None:
+                # the collection failed
+                return self._cached_metrics()
+            self._served.generation = in_flight.generation
+            return list(in_flight.metrics)
+
+        try:
+            in_flight.metrics = self._refresh_metrics_cache()
+            in_flight.generation = self.served_generation
+            return in_flight.metrics
+        finally:
+            with self._in_flight_lock:
+                self._in_flight = None
+            in_flight.done.set()
+
+    def _refresh_metrics_cache(self):
+        collected = self._collect_all()
+        generation = None
+        if collected:
+            # swap in the complete snapshot in one go
+            with self._cache_lock:
+                self._metrics_cache = collected
+                self.generation += 1
+                generation = self.generation
+        self._served.generation = generation
+        return collected
+
+    def _cached_metrics(self):
+        with self._cache_lock:
+            self._served.generation = self.generation
+            return list(self._metrics_cache)
+
+    def collect_filtered(self, collector_IDs = None, router_names = None):
+        ''' Metrics of the selected collectors and router entries only, collected on request.
+            They are kept out of the metrics snapshot served to the full scrapes
+        '''
+        router_entries = [router_entry for router_entry in self.entries_handler.router_entries
+                                if not router_names or router_entry.router_name in router_names]
+        collectors = OrderedDict((collector_ID, collect_func) for collector_ID, collect_func in self.collector_registry.registered_collectors.items()
+                                if not collector_IDs or collector_ID in collector_IDs)
+        # bandwidth metrics are not router related, they go with the full set of collectors only
+        return self._collect_all(router_entries, collectors, bandwidth = not collector_IDs)
+
+    def _collect_all(self, router_entries = None, collectors = None, bandwidth = True):
         # bandwidth collector
-        collected = list(self.collector_registry.bandwidthCollector.collect())
+        collected = list(self.collector_registry.bandwidthCollector.collect()) if bandwidth else []
 
         # all other collectors
         # Check whether to run in parallel by looking at the mktxp system configuration
         parallel = config_handler.system_entry.fetch_routers_in_parallel
         max_worker_threads = config_handler.system_entry.max_worker_threads
-        if parallel:
-            collected.extend(self.collect_async(max_worker_threads=max_worker_threads))
+        if parallel and config_handler.system_entry.asyncio_api_transport:
+            collected.extend(self.collect_asyncio(max_worker_threads, router_entries, collectors))
+        elif parallel:
+            collected.extend(self.collect_async(max_worker_threads, router_entries, collectors))
         else:
-            collected.extend(self.collect_sync())
+            collected.extend(self.collect_sync(router_entries, collectors))
 
-        if collected:
-            with self._cache_lock:
-                self._metrics_cache = collected
+        # one family per metric name across all routers
+        return BaseCollector.merged_families(collected)
 
-        yield from collected
+    def _collect_tiered(self, collector_ID, collect_func, router_entry):
+        refresh_interval = self.collector_registry.refresh_interval(collector_ID, router_entry)
+        if not refresh_interval:
+            return collect_func(router_entry)
+
+        # slow / static collectors replay their last output in between refreshes
+        now = monotonic()
+        cached = router_entry.collector_cache.get(collector_ID)
+        if cached and now - cached.timestamp < refresh_interval:
+            return cached.metrics
+
+        metrics = list(collect_func(router_entry))
+        if metrics:
+            router_entry.collector_cache[collector_ID] = CachedCollection(now, metrics)
+        return metrics
 
     def _valid_collect_interval(self):
         now = datetime.now().timestamp()
@@ -168,23 +350,97 @@ class ProbeCollectorHandler(CollectorHandler):
         if not self._valid_collect_interval():
             raise RuntimeError('Probe deferred by minimal_collect_interval')
 
+        yield from BaseCollector.merged_families(self.probe())
+
+    def probe(self, scrape_id = None):
+        ''' Metrics of the probed router entries, raising on failure
+        '''
+        scrape_id = scrape_id or next(CollectorHandler._scrape_ids)
+        collected = []
         for router_entry in self.entries_handler.router_entries:
             if not router_entry.is_ready():
                 raise RuntimeError(
                     f"Probe failed to connect to router: {router_entry.router_id[MKTXPConfigKeys.ROUTERBOARD_NAME]}"
                 )
 
-            try:
-                for collector_ID, collect_func in self.collector_registry.registered_collectors.items():
-                    start = default_timer()
-                    yield from collect_func(router_entry)
-                    router_entry.time_spent[collector_ID] += default_timer() - start
-            except Exception:
-                raise
-            finally:
-                router_entry.is_done()
+            # pooled probe entries can be probed concurrently
+            with router_entry.lock:
+                try:
+                    router_entry.start_collection(scrape_id)
+                    for collector_ID, collect_func in self.collector_registry.registered_collectors.items():
+                        start = default_timer()
+                        collected.extend(self._collect_tiered(collector_ID, collect_func, router_entry))
+                        router_entry.time_spent[collector_ID] += default_timer() - start
+                except Exception:
+                    raise
+                finally:
+                    router_entry.is_done()
+        return collected
+
+
+class BatchProbeCollectorHandler:
+    ''' Probes the targets of one module concurrently, into one set of metric families.
+        Each target reports its mktxp_probe_success and mktxp_probe_duration_seconds, so a failed target does not fail the batch
+    '''
+    def __init__(self, probe_entries, collector_registry):
+        self.probe_handlers = [ProbeCollectorHandler(entries_handler, collector_registry) for entries_handler in probe_entries]
+
+    def collect(self):
+        executor = ThreadPoolExecutor(max_workers = config_handler.system_entry.max_worker_threads)
+        # one scrape for all of the targets, e.g. sharing a remote DHCP entry
+        scrape_id = next(CollectorHandler._scrape_ids)
+        futures = {executor.submit(BatchProbeCollectorHandler._probe, probe_handler, scrape_id): probe_handler for probe_handler in self.probe_handlers}
+        done, _ = wait(futures, timeout = config_handler.system_entry.total_max_scrape_duration)
+        # probes past the overall timeout are left to finish on their own
+        executor.shutdown(wait = False)
+
+        collected, probe_records = [], []
+        for future, probe_handler in futures.items():
+            entries_handler = probe_handler.entries_handler
+            if future in done:
+                metrics, duration = future.result()
+            else:
+                print(f'Hit overall timeout while probing target: {entries_handler.config_entry.hostname}')
+                metrics, duration = None, config_handler.system_entry.total_max_scrape_duration
+            if metrics:
+                collected.extend(metrics)
+            probe_records.append({MKTXPConfigKeys.ROUTERBOARD_NAME: entries_handler.module_name,
+                                  MKTXPConfigKeys.ROUTERBOARD_ADDRESS: entries_handler.config_entry.hostname,
+                                  'success': 0 if metrics is None else 1,
+                                  'duration': duration})
+
+        collected.append(BaseCollector.gauge_collector('probe_success', 'Whether the probe of the target succeeded', probe_records, 'success'))
+        collected.append(BaseCollector.gauge_collector('probe_duration_seconds', 'Duration of the probe of the target', probe_records, 'duration'))
+        yield from BaseCollector.merged_families(collected)
+
+    @staticmethod
+    def _probe(probe_handler, scrape_id = None):
+        start = default_timer()
+        try:
+            metrics = probe_handler.probe(scrape_id)
+        except Exception as exc:
+            print(f'Probe failed for target {probe_handler.entries_handler.config_entry.hostname}: {exc}')
+            metrics = None
+        return metrics, default_timer() - start
 
 
+class FilteredCollectorHandler:
+    ''' The selected collectors and router entries of a CollectorHandler, for one filtered scrape
+    '''
+    def __init__(self, collector_handler, collector_IDs = None, router_names = None):
+        self.collector_handler = collector_handler
+        self.collector_IDs = collector_IDs
+        self.router_names = router_names
+
+    def collect(self):
+        yield from self.collector_handler.collect_filtered(self.collector_IDs, self.router_names)
+
 
+CachedCollection = namedtuple('CachedCollection', ['timestamp', 'metrics'])
 
 
+class CollectionInFlight:
+    def __init__(self):
+        self.done = Event()
+        self.metrics = None
+        self.generation = None
@@ -12,8 +12,9 @@
 ## GNU General Public License for more details.
 
 
+from functools import lru_cache
 from collections import OrderedDict
-from mktxp.cli.config.config import CollectorKeys
+from mktxp.cli.config.config import config_handler, CollectorKeys
 from mktxp.collector.dhcp_collector import DHCPCollector
 from mktxp.collector.bridge_vlan_collector import BridgeVlanCollector
 from mktxp.collector.package_collector import PackageCollector
@@ -58,6 +59,13 @@ from mktxp.collector.routerboard_collector import RouterboardCollector
 class CollectorRegistry:
     ''' MKTXP Collectors Registry
     '''
+    # rarely changing data, refreshed every slow_collectors_interval
+    SLOW_COLLECTORS = {CollectorKeys.CONTAINER_COLLECTOR, CollectorKeys.BGP_COLLECTOR, CollectorKeys.ROUTE_COLLECTOR}
+
+    # practically static data, refreshed every static_collectors_interval
+    STATIC_COLLECTORS = {CollectorKeys.IDENTITY_COLLECTOR, CollectorKeys.PACKAGE_COLLECTOR,
+                         CollectorKeys.ROUTERBOARD_COLLECTOR, CollectorKeys.CERTIFICATE_COLLECTOR}
+
     def __init__(self):
         self.registered_collectors = OrderedDict()
 
@@ -117,3 +125,50 @@ class CollectorRegistry:
     def register(self, collector_ID, collect_func):
         self.registered_collectors[collector_ID] = collect_func
 
+    def collector_IDs(self, collector_names):
+        ''' Registered collector IDs by their case-insensitive names, with or without the Collector suffix (e.g. interface, FirewallCollector).
+            Unknown names are returned separately
+        '''
+        registered_names = {}
+        for collector_ID in self.registered_collectors:
+            registered_names[collector_ID.lower()] = collector_ID
+            registered_names[collector_ID.lower()[:-len('collector')]] = collector_ID
+        collector_IDs, unknown_names = [], []
+        for collector_name in collector_names:
+            collector_ID = registered_names.get(collector_name.strip().lower())
+            if collector_ID:
+                collector_IDs.append(collector_ID)
+            else:
+                unknown_names.append(collector_name)
+        return collector_IDs, unknown_names
+
+    def refresh_interval(self, collector_ID, router_entry):
+        ''' Seconds for which the collector's last output can be replayed, 0 to refresh on every scrape
+        '''
+        refresh_intervals = router_entry.config_entry.collector_refresh_intervals
+        if isinstance(refresh_intervals, list):
+            refresh_intervals = tuple(refresh_intervals)
+        refresh_intervals = CollectorRegistry._parse_refresh_intervals(refresh_intervals)
+        if collector_ID in refresh_intervals:
+            return refresh_intervals[collector_ID]
+        if collector_ID in CollectorRegistry.STATIC_COLLECTORS:
+            return config_handler.system_entry.static_collectors_interval
+        if collector_ID in CollectorRegistry.SLOW_COLLECTORS:
+            return config_handler.system_entry.slow_collectors_interval
+        return 0
+
+    @staticmethod
+    @lru_cache(maxsize = 128)
+    def _parse_refresh_intervals(refresh_intervals):
+        if not refresh_intervals or refresh_intervals == 'None':
+            return {}
+
+        items = refresh_intervals.split(',') if isinstance(refresh_intervals, str) else refresh_intervals
+        parsed = {}
+        for item in items:
+            try:
+                collector_ID, interval = item.split(':', 1)
+                parsed[collector_ID.strip()] = int(interval)
+            except ValueError:
+                print(f"Warning: malformed collector refresh interval '{item}', it should be in 'Collector:seconds' format. Ignoring.")
+        return parsed
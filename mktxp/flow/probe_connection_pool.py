@@ -23,6 +23,7 @@ class ProbeConnectionPool:
         self._connection_factory = connection_factory or RouterAPIConnection
         self._lock = Lock()
         self._pool = {}
+        self._router_entries = {}
 
     def get(self, module_name, config_entry):
         key = self._conn_key(module_name, config_entry)
@@ -41,12 +42,25 @@ class ProbeConnectionPool:
             self._pool[key] = (conn, now)
             return conn
 
+    def router_entry(self, module_name, config_entry, entry_factory):
+        ''' The probe router entry of a pooled connection, built once by entry_factory(connection) and evicted along with it
+        '''
+        key = self._conn_key(module_name, config_entry)
+        conn = self.get(module_name, config_entry)
+        with self._lock:
+            router_entry = self._router_entries.get(key)
+            if router_entry is None or router_entry.api_connection is not conn:
+                router_entry = entry_factory(conn)
+                self._router_entries[key] = router_entry
+            return router_entry
+
     def _evict_expired(self, now):
         expired_keys = []
         for key, (conn, last_used) in self._pool.items():
             if self.ttl_seconds and (now - last_used) > self.ttl_seconds:
                 expired_keys.append(key)
         for key in expired_keys:
+            self._router_entries.pop(key, None)
             conn, _ = self._pool.pop(key, (None, None))
             if conn:
                 self._disconnect(conn)
@@ -59,6 +73,7 @@ class ProbeConnectionPool:
                 oldest_ts = last_used
                 oldest_key = key
         if oldest_key is not None:
+            self._router_entries.pop(oldest_key, None)
             conn, _ = self._pool.pop(oldest_key, (None, None))
             if conn:
                 self._disconnect(conn)
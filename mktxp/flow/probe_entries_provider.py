@@ -27,17 +27,22 @@ class ProbeEntriesProvider:
         return (router for router in (entry,))
 
     def _build_entry(self):
-        connection = None
-        keep_connection = False
         if self.connection_pool:
-            connection = self.connection_pool.get(self.module_name, self.config_entry)
-            keep_connection = True
+            # pooled entries are kept along with their connections, so their caches (router facts, slow collectors..) outlive single probes
+            return self.connection_pool.router_entry(
+                self.module_name,
+                self.config_entry,
+                lambda connection: self._new_entry(connection, keep_connection=True),
+            )
+        return self._new_entry()
 
+    def _new_entry(self, connection=None, keep_connection=False):
         entry = ProbeRouterEntry(
             self.module_name,
             self.config_entry,
             api_connection=connection,
             keep_connection=keep_connection,
         )
-        RouterEntriesHandler._set_child_entries(entry)
+        # non-pooled probes disconnect their child entries when done, so those are not shared
+        RouterEntriesHandler._set_child_entries(entry, shared = keep_connection)
         return entry
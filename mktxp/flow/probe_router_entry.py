@@ -11,24 +11,21 @@
 ## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 ## GNU General Public License for more details.
 
-from mktxp.cli.config.config import config_handler, MKTXPConfigKeys
-from mktxp.flow.router_connection import RouterAPIConnection
-from mktxp.flow.router_entry import RouterEntry, RouterEntryWirelessType
+from mktxp.cli.config.config import config_handler
+from mktxp.flow.router_entry import RouterEntry
 
 
 class ProbeRouterEntry(RouterEntry):
     def __init__(self, router_name, config_entry, api_connection=None, keep_connection=False):
-        super().__init__(router_name)
-        self.config_entry = config_entry
-        self.api_connection = api_connection or RouterAPIConnection(router_name, self.config_entry)
+        super().__init__(router_name, config_entry, api_connection)
         self._keep_connection = keep_connection
-        self.router_id[MKTXPConfigKeys.ROUTERBOARD_ADDRESS] = self.config_entry.hostname
 
     def is_done(self):
         if self._keep_connection:
+            self.api_connection.collection_done()
+            self._release_child_entries()
             if not config_handler.system_entry.persistent_dhcp_cache:
-                self._dhcp_records = {}
-            self._wireless_type = RouterEntryWirelessType.NONE
+                self._dhcp_leases.clear()
             return
 
         # Force disconnect for non-pooled probe connections to prevent leaking active user sessions
@@ -17,11 +17,12 @@ from prometheus_client.core import REGISTRY
 from prometheus_client import make_wsgi_app, CollectorRegistry as PrometheusCollectorRegistry
 
 from mktxp.cli.config.config import config_handler
-from mktxp.flow.collector_handler import CollectorHandler, ProbeCollectorHandler
+from mktxp.flow.collector_handler import CollectorHandler, ProbeCollectorHandler, BatchProbeCollectorHandler, FilteredCollectorHandler
 from mktxp.flow.collector_registry import CollectorRegistry as MKTXPCollectorRegistry
 from mktxp.flow.router_entries_handler import RouterEntriesHandler
 from mktxp.flow.probe_connection_pool import ProbeConnectionPool
 from mktxp.flow.probe_entries_provider import ProbeEntriesProvider
+from mktxp.flow.processor.exposition import ExpositionEncoder, ExpositionApp, CachedExpositionApp
 
 from mktxp.cli.output.capsman_out import CapsmanOutput
 from mktxp.cli.output.wifi_out import WirelessOutput
@@ -96,32 +97,35 @@ class ExportProcessor:
     '''    
     @staticmethod
     def start():
-        REGISTRY.register(CollectorHandler(RouterEntriesHandler(), MKTXPCollectorRegistry()))
+        collector_handler = CollectorHandler(RouterEntriesHandler(), MKTXPCollectorRegistry())
+        if config_handler.system_entry.background_collection:
+            if config_handler.system_entry.verbose_mode:
+                print(f'Background metrics collection is On, interval: {config_handler.system_entry.background_collection_interval}s')
+            collector_handler.start_background_collection(config_handler.system_entry.background_collection_interval)
+        REGISTRY.register(collector_handler)
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f'{current_time} Running HTTP metrics server on: {config_handler.system_entry.listen}')
 
-        metrics_app = make_wsgi_app()
-        app = MetricsRouter(metrics_app)
-        if config_handler.system_entry.prometheus_headers_deduplication:
-            if config_handler.system_entry.verbose_mode:
-                print(f"Prometheus HELP / TYPE headers de-deplucation is On")
-            middleware = PrometheusHeadersDeduplicatingMiddleware(app)
-            serve(
-                middleware,
-                listen = config_handler.system_entry.listen,
-                threads = config_handler.system_entry.http_server_threads
-            )
-        else:
-            serve(
-                app,
-                listen = config_handler.system_entry.listen,
-                threads = config_handler.system_entry.http_server_threads
-            )
+        metrics_app = MetricsRouter.metrics_app(REGISTRY, collector_handler)
+        app = MetricsRouter(metrics_app, collector_handler)
+        # HELP / TYPE headers are unique by now, as CollectorHandler merges same named metric families,
+        # so prometheus_headers_deduplication no longer needs an extra pass over the output
+        serve(
+            app,
+            listen = config_handler.system_entry.listen,
+            threads = config_handler.system_entry.http_server_threads
+        )
 
 
 class MetricsRouter:
-    def __init__(self, metrics_app):
+    MAX_CACHED_PROBE_CONFIG_ENTRIES = 4096
+
+    def __init__(self, metrics_app, collector_handler = None):
         self.metrics_app = metrics_app
+        self.collector_handler = collector_handler
+        # probe config entries by (module, target), and the collectors registry shared by all probes
+        self._probe_config_entries = {}
+        self._probe_collector_registry = None
         self.probe_connection_pool = None
         if config_handler.system_entry.probe_connection_pool:
             self.probe_connection_pool = ProbeConnectionPool(
@@ -133,20 +137,37 @@ class MetricsRouter:
         path = environ.get('PATH_INFO', '')
         if path == '/probe':
             return self._handle_probe(environ, start_response)
+        if path == '/probe/batch':
+            return self._handle_batch_probe(environ, start_response)
+        if self.collector_handler:
+            query = parse_qs(environ.get('QUERY_STRING', ''))
+            if 'collect[]' in query or 'router' in query:
+                return self._handle_filtered(environ, start_response, query)
         return self.metrics_app(environ, start_response)
 
+    def _handle_filtered(self, environ, start_response, query):
+        ''' Scrapes of selected collectors (?collect[]=interface&collect[]=firewall) and / or routers (?router=<name>),
+            collected on request
+        '''
+        collector_IDs, unknown_collectors = self.collector_handler.collector_registry.collector_IDs(query.get('collect[]', []))
+        if unknown_collectors:
+            return self._error(start_response, f"Unknown collectors: {', '.join(unknown_collectors)}")
+
+        router_names = [router_name.strip() for router_names in query.get('router', []) for router_name in router_names.split(',') if router_name.strip()]
+        known_router_names = {router_entry.router_name for router_entry in self.collector_handler.entries_handler.router_entries}
+        unknown_routers = [router_name for router_name in router_names if router_name not in known_router_names]
+        if unknown_routers:
+            return self._error(start_response, f"Unknown or disabled routers: {', '.join(unknown_routers)}")
+
+        registry = PrometheusCollectorRegistry()
+        registry.register(FilteredCollectorHandler(self.collector_handler, collector_IDs, router_names))
+        return MetricsRouter.metrics_app(registry)(environ, start_response)
+
     def _handle_probe(self, environ, start_response):
         query = parse_qs(environ.get('QUERY_STRING', ''), keep_blank_values=True)
-        modules = query.get('module', [])
-        if len(modules) != 1 or not modules[0].strip():
-            return self._error(start_response, "Missing or invalid 'module' parameter")
-
-        module = modules[0].strip()
-        if not config_handler.registered_entry(module):
-            return self._error(start_response, f"Unknown module '{module}'")
-        config_entry = config_handler.config_entry(module)
-        if not config_entry or not config_entry.enabled:
-            return self._error(start_response, f"Module '{module}' is disabled")
+        module, config_entry, error = self._probe_module(query)
+        if error:
+            return self._error(start_response, error)
 
         targets = query.get('target', [])
         if len(targets) > 1:
@@ -158,22 +179,96 @@ class MetricsRouter:
         if config_entry.module_only and not target:
             return self._error(start_response, f"Module '{module}' requires a target override")
 
-        config_override = config_entry._replace(hostname=target) if target else None
         probe_entries = ProbeEntriesProvider(
             module,
-            config_override or config_entry,
+            self._probe_config_entry(module, target) if target else config_entry,
             connection_pool=self.probe_connection_pool,
         )
+        # only the collector handler and its registry are per probe, for the collection state
         registry = PrometheusCollectorRegistry()
         registry.register(
             ProbeCollectorHandler(
                 probe_entries,
-                MKTXPCollectorRegistry(),
+                self._probe_collectors(),
             )
         )
-        probe_app = make_wsgi_app(registry=registry)
+        probe_app = MetricsRouter.metrics_app(registry)
         return self._safe_probe_response(probe_app, environ, start_response, module, target)
 
+    def _handle_batch_probe(self, environ, start_response):
+        ''' Probes a list of targets of one module concurrently (/probe/batch?module=X&target=a&target=b,c),
+            into one exposition with the per target mktxp_probe_success
+        '''
+        query = parse_qs(environ.get('QUERY_STRING', ''), keep_blank_values=True)
+        module, config_entry, error = self._probe_module(query)
+        if error:
+            return self._error(start_response, error)
+
+        targets = []
+        for target_list in query.get('target', []):
+            for target in target_list.split(','):
+                target = target.strip()
+                if target and target not in targets:
+                    targets.append(target)
+        if not targets:
+            return self._error(start_response, "Missing 'target' parameters")
+
+        probe_entries = [
+            ProbeEntriesProvider(
+                module,
+                self._probe_config_entry(module, target),
+                connection_pool=self.probe_connection_pool,
+            )
+            for target in targets
+        ]
+        registry = PrometheusCollectorRegistry()
+        registry.register(BatchProbeCollectorHandler(probe_entries, self._probe_collectors()))
+        probe_app = MetricsRouter.metrics_app(registry)
+        return self._safe_probe_response(probe_app, environ, start_response, module, None)
+
+    def _probe_module(self, query):
+        ''' The probed module and its config entry, or an error message
+        '''
+        modules = query.get('module', [])
+        if len(modules) != 1 or not modules[0].strip():
+            return None, None, "Missing or invalid 'module' parameter"
+
+        module = modules[0].strip()
+        if not config_handler.registered_entry(module):
+            return module, None, f"Unknown module '{module}'"
+        config_entry = self._probe_config_entry(module)
+        if not config_entry or not config_entry.enabled:
+            return module, None, f"Module '{module}' is disabled"
+        return module, config_entry, None
+
+    def _probe_collectors(self):
+        if self._probe_collector_registry is None:
+            self._probe_collector_registry = MKTXPCollectorRegistry()
+        return self._probe_collector_registry
+
+    def _probe_config_entry(self, module, target = None):
+        ''' Probe config entries, with the target override applied, are built once as the config does not change while running
+        '''
+        key = (module, target)
+        config_entry = self._probe_config_entries.get(key)
+        if config_entry is None:
+            config_entry = config_handler.config_entry(module)
+            if config_entry and target:
+                config_entry = config_entry._replace(hostname=target)
+            if len(self._probe_config_entries) >= MetricsRouter.MAX_CACHED_PROBE_CONFIG_ENTRIES:
+                self._probe_config_entries = {}
+            self._probe_config_entries[key] = config_entry
+        return config_entry
+
+    @staticmethod
+    def metrics_app(registry, collector_handler = None):
+        if collector_handler and config_handler.system_entry.scrape_response_cache:
+            encode = ExpositionEncoder().encode if config_handler.system_entry.direct_exposition_encoder else None
+            return CachedExpositionApp(registry, collector_handler, encode)
+        if config_handler.system_entry.direct_exposition_encoder:
+            return ExpositionApp(registry)
+        return make_wsgi_app(registry=registry)
+
     @staticmethod
     def _error(start_response, message):
         body = f'Error: {message}\n'.encode('utf-8')
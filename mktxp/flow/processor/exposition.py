@@ -0,0 +1,235 @@
+# coding=utf8
+## Copyright (c) 2020 Arseniy Kuznetsov
+##
+## This program is free software; you can redistribute it and/or
+## modify it under the terms of the GNU General Public License
+## as published by the Free Software Foundation; either version 2
+## of the License, or (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+
+import re
+import gzip
+from threading import Lock
+from collections import namedtuple
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+from prometheus_client import make_wsgi_app, generate_latest
+from prometheus_client.utils import floatToGoString
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CONTENT_TYPE_TEXT = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class ExpositionEncoder:
+    ''' Prometheus text format encoder, writing the metric families straight into text.
+        Families keeping their samples as rows (see BaseCollector) are encoded without materialising any samples,
+        escaped label pairs are cached as most label values (router names, addresses, interfaces) are stable between scrapes
+    '''
+    MAX_CACHED_LABEL_PAIRS = 100000
+
+    def __init__(self):
+        self._label_pairs = {}
+        self._label_names = {}
+
+    def encode(self, metric_families):
+        return ''.join(self.write(metric_families)).encode('utf-8')
+
+    def write(self, metric_families):
+        ''' Yields the text chunks of the metric families, one per family
+        '''
+        if len(self._label_pairs) > ExpositionEncoder.MAX_CACHED_LABEL_PAIRS:
+            self._label_pairs = {}
+        for metric_family in metric_families:
+            yield self._family_text(metric_family)
+
+    def _family_text(self, metric_family):
+        name, type = metric_family.name, metric_family.type
+        # OpenMetrics to Prometheus text format naming
+        if type == 'counter':
+            name = f'{name}_total'
+        elif type == 'info':
+            name, type = f'{name}_info', 'gauge'
+        elif type == 'stateset':
+            type = 'gauge'
+        elif type == 'gaugehistogram':
+            type = 'histogram'
+        elif type == 'unknown':
+            type = 'untyped'
+
+        documentation = metric_family.documentation.replace('\\', r'\\').replace('\n', r'\n')
+        lines = [f'# HELP {name} {documentation}\n# TYPE {name} {type}\n']
+        rows = getattr(metric_family, 'rows', None)
+        if rows is not None:
+            self._write_rows(lines, name, metric_family._labelnames, rows)
+
+        om_samples = {}
+        for sample in metric_family.samples if rows is None else metric_family.extra_samples:
+            for suffix in ('_created', '_gsum', '_gcount'):
+                if sample.name == metric_family.name + suffix:
+                    om_samples.setdefault(suffix, []).append(self._sample_line(sample))
+                    break
+            else:
+                lines.append(self._sample_line(sample))
+        for suffix, sample_lines in sorted(om_samples.items()):
+            lines.append(f'# HELP {metric_family.name}{suffix} {documentation}\n# TYPE {metric_family.name}{suffix} gauge\n')
+            lines.extend(sample_lines)
+        return ''.join(lines)
+
+    def _write_rows(self, lines, name, label_names, rows):
+        # labels are written sorted by name
+        order = sorted(range(len(label_names)), key = lambda index: label_names[index])
+        names = [label_names[index] for index in order]
+        label_pair = self._label_pair
+        for label_values, value in rows:
+            if names:
+                label_pairs = ','.join([label_pair(label_name, label_values[index]) for label_name, index in zip(names, order)])
+                lines.append(f'{name}{{{label_pairs}}} {floatToGoString(value)}\n')
+            else:
+                lines.append(f'{name} {floatToGoString(value)}\n')
+
+    def _sample_line(self, sample):
+        label_pairs = ','.join([self._label_pair(label_name, label_value) for label_name, label_value in sorted(sample.labels.items())])
+        timestamp = f' {int(float(sample.timestamp) * 1000):d}' if sample.timestamp is not None else ''
+        if label_pairs:
+            return f'{sample.name}{{{label_pairs}}} {floatToGoString(sample.value)}{timestamp}\n'
+        return f'{sample.name} {floatToGoString(sample.value)}{timestamp}\n'
+
+    def _label_pair(self, label_name, label_value):
+        key = (label_name, label_value)
+        label_pair = self._label_pairs.get(key)
+        if label_pair is None:
+            label_value = str(label_value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+            label_pair = self._label_pairs[key] = f'{self._label_name(label_name)}="{label_value}"'
+        return label_pair
+
+    def _label_name(self, label_name):
+        escaped_name = self._label_names.get(label_name)
+        if escaped_name is None:
+            escaped_name = re.sub(r'[^a-zA-Z0-9_]', '_', label_name)
+            if escaped_name[:1].isdigit():
+                escaped_name = f'_{escaped_name[1:]}'
+            self._label_names[label_name] = escaped_name
+        return escaped_name
+
+
+class ExpositionApp:
+    ''' WSGI app serving a registry through the ExpositionEncoder, in the Prometheus text format
+    '''
+    def __init__(self, registry, encoder = None):
+        self.registry = registry
+        self.encoder = encoder or ExpositionEncoder()
+        self._fallback_app = make_wsgi_app(registry)
+
+    def __call__(self, environ, start_response):
+        params = parse_qs(environ.get('QUERY_STRING', ''))
+        if 'name[]' in params:
+            # filtered output is left to prometheus_client
+            return self._fallback_app(environ, start_response)
+
+        output = self.encoder.encode(self.registry.collect())
+        headers = [('Content-Type', CONTENT_TYPE_TEXT)]
+        if 'gzip' in environ.get('HTTP_ACCEPT_ENCODING', ''):
+            output = gzip.compress(output)
+            headers.append(('Content-Encoding', 'gzip'))
+        headers.append(('Content-Length', str(len(output))))
+        start_response('200 OK', headers)
+        return [output]
+
+
+CachedResponse = namedtuple('CachedResponse', ['generation', 'bodies'])
+
+class CachedExpositionApp:
+    ''' WSGI app serving the metrics from one encoded response per CollectorHandler metrics snapshot.
+        The identity, gzip and (with the zstandard module installed) zstd bodies of the CollectorHandler metrics are made
+        once per snapshot generation, so repeated and concurrent scrapes are served from memory by their Accept-Encoding.
+        The registry's other collectors (process, platform, gc..) are encoded fresh on every scrape and prepended,
+        gzip members and zstd frames can be concatenated
+    '''
+    # by preference
+    CONTENT_ENCODINGS = ('zstd', 'gzip', 'identity')
+
+    def __init__(self, registry, collector_handler, encode = None):
+        self.registry = registry
+        self.collector_handler = collector_handler
+        self.encode = encode or CachedExpositionApp.prometheus_client_encode
+        self._fallback_app = make_wsgi_app(registry)
+        self._response = None
+        self._lock = Lock()
+
+    def __call__(self, environ, start_response):
+        params = parse_qs(environ.get('QUERY_STRING', ''))
+        if 'name[]' in params:
+            # filtered output is left to prometheus_client
+            return self._fallback_app(environ, start_response)
+
+        fresh_families = [metric_family for collector in self._fresh_collectors() for metric_family in collector.collect()]
+        metric_families = list(self.collector_handler.collect())
+        generation = self.collector_handler.served_generation
+        with self._lock:
+            response = self._response
+            if generation is None or response is None or response.generation != generation:
+                response = CachedResponse(generation, CachedExpositionApp.encoded_bodies(self.encode(metric_families)))
+                # a scrape finishing late never replaces a newer snapshot
+                if generation is not None and (self._response is None or generation > self._response.generation):
+                    self._response = response
+
+        content_encoding = CachedExpositionApp.content_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''), response.bodies)
+        output = response.bodies[content_encoding]
+        if fresh_families:
+            output = CachedExpositionApp.compressed(self.encode(fresh_families), content_encoding) + output
+        headers = [('Content-Type', CONTENT_TYPE_TEXT), ('Vary', 'Accept-Encoding')]
+        if content_encoding != 'identity':
+            headers.append(('Content-Encoding', content_encoding))
+        headers.append(('Content-Length', str(len(output))))
+        start_response('200 OK', headers)
+        return [output]
+
+    def _fresh_collectors(self):
+        # prometheus_client has no public way to list the registered collectors
+        with self.registry._lock:
+            return [collector for collector in self.registry._collector_to_names if collector is not self.collector_handler]
+
+    @staticmethod
+    def encoded_bodies(output):
+        bodies = {'identity': output, 'gzip': CachedExpositionApp.compressed(output, 'gzip')}
+        if zstandard:
+            bodies['zstd'] = CachedExpositionApp.compressed(output, 'zstd')
+        return bodies
+
+    @staticmethod
+    def compressed(output, content_encoding):
+        if content_encoding == 'gzip':
+            return gzip.compress(output)
+        if content_encoding == 'zstd':
+            return zstandard.ZstdCompressor().compress(output)
+        return output
+
+    @staticmethod
+    def content_encoding(accept_encoding, bodies):
+        accepted = set()
+        for accepted_encoding in accept_encoding.split(','):
+            encoding, _, params = accepted_encoding.strip().partition(';')
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    if float(params[2:]) <= 0:
+                        continue
+                except ValueError:
+                    continue
+            accepted.add(encoding.strip().lower())
+        for encoding in CachedExpositionApp.CONTENT_ENCODINGS:
+            if encoding in bodies and (encoding in accepted or '*' in accepted):
+                return encoding
+        return 'identity'
+
+    @staticmethod
+    def prometheus_client_encode(metric_families):
+        return generate_latest(SimpleNamespace(collect = lambda: metric_families))
@@ -0,0 +1,341 @@
+# coding=utf8
+## Copyright (c) 2020 Arseniy Kuznetsov
+##
+## This program is free software; you can redistribute it and/or
+## modify it under the terms of the GNU General Public License
+## as published by the Free Software Foundation; either version 2
+## of the License, or (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+
+
+import asyncio
+import binascii
+import hashlib
+from queue import SimpleQueue
+from threading import Lock, Thread
+
+from routeros_api import api_structure, exceptions
+from routeros_api.api_socket import set_keepalive
+from routeros_api.api_communicator.base import AsynchronousResponse
+from routeros_api.api_communicator.key_cleaner_decorator import encode_key, decode_key
+from routeros_api.base_api import encode_length
+from routeros_api.resource import clean_path
+from routeros_api.sentence import ResponseSentence
+
+
+class AsyncioEventLoopThread:
+    ''' A single event loop, running in a daemon thread and shared by all asyncio router sessions
+    '''
+    _loop = None
+    _lock = Lock()
+
+    @classmethod
+    def loop(cls):
+        with cls._lock:
+            if cls._loop is None or cls._loop.is_closed():
+                cls._loop = asyncio.new_event_loop()
+                Thread(target = cls._loop.run_forever, name = 'mktxp-asyncio-api', daemon = True).start()
+            return cls._loop
+
+    @classmethod
+    def submit(cls, coro):
+        return asyncio.run_coroutine_threadsafe(coro, cls.loop())
+
+    @classmethod
+    def run(cls, coro):
+        return cls.submit(coro).result()
+
+
+class AsyncRouterOsProtocol:
+    ''' Native asyncio implementation of the RouterOS API sentence protocol.
+        Requests are tagged, so any number of them can be in flight on a single session
+        with the responses demultiplexed by a reader task.
+    '''
+    def __init__(self, reader, writer, timeout):
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+        self.closed = False
+        self._tag = 0
+        self._pending = {}
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+
+    @classmethod
+    async def open(cls, host, port, ssl_context = None, timeout = 15.0):
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port, ssl = ssl_context, server_hostname = host if ssl_context else None),
+                timeout)
+        except (OSError, asyncio.TimeoutError) as exc:
+            raise exceptions.RouterOsApiConnectionError(exc)
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            set_keepalive(sock, after_idle_sec = 10)
+        return cls(reader, writer, timeout)
+
+    async def login(self, username, password, plaintext_login):
+        if isinstance(username, str):
+            username = username.encode()
+        if isinstance(password, str):
+            password = password.encode()
+        if plaintext_login:
+            response = await self.call(b'/', b'login', {b'name': username, b'password': password})
+        else:
+            response = await self.call(b'/', b'login')
+        if b'ret' in response.done_message:
+            # pre-v6.43 challenge-response login
+            token = binascii.unhexlify(response.done_message[b'ret'])
+            hasher = hashlib.md5()
+            hasher.update(b'\x00')
+            hasher.update(password)
+            hasher.update(token)
+            await self.call(b'/', b'login', {b'name': username, b'response': b'00' + hasher.hexdigest().encode('ascii')})
+
+    async def call(self, path, command, arguments = None, queries = None, rows = None):
+        ''' With a rows queue, the response records are handed over as they arrive and
+            the queue is closed with a None sentinel once the command completes
+        '''
+        if self.closed:
+            if rows is not None:
+                rows.put(None)
+            raise exceptions.RouterOsApiConnectionClosedError('Connection to router is closed')
+        self._tag += 1
+        tag = str(self._tag).encode()
+
+        words = [path + command]
+        for key, value in (arguments or {}).items():
+            words.append(b'=' + key + (b'=' + value if value else b''))
+        for key, value in (queries or {}).items():
+            words.append(b'?' + key + b'=' + (value or b''))
+        words.append(b'.tag=' + tag)
+
+        response = AsynchronousResponse(command = b' '.join(words[:-1]))
+        future = asyncio.get_running_loop().create_future()
+        self._pending[tag] = (response, future, rows)
+        try:
+            self.writer.write(b''.join(encode_length(len(word)) + word for word in words + [b'']))
+            await self.writer.drain()
+        except OSError as exc:
+            self._close(exceptions.RouterOsApiConnectionError(str(exc)))
+        return await future
+
+    def close(self):
+        self._close(exceptions.RouterOsApiConnectionClosedError('Connection to router is closed'))
+
+    def _close(self, exc):
+        if self.closed:
+            return
+        self.closed = True
+        for _, future, rows in self._pending.values():
+            if rows is not None:
+                rows.put(None)
+            if not future.done():
+                future.set_exception(exc)
+        self._pending.clear()
+        self._reader_task.cancel()
+        self.writer.close()
+
+    async def _read_loop(self):
+        try:
+            while True:
+                try:
+                    # waiting for the first byte of a sentence can be safely interrupted
+                    first = await asyncio.wait_for(self.reader.readexactly(1), self.timeout)
+                except asyncio.TimeoutError:
+                    if self._pending:
+                        raise
+                    continue
+                words = await asyncio.wait_for(self._read_sentence(first), self.timeout)
+                if words:
+                    self._dispatch(ResponseSentence.parse(words))
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            self._close(exceptions.RouterOsApiConnectionError('Timed out waiting for router response'))
+        except (OSError, asyncio.IncompleteReadError) as exc:
+            self._close(exceptions.RouterOsApiConnectionClosedError(str(exc)))
+        except exceptions.RouterOsApiError as exc:
+            self._close(exc)
+
+    async def _read_sentence(self, first):
+        words = []
+        while True:
+            word = await self._read_word(first)
+            first = None
+            if not word:
+                return words
+            words.append(word)
+
+    async def _read_word(self, first = None):
+        first = first[0] if first else (await self.reader.readexactly(1))[0]
+        if first < 0x80:
+            length, extra = first, 0
+        elif first < 0xC0:
+            length, extra = first & 0x3F, 1
+        elif first < 0xE0:
+            length, extra = first & 0x1F, 2
+        elif first < 0xF0:
+            length, extra = first & 0x0F, 3
+        elif first == 0xF0:
+            length, extra = 0, 4
+        else:
+            raise exceptions.FatalRouterOsApiError('Malformed length')
+        if extra:
+            for byte in await self.reader.readexactly(extra):
+                length = (length << 8) | byte
+        return await self.reader.readexactly(length) if length else b''
+
+    def _dispatch(self, sentence):
+        if sentence.tag not in self._pending:
+            message = sentence.attributes.get(b'message', b'').decode(errors = 'replace')
+            raise exceptions.FatalRouterOsApiError(f'Unexpected response from router: {sentence.type.decode()} {message}')
+
+        response, future, rows = self._pending[sentence.tag]
+        if sentence.type == b're':
+            if rows is not None:
+                rows.put(sentence.attributes)
+            else:
+                response.append(sentence.attributes)
+        elif sentence.type == b'trap':
+            response.error = sentence.attributes.get(b'message', b'')
+        elif sentence.type == b'done':
+            del self._pending[sentence.tag]
+            response.done = True
+            response.done_message = sentence.attributes
+            if rows is not None:
+                rows.put(None)
+            if response.error:
+                future.set_exception(response.error_as_exception)
+            else:
+                future.set_result(response)
+        elif sentence.type == b'fatal':
+            del self._pending[sentence.tag]
+            if rows is not None:
+                rows.put(None)
+            future.set_exception(exceptions.RouterOsApiFatalCommunicationError(
+                f'Fatal error executing command {response.command}'))
+
+
+class AsyncioRouterOsApiPool:
+    ''' Drop-in replacement for routeros_api.RouterOsApiPool backed by AsyncRouterOsProtocol
+    '''
+    socket_timeout = 15.0
+
+    def __init__(self, host, username = 'admin', password = '', port = None, plaintext_login = False, ssl_context = None):
+        self.host = host
+        self.username = username
+        self.password = password
+        self.port = port or (8729 if ssl_context else 8728)
+        self.plaintext_login = plaintext_login
+        self.ssl_context = ssl_context
+        self.api = None
+        self._protocol = None
+
+    @property
+    def connected(self):
+        return self._protocol is not None and not self._protocol.closed
+
+    def get_api(self):
+        if not self.connected:
+            self._protocol = AsyncioEventLoopThread.run(self._open())
+            self.api = AsyncioRouterOsApi(self._protocol)
+        return self.api
+
+    def disconnect(self):
+        if self._protocol:
+            AsyncioEventLoopThread.loop().call_soon_threadsafe(self._protocol.close)
+        self._protocol = None
+
+    async def _open(self):
+        protocol = await AsyncRouterOsProtocol.open(self.host, self.port, self.ssl_context, self.socket_timeout)
+        try:
+            await protocol.login(self.username, self.password, self.plaintext_login)
+        except Exception:
+            protocol.close()
+            raise
+        return protocol
+
+
+class AsyncioRouterOsApi:
+    def __init__(self, protocol):
+        self.protocol = protocol
+
+    def get_resource(self, path, structure = None):
+        return AsyncioRouterOsResource(self.protocol, path, structure if structure is not None else api_structure.default_structure)
+
+
+class AsyncioRouterOsResource:
+    ''' Synchronous facade matching routeros_api.resource.RouterOsResource,
+        the actual I/O runs on the shared event loop
+    '''
+    def __init__(self, protocol, path, structure):
+        self.protocol = protocol
+        self.path = clean_path(path)
+        self.structure = structure
+
+    def get(self, **kwargs):
+        return self.call('print', {}, kwargs)
+
+    def get_async(self, **kwargs):
+        return self.call_async('print', {}, kwargs)
+
+    def call(self, command, arguments = None, queries = None):
+        return self.call_async(command, arguments, queries).get()
+
+    def call_async(self, command, arguments = None, queries = None):
+        rows = SimpleQueue()
+        future = AsyncioEventLoopThread.submit(
+            self.protocol.call(self.path.encode(), command.encode(), self._encode(arguments), self._encode(queries), rows))
+        return AsyncioResponsePromise(future, rows, self.structure)
+
+    def _encode(self, dictionary):
+        return {encode_key(key.encode()): None if value is None else self.structure[key].get_mikrotik_value(value)
+                    for key, value in (dictionary or {}).items()}
+
+
+class AsyncioResponsePromise:
+    ''' Response records are queued by the event loop as they arrive,
+        so iterating a promise streams them instead of waiting for the whole response
+    '''
+    def __init__(self, future, rows, structure):
+        self.future = future
+        self.rows = rows
+        self.structure = structure
+        self.response = None
+
+    def get(self):
+        if self.response is None:
+            records = list(self._received())
+            response = self.future.result()
+            response.extend(records)
+            self.response = response.map(self._decode)
+        return self.response
+
+    def __iter__(self):
+        if self.response is not None:
+            return iter(self.response)
+        return self._stream()
+
+    def _stream(self):
+        for row in self._received():
+            yield self._decode(row)
+        # raises the command error, if any
+        self.future.result()
+
+    def _received(self):
+        while True:
+            row = self.rows.get()
+            if row is None:
+                return
+            yield row
+
+    def _decode(self, row):
+        decoded = {}
+        for key, value in row.items():
+            key = decode_key(key).decode()
+            decoded[key] = None if value is None else self.structure[key].get_python_value(value)
+        return decoded
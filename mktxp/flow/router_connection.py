@@ -15,10 +15,12 @@
 import ssl
 import socket
 import collections
+from collections import namedtuple
 from datetime import datetime
 from mktxp.cli.config.config import config_handler
 import functools
 import yaml
+from threading import RLock
 
 # 🐒🐒 MONKEY PATCH ZONE 🐒🐒
 # 1. The RouterOS-api implicitly assumes that the API response is UTF-8 encoded,
@@ -59,8 +61,26 @@ def _patched_receive(self, tag):
         return response
 routeros_api.api_communicator.base.ApiCommunicatorBase.receive = _patched_receive
 
+# 4. The upstream library's response iterator keeps every consumed row in the response buffer,
+#    so iterating a large table still ends up holding all of it in memory.
+#    Monkey-patching it to hand over the rows as they arrive, dropping them from the buffer.
+def _patched_iterator_next(self):
+    response_buffor_manager = self.response_buffor_manager
+    response = response_buffor_manager.response
+    while not response and not response_buffor_manager.done:
+        response_buffor_manager.step_to_finish_response()
+    if response:
+        return response.pop(0)
+    response_buffor_manager.clean()
+    if response.error:
+        raise response.error_as_exception
+    raise StopIteration
+routeros_api.api_communicator.base.AsynchronousResponseIterator.__next__ = _patched_iterator_next
+
 # done with patching hopefully, moving on
 from routeros_api import RouterOsApiPool
+from routeros_api.resource import clean_path
+from mktxp.flow.router_asyncio_api import AsyncioRouterOsApiPool
 
 class RouterAPIConnectionError(Exception):
     pass
@@ -74,9 +94,44 @@ def check_connected(func):
             return func(self, *args, **kwargs)
     return wrapper
 
+APIRequest = namedtuple('APIRequest', ['path', 'command', 'arguments', 'queries'])
+
+class CollectionRouterAPI:
+    ''' Router API wrapper, routing resource calls through the RouterAPIConnection collection scope
+    '''
+    def __init__(self, api_connection, api):
+        self.api_connection = api_connection
+        self.api = api
+
+    def get_resource(self, path, structure = None):
+        resource = self.api.get_resource(path, structure)
+        if structure is not None:
+            return resource
+        return CollectionRouterResource(self.api_connection, resource)
+
+    def __getattr__(self, name):
+        return getattr(self.api, name)
+
+class CollectionRouterResource:
+    def __init__(self, api_connection, resource):
+        self.api_connection = api_connection
+        self.resource = resource
+
+    def get(self, **kwargs):
+        return self.call('print', {}, kwargs)
+
+    def call(self, command, arguments = None, queries = None):
+        return self.api_connection.collection_call(self.resource, command, arguments, queries)
+
+    def __getattr__(self, name):
+        return getattr(self.resource, name)
+
 class RouterAPIConnection:
     ''' Base wrapper interface for the routeros_api library
     '''
+    # large tables (connections, address lists) are not kept around for the whole collection
+    MAX_COALESCED_RESPONSE_ROWS = 1000
+
     def __init__(self, router_name, config_entry):
         self.router_name = router_name
         self.config_entry = config_entry
@@ -96,7 +151,8 @@ class RouterAPIConnection:
                 username = credentials.get('username', username)
                 password = credentials.get('password', password)
 
-        self.connection = RouterOsApiPool(
+        api_pool = AsyncioRouterOsApiPool if config_handler.system_entry.asyncio_api_transport else RouterOsApiPool
+        self.connection = api_pool(
                 host = self.config_entry.hostname,
                 username = username,
                 password = password,
@@ -107,6 +163,16 @@ class RouterAPIConnection:
         self.connection.socket_timeout = config_handler.system_entry.socket_timeout
         self.api = None
 
+        # connections of remote DHCP / CAPsMAN entries are shared by router entries collected in parallel
+        self.lock = RLock()
+
+        # collection scope state
+        self._in_collection = False
+        self._request_plan = []
+        self._requested = {}
+        self._prefetched = {}
+        self._responses = {}
+
     def _build_ssl_context(self):
         if not self.config_entry.use_ssl:
             return None
@@ -155,8 +221,84 @@ class RouterAPIConnection:
 
     @check_connected
     def router_api(self):
+        if self._in_collection:
+            return CollectionRouterAPI(self, self.api)
         return self.api
 
+    @check_connected
+    def pipeline(self, requests):
+        ''' Sends all requests as tagged commands in one burst, then collects the replies.
+            Returns the responses in the requests order, with exceptions in place of failed requests.
+        '''
+        with self.lock:
+            promises = []
+            for request in requests:
+                try:
+                    resource = self.api.get_resource(request.path)
+                    promises.append(resource.call_async(request.command, dict(request.arguments), dict(request.queries)))
+                except Exception as exc:
+                    promises.append(exc)
+
+            responses = []
+            for promise in promises:
+                if isinstance(promise, Exception):
+                    responses.append(promise)
+                    continue
+                try:
+                    responses.append(promise.get())
+                except Exception as exc:
+                    responses.append(exc)
+            return responses
+
+    @check_connected
+    def stream(self, path, command = 'print', arguments = None, queries = None):
+        ''' Yields the response records as they arrive, without buffering the whole response.
+            Meant for very large tables, so bypasses the collection scope. The generator should be exhausted.
+        '''
+        with self.lock:
+            yield from self.api.get_resource(path).call_async(command, arguments, queries)
+
+    def start_collection(self, prefetch = False):
+        ''' Opens a collection scope: until collection_done(), identical API requests hit the router only once.
+            With prefetch, all requests issued during the previous collection are pipelined upfront.
+        '''
+        self._requested = {}
+        self._prefetched = {}
+        self._responses = {}
+        if prefetch and self._request_plan and self.is_connected():
+            self._prefetched = dict(zip(self._request_plan, self.pipeline(self._request_plan)))
+        self._in_collection = True
+
+    def collection_done(self):
+        if self._in_collection:
+            # only keep requesting what was actually asked for during this collection
+            self._request_plan = list(self._requested)
+        self._in_collection = False
+        self._requested = {}
+        self._prefetched = {}
+        self._responses = {}
+
+    def collection_call(self, resource, command, arguments = None, queries = None):
+        request = APIRequest(clean_path(resource.path), command,
+                             tuple(sorted((arguments or {}).items())), tuple(sorted((queries or {}).items())))
+        with self.lock:
+            response = self._responses.get(request)
+            if response is None:
+                self._requested[request] = None
+                response = self._prefetched.pop(request, None)
+                if response is None:
+                    try:
+                        response = resource.call(command, arguments, queries)
+                    except Exception as exc:
+                        response = exc
+                if isinstance(response, Exception) or len(response) <= RouterAPIConnection.MAX_COALESCED_RESPONSE_ROWS:
+                    self._responses[request] = response
+
+        if isinstance(response, Exception):
+            raise response
+        # callers are free to modify the records they get
+        return response.map(dict) if hasattr(response, 'map') else [dict(record) for record in response]
+
     def _in_connect_timeout(self, connect_timestamp):
         connect_delay = self._connect_delay()
         if (connect_timestamp - self.last_failure_timestamp) < connect_delay:
@@ -11,6 +11,7 @@
 ## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 ## GNU General Public License for more details.
 
+from threading import Lock
 from mktxp.cli.config.config import config_handler
 from mktxp.flow.router_entry import RouterEntry
 from mktxp.flow.router_connection import RouterAPIConnectionError
@@ -18,6 +19,10 @@ from mktxp.flow.router_connection import RouterAPIConnectionError
 class RouterEntriesHandler:
     ''' Handles RouterOS entries defined in MKTXP config 
     '''
+    # remote DHCP / CAPsMAN entries by name, shared by all router entries referencing them
+    _shared_child_entries = {}
+    _shared_child_entries_lock = Lock()
+
     def __init__(self):
         self._router_entries = {}
         for router_name in config_handler.registered_entries():
@@ -52,17 +57,29 @@ class RouterEntriesHandler:
         return router_entry
 
     @staticmethod
-    def _set_child_entries(router_entry):
+    def _set_child_entries(router_entry, shared = True):
+        child_entry = RouterEntriesHandler._shared_child_entry if shared else RouterEntry
         if router_entry.config_entry.remote_dhcp_entry and config_handler.registered_entry(router_entry.config_entry.remote_dhcp_entry):
-            router_entry.dhcp_entry = RouterEntry(router_entry.config_entry.remote_dhcp_entry)        
+            router_entry.dhcp_entry = child_entry(router_entry.config_entry.remote_dhcp_entry)
         else:
             remote_dhcp_entry_name = router_entry.config_entry.remote_dhcp_entry
             if remote_dhcp_entry_name != 'None':
                 print(f"Error in configuration for {router_entry.router_name}: remote_dhcp_entry must a name of another router entry or 'None', but it is '{remote_dhcp_entry_name}'. Ignoring.")
 
         if router_entry.config_entry.remote_capsman_entry and config_handler.registered_entry(router_entry.config_entry.remote_capsman_entry):
-            router_entry.capsman_entry = RouterEntry(router_entry.config_entry.remote_capsman_entry)       
+            router_entry.capsman_entry = child_entry(router_entry.config_entry.remote_capsman_entry)
         else:
             remote_capsman_entry_name = router_entry.config_entry.remote_capsman_entry
             if remote_capsman_entry_name != 'None':
                 print(f"Error in configuration for {router_entry.router_name}: remote_capsman_entry must a name of another router entry or 'None', but it is '{remote_capsman_entry_name}'. Ignoring.")
+
+    @staticmethod
+    def _shared_child_entry(entry_name):
+        ''' One child entry per remote entry name, so it is connected to and fetched from once, whatever the number of router entries referencing it
+        '''
+        with RouterEntriesHandler._shared_child_entries_lock:
+            child_entry = RouterEntriesHandler._shared_child_entries.get(entry_name)
+            if child_entry is None:
+                child_entry = RouterEntry(entry_name)
+                RouterEntriesHandler._shared_child_entries[entry_name] = child_entry
+            return child_entry
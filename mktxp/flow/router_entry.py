@@ -13,12 +13,14 @@
 
 
 from enum import IntEnum
-from collections import namedtuple
+from time import monotonic
+from threading import RLock
 from mktxp.cli.config.config import config_handler, MKTXPConfigKeys, CollectorKeys
 from mktxp.flow.router_connection import RouterAPIConnection
 from mktxp.datasource.package_ds import PackageMetricsDataSource
 from mktxp.datasource.system_resource_ds import SystemResourceMetricsDataSource
 from mktxp.flow.router_connection import RouterAPIConnectionError
+from mktxp.utils.utils import builtin_wifi_capsman_version
 
 class RouterEntryWirelessType(IntEnum):
     NONE = 0
@@ -41,10 +43,10 @@ class RouterEntryConnectionState(IntEnum):
 class RouterEntry:
     ''' RouterOS Entry
     '''
-    def __init__(self, router_name):
+    def __init__(self, router_name, config_entry = None, api_connection = None):
         self.router_name = router_name
-        self.config_entry = config_handler.config_entry(router_name)
-        self.api_connection = RouterAPIConnection(router_name, self.config_entry)
+        self.config_entry = config_entry or config_handler.config_entry(router_name)
+        self.api_connection = api_connection or RouterAPIConnection(router_name, self.config_entry)
         self.router_id = {
             MKTXPConfigKeys.ROUTERBOARD_NAME: self.router_name,
             MKTXPConfigKeys.ROUTERBOARD_ADDRESS: self.config_entry.hostname
@@ -91,27 +93,67 @@ class RouterEntry:
                             CollectorKeys.W60G_COLLECTOR: 0
                             }
         self._dhcp_entry = None
-        self._dhcp_records = {}
+        self._dhcp_leases = DHCPLeaseIndex()
         self._capsman_entry = None
-        self._wireless_type = RouterEntryWirelessType.NONE
+        self.collector_cache = {}
+        self.firewall_rules = {}
+        self.facts = RouterEntryFacts()
+
+        # child entry state, shared by all router entries using it as their remote DHCP / CAPsMAN entry
+        self.lock = RLock()
+        self._child_entries = []
+        self._users = 0
+        self._scrape_id = None
+
+    @property
+    def os_version(self):
+        return self._system_facts().get('version')
+
+    @property
+    def board_name(self):
+        return self._system_facts().get('board_name')
+
+    @property
+    def has_builtin_wifi_capsman(self):
+        ver = self.os_version
+        return builtin_wifi_capsman_version(ver) if ver else False
+
+    def is_package_installed(self, package_name):
+        return package_name in (self._installed_packages() or ())
 
     @property
     def wireless_type(self):
-        router_entry = self
-        if self._wireless_type == RouterEntryWirelessType.NONE:
-            if PackageMetricsDataSource.is_package_installed(router_entry, package_name = RouterEntryWirelessPackage.WIFI_PACKAGE):
-              self._wireless_type = RouterEntryWirelessType.WIFI
-            elif PackageMetricsDataSource.is_package_installed(router_entry, package_name = RouterEntryWirelessPackage.WIFI_AC_PACKAGE):
-              self._wireless_type = RouterEntryWirelessType.WIFI
-            elif PackageMetricsDataSource.is_package_installed(router_entry, package_name = RouterEntryWirelessPackage.WIFIWAVE2_PACKAGE):
-              self._wireless_type = RouterEntryWirelessType.WIFIWAVE2
-            elif PackageMetricsDataSource.is_package_installed(router_entry, package_name = RouterEntryWirelessPackage.WIRELESS_PACKAGE):
-              self._wireless_type = RouterEntryWirelessType.DUAL
-            elif SystemResourceMetricsDataSource.has_builtin_wifi_capsman(router_entry):
-              self._wireless_type = RouterEntryWirelessType.WIFI
-            else:
-              self._wireless_type = RouterEntryWirelessType.WIRELESS
-        return self._wireless_type
+        return self.facts.get(RouterEntryFacts.WIRELESS_TYPE, self._detect_wireless_type)
+
+    def _detect_wireless_type(self):
+        # with no packages list or OS version nothing is detected, so a failed fetch does not get cached
+        if self._installed_packages() is None:
+            return None
+        if self.is_package_installed(RouterEntryWirelessPackage.WIFI_PACKAGE):
+            return RouterEntryWirelessType.WIFI
+        elif self.is_package_installed(RouterEntryWirelessPackage.WIFI_AC_PACKAGE):
+            return RouterEntryWirelessType.WIFI
+        elif self.is_package_installed(RouterEntryWirelessPackage.WIFIWAVE2_PACKAGE):
+            return RouterEntryWirelessType.WIFIWAVE2
+        elif self.is_package_installed(RouterEntryWirelessPackage.WIRELESS_PACKAGE):
+            return RouterEntryWirelessType.DUAL
+        elif self.os_version is None:
+            return None
+        elif self.has_builtin_wifi_capsman:
+            return RouterEntryWirelessType.WIFI
+        return RouterEntryWirelessType.WIRELESS
+
+    def _installed_packages(self):
+        return self.facts.get(RouterEntryFacts.INSTALLED_PACKAGES, lambda: PackageMetricsDataSource.installed_packages(self))
+
+    def _system_facts(self):
+        return self.facts.get(RouterEntryFacts.SYSTEM, lambda: SystemResourceMetricsDataSource.system_facts(self)) or {}
+
+    def observe_uptime(self, uptime):
+        if self.facts.observe_uptime(uptime):
+            # the router was rebooted, slow / static collectors data might be stale too
+            self.collector_cache = {}
+            self.firewall_rules = {}
 
     @property
     def dhcp_entry(self):
@@ -131,23 +173,25 @@ class RouterEntry:
     def capsman_entry(self, capsman_entry):
         self._capsman_entry = capsman_entry
 
+    @property
+    def dhcp_leases(self):
+        ''' DHCP leases of the DHCP entry, shared with other router entries using the same remote DHCP entry
+        '''
+        return self.dhcp_entry._dhcp_leases
+
     @property
     def dhcp_records(self):
-        return [entry.record for key, entry in  self._dhcp_records.items() if entry.type == 'mac_address'] \
-                                                                                if self._dhcp_records else None
+        ''' Cached DHCP lease records, None when there are none or they are due for a refresh
+        '''
+        if not self.dhcp_leases or self.dhcp_leases.stale:
+            return None
+        return self.dhcp_leases.records()
     @dhcp_records.setter
     def dhcp_records(self, dhcp_records):
-        for dhcp_record in dhcp_records:
-            if dhcp_record.get('mac_address'):
-                self._dhcp_records[dhcp_record.get('mac_address')] = DHCPCacheEntry('mac_address', dhcp_record)
-            if dhcp_record.get('address'):
-                dhcp_record['type'] = 'address'
-                self._dhcp_records[dhcp_record.get('address')] = DHCPCacheEntry('address', dhcp_record)
+        self.dhcp_leases.replace(dhcp_records)
 
     def dhcp_record(self, key):
-        if self._dhcp_records and self._dhcp_records.get(key):
-            return self._dhcp_records[key].record
-        return None
+        return self.dhcp_leases.lookup(key)
 
     def connection_status(self):
         primary_connection_status = self.api_connection.is_connected()
@@ -164,22 +208,22 @@ class RouterEntry:
 
     def connect(self):
         if not self.api_connection.is_connected():
+            # facts and slow / static collectors data might be stale after reconnect
+            self.collector_cache = {}
+            self.firewall_rules = {}
+            self.facts.invalidate()
             try:
                 self.api_connection.connect()
             except RouterAPIConnectionError as exc:
                 print (f'{exc}')
 
-        if self._dhcp_entry and not self._dhcp_entry.api_connection.is_connected():
-            try:
-                self._dhcp_entry.api_connection.connect()
-            except RouterAPIConnectionError as exc:
-                print (f'{exc}')
-
-        if self._capsman_entry and not self._capsman_entry.api_connection.is_connected():
-            try:
-                self._capsman_entry.api_connection.connect()
-            except RouterAPIConnectionError as exc:
-                print (f'{exc}')
+        for child_entry in self._distinct_child_entries():
+            with child_entry.lock:
+                if not child_entry.api_connection.is_connected():
+                    try:
+                        child_entry.api_connection.connect()
+                    except RouterAPIConnectionError as exc:
+                        print (f'{exc}')
 
     def is_ready(self):
         # self.is_done() #flush caches, just in case
@@ -192,16 +236,159 @@ class RouterEntry:
 
         return is_ready
 
+    def start_collection(self, scrape_id = None):
+        ''' Opens the collection scope, the scrape id identifies the scrape (see CollectorHandler) for the shared child entries
+        '''
+        # known DHCP leases get refreshed incrementally on first use
+        self._dhcp_leases.stale = True
+        self.api_connection.start_collection(prefetch = config_handler.system_entry.pipelined_api_requests)
+
+        self._child_entries = self._distinct_child_entries()
+        for child_entry in self._child_entries:
+            child_entry.acquire(scrape_id)
+
     def is_done(self):
+        self.api_connection.collection_done()
+        self._release_child_entries()
+
         if not config_handler.system_entry.persistent_router_connection_pool:
             self.api_connection.disconnect()
-            if self._dhcp_entry:
-                self._dhcp_entry.api_connection.disconnect()
-            if self._capsman_entry:
-                self._capsman_entry.api_connection.disconnect()
 
         if not config_handler.system_entry.persistent_dhcp_cache:
-            self._dhcp_records = {}
-        self._wireless_type = RouterEntryWirelessType.NONE
+            self._dhcp_leases.clear()
+
+    def acquire(self, scrape_id = None):
+        ''' Child entries are used by all router entries referencing them, in turn or in parallel.
+            The first user within a scrape starts the collection, so the DHCP leases get refreshed once per scrape,
+            later users of the same scrape only reopen the collection scope.
+            Collections outside of a scrape (no scrape id) always start afresh
+        '''
+        with self.lock:
+            if self._users == 0:
+                if scrape_id is None or scrape_id != self._scrape_id:
+                    self._scrape_id = scrape_id
+                    if not config_handler.system_entry.persistent_dhcp_cache:
+                        self._dhcp_leases.clear()
+                    self.start_collection(scrape_id)
+                else:
+                    self.api_connection.start_collection()
+            self._users += 1
+
+    def release(self):
+        with self.lock:
+            self._users = max(self._users - 1, 0)
+            if self._users == 0:
+                # the coalesced responses are not held on to between scrapes
+                self.api_connection.collection_done()
+                if not config_handler.system_entry.persistent_router_connection_pool:
+                    self.api_connection.disconnect()
+
+    def _release_child_entries(self):
+        child_entries, self._child_entries = self._child_entries, []
+        for child_entry in child_entries:
+            child_entry.release()
+
+    def _distinct_child_entries(self):
+        child_entries = []
+        for child_entry in (self._dhcp_entry, self._capsman_entry):
+            if child_entry and child_entry is not self and child_entry not in child_entries:
+                child_entries.append(child_entry)
+        return child_entries
+
+
+class DHCPLeaseIndex:
+    ''' DHCP lease records by lease id, indexed by MAC address, IP address and client id.
+        Known leases are refreshed incrementally, only fetching leases with new ids and dropping the gone ones
+    '''
+    INDEX_KEYS = ('mac_address', 'address', 'client_id')
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._leases = {}
+        self._index = {}
+        self._records = None
+        self.stale = False
+
+    def __len__(self):
+        return len(self._leases)
+
+    def records(self):
+        if self._records is None:
+            self._records = list(self._leases.values())
+        return self._records
+
+    def lookup(self, key):
+        return self._index.get(key) if key else None
+
+    def replace(self, records):
+        self.clear()
+        self.update(records)
+
+    def update(self, records):
+        for record in records:
+            lease_id = record.get('id') or (record.get('mac_address'), record.get('address'))
+            self._remove(lease_id)
+            self._leases[lease_id] = record
+            for key in DHCPLeaseIndex.INDEX_KEYS:
+                if record.get(key):
+                    self._index[record[key]] = record
+        self._records = None
+        self.stale = False
+
+    def retain(self, lease_ids):
+        ''' Drops the leases not in lease_ids, returns the lease ids not known yet
+        '''
+        lease_ids = set(lease_ids)
+        for lease_id in [lease_id for lease_id in self._leases if lease_id not in lease_ids]:
+            self._remove(lease_id)
+        self._records = None
+        return [lease_id for lease_id in lease_ids if lease_id not in self._leases]
+
+    def _remove(self, lease_id):
+        record = self._leases.pop(lease_id, None)
+        if record is None:
+            return
+        for key in DHCPLeaseIndex.INDEX_KEYS:
+            if record.get(key) and self._index.get(record[key]) is record:
+                del self._index[record[key]]
+
+
+class RouterEntryFacts:
+    ''' Rarely changing router facts, fetched once and then kept until reconnect,
+        reboot (uptime going backwards) or router_facts_ttl expiry
+    '''
+    SYSTEM = 'system'
+    INSTALLED_PACKAGES = 'installed_packages'
+    WIRELESS_TYPE = 'wireless_type'
+
+    def __init__(self):
+        self._uptime = None
+        self.invalidate()
+
+    def invalidate(self):
+        self._facts = {}
+        self._timestamp = monotonic()
+
+    def get(self, fact, fetch_func):
+        ttl = config_handler.system_entry.router_facts_ttl
+        if ttl and monotonic() - self._timestamp > ttl:
+            self.invalidate()
+
+        if fact not in self._facts:
+            value = fetch_func()
+            if value is None:
+                # not cached, so it gets retried next time
+                return None
+            self._facts[fact] = value
+        return self._facts[fact]
 
-DHCPCacheEntry = namedtuple('DHCPCacheEntry', ['type', 'record'])
+    def observe_uptime(self, uptime):
+        ''' Tracks the router uptime, returns True when a reboot got detected
+        '''
+        rebooted = self._uptime is not None and uptime < self._uptime
+        self._uptime = uptime
+        if rebooted:
+            self.invalidate()
+        return rebooted
@@ -26,6 +26,8 @@ def test_default_config_no_new_keys(tmpdir):
         config['default'][key] = 'False'
     for key in MKTXPConfigKeys.STR_KEYS:
         config['default'][key] = "some_value"
+    for key in MKTXPConfigKeys.INT_KEYS:
+        config['default'][key] = '0'
     config['default'][MKTXPConfigKeys.PORT_KEY] = '1234'
     config.write()
 
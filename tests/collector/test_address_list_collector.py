@@ -15,6 +15,7 @@ import pytest
 from unittest.mock import MagicMock, call
 from collections import defaultdict
 from mktxp.collector.address_list_collector import AddressListCollector
+from mktxp.datasource.address_list_ds import AddressListMetricsDataSource
 from mktxp.cli.config.config import config_handler, MKTXPConfigKeys
 
 @pytest.mark.parametrize("address_list_config, ipv6_address_list_config", [
@@ -59,10 +60,6 @@ def test_address_list_collector(address_list_config, ipv6_address_list_config):
         mock_resource = MagicMock()
         response_data = ip_response if path == '/ip/firewall/address-list' else ipv6_response
 
-        def get_side_effect(list=None):
-            return [r for r in response_data if r.get('list') == list]
-        mock_resource.get.side_effect = get_side_effect
-
         def call_side_effect(command, params, query):
             assert command == 'print'
             assert params == {'count-only': ''}
@@ -81,6 +78,13 @@ def test_address_list_collector(address_list_config, ipv6_address_list_config):
 
     mock_api.get_resource.side_effect = get_resource_side_effect
 
+    def stream_side_effect(path, command, params, query):
+        assert command == 'print'
+        assert set(params['.proplist'].split(',')) >= {'list', 'address', 'dynamic', 'timeout', 'disabled', 'comment'}
+        response_data = ip_response if path == '/ip/firewall/address-list' else ipv6_response
+        return iter([r for r in response_data if r.get('list') == query['list']])
+    mock_router_entry.api_connection.stream.side_effect = stream_side_effect
+
     # Test the method of focus
     metrics = list(AddressListCollector.collect(mock_router_entry))
     
@@ -144,3 +148,27 @@ def _assert_metrics_for_ip_version(metrics, ip_version, lists_cleaned, response)
         list_name = sample.labels['list']
         expected_count = len([r for r in response if r['list'] == list_name])
         assert sample.value == expected_count
+
+
+def test_address_list_counts_reuse_fetched_entries():
+    """
+    Verifies that the selected lists counts are taken from the fetched entries, with only the all lists counts queried.
+    """
+    mock_router_entry = MagicMock()
+    resource = mock_router_entry.api_connection.router_api.return_value.get_resource.return_value
+    resource.call.side_effect = lambda command, params, query: MagicMock(done_message={'ret': '5' if not query else '2'})
+    list_records = [
+        {'list': 'MyList', 'dynamic': '1'},
+        {'list': 'MyList', 'dynamic': '0'},
+        {'list': 'AnotherList', 'dynamic': '0'},
+    ]
+
+    counts = AddressListMetricsDataSource.count_metric_records(mock_router_entry, ['MyList', 'AnotherList', 'EmptyList'], 'ip', list_records=list_records)
+
+    assert resource.call.call_count == 2
+    assert counts['all_lists'] == {'total': 5, 'dynamic': 2, 'static': 3}
+    assert counts['selected_lists'] == {
+        'MyList': {'total': 2, 'dynamic': 1, 'static': 1},
+        'AnotherList': {'total': 1, 'dynamic': 0, 'static': 1},
+        'EmptyList': {'total': 0, 'dynamic': 0, 'static': 0},
+    }
@@ -12,7 +12,7 @@
 ## GNU General Public License for more details.
 
 import pytest
-from mktxp.collector.base_collector import BaseCollector
+from mktxp.collector.base_collector import BaseCollector, RecordSchema
 from mktxp.cli.config.config import MKTXPConfigKeys
 
 # Case 1: Records with duplicates
@@ -246,3 +246,35 @@ def test_gauge_collector_with_generator_input():
         'bytes'
     )
     assert len(collector_empty.samples) == 0
+
+def test_record_schema_label_values():
+    schema = RecordSchema(['interface', 'comment', 'dc'], custom_labels = ('dc',))
+    custom_labels = {MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID: {'dc': 'london'}}
+
+    assert schema.label_values({'interface': 'eth0', 'comment': 'uplink', **custom_labels}) == ('eth0', 'uplink', 'london')
+    # missing fields and custom labels fall back to empty values
+    assert schema.label_values({'interface': 'eth1', **custom_labels}) == ('eth1', '', 'london')
+    assert schema.label_values({'interface': 'eth2', 'comment': ''}) == ('eth2', '', '')
+    # record fields take precedence over the custom labels
+    assert schema.label_values({'interface': 'eth3', 'comment': '', 'dc': 'paris', **custom_labels}) == ('eth3', '', 'paris')
+
+    unique_records = list(schema.unique_records([{'interface': 'eth0', 'value': 1}, {'interface': 'eth0', 'value': 2}]))
+    assert unique_records == [(('eth0', '', ''), {'interface': 'eth0', 'value': 2})]
+
+def test_collectors_emit_the_same_samples_from_record_batches():
+    from mktxp.datasource.base_ds import RecordBatch
+    router_id = {MKTXPConfigKeys.ROUTERBOARD_NAME: 'router1', MKTXPConfigKeys.ROUTERBOARD_ADDRESS: '192.168.1.1'}
+    custom_labels = {MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID: {'dc': 'london'}}
+    records = [{'name': 'ether1', 'comment': 'uplink', 'rx_byte': '100'},
+               {'name': 'ether2', 'rx_byte': '200'},
+               {'name': 'ether2', 'rx_byte': '300'}]
+    batch = RecordBatch.from_records(records, constants = {**router_id, **custom_labels}).numeric('rx_byte')
+    dict_records = [{**record, **router_id, **custom_labels} for record in records]
+
+    for emit in (lambda records: BaseCollector.counter_collector('rx_byte', 'rx', records, 'rx_byte', ['name']),
+                 lambda records: BaseCollector.gauge_collector('rx_byte', 'rx', records, 'rx_byte', ['name', 'comment']),
+                 lambda records: BaseCollector.info_collector('comment', 'comment', records, ['name', 'comment'])):
+        from_records, from_batch = emit(dict_records), emit(batch)
+        assert from_batch._labelnames == from_records._labelnames
+        assert [(sample.labels, float(sample.value)) for sample in from_batch.samples] == \
+               [(sample.labels, float(sample.value)) for sample in from_records.samples]
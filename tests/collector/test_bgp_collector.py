@@ -0,0 +1,49 @@
+# coding=utf8
+## Copyright (c) 2020 Arseniy Kuznetsov
+##
+## This program is free software; you can redistribute it and/or
+## modify it under the terms of the GNU General Public License
+## as published by the Free Software Foundation; either version 2
+## of the License, or (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+
+from unittest.mock import Mock, patch
+from mktxp.collector.bgp_collector import BGPCollector
+
+# a ROS7 BGP session, with its dotted field names
+SESSION = {'.id': '*1', 'name': 'peer1-1', 'remote.address': '10.0.0.2', 'remote.as': '65002', 'local.as': '65001',
+           'remote.afi': 'ip', 'local.afi': 'ip', 'remote.messages': '12', 'remote.bytes': '3400',
+           'local.messages': '10', 'local.bytes': '2100', 'prefix-count': '5', 'established': 'true', 'uptime': '1m'}
+
+
+@patch('mktxp.flow.processor.output.config_handler')
+def test_bgp_collector_ros7_dotted_session_fields(mock_config_handler):
+    mock_config_handler.re_compiled = {}
+    router_entry = Mock()
+    router_entry.config_entry.bgp = True
+    router_entry.config_entry.custom_labels = None
+    router_entry.os_version = '7.15.2'
+    router_entry.router_id = {'routerboard_name': 'router', 'routerboard_address': 'localhost'}
+
+    def call(command, arguments = None):
+        # like RouterOS, only the fields in the .proplist are returned
+        proplist = arguments['.proplist'].split(',')
+        return [{key: value for key, value in SESSION.items() if key in proplist}]
+    resource = router_entry.api_connection.router_api.return_value.get_resource.return_value
+    resource.call.side_effect = call
+
+    families = {family.name: family for family in BGPCollector.collect(router_entry)}
+
+    router_entry.api_connection.router_api.return_value.get_resource.assert_called_with('/routing/bgp/session')
+    assert families['mktxp_bgp_sessions'].rows == [(('peer1-1', '10.0.0.2', '65002', '65001', 'ip', 'ip', 'router', 'localhost'), 1)]
+    assert families['mktxp_bgp_remote_messages'].rows[0][1] == '12'
+    assert families['mktxp_bgp_remote_bytes'].rows[0][1] == '3400'
+    assert families['mktxp_bgp_local_messages'].rows[0][1] == '10'
+    assert families['mktxp_bgp_local_bytes'].rows[0][1] == '2100'
+    assert families['mktxp_bgp_prefix_count'].rows[0][1] == '5'
+    assert families['mktxp_bgp_established'].rows[0][1] == '1'
+    assert families['mktxp_bgp_uptime'].rows[0][1] == 60000
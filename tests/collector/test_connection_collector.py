@@ -13,7 +13,7 @@
 
 import pytest
 from unittest.mock import MagicMock
-from mktxp.datasource.connection_ds import IPConnectionStatsDatasource
+from mktxp.datasource.connection_ds import IPConnectionStatsDatasource, SpaceSavingCounter
 from mktxp.flow.router_entry import RouterEntry
 
 @pytest.mark.parametrize("connection_count_str, should_make_stats_call", [
@@ -29,6 +29,7 @@ def test_ip_connection_stats_datasource_checks_count_first(connection_count_str,
     mock_router_entry.router_name = "TestRouter"
     mock_router_entry.config_entry = MagicMock()
     mock_router_entry.config_entry.hostname = "testhost"
+    mock_router_entry.config_entry.connection_stats_top_k = 0
     mock_router_entry.api_connection = MagicMock()
     mock_router_entry.router_id = {'routerboard_name': 'test_router'}
 
@@ -51,18 +52,22 @@ def test_ip_connection_stats_datasource_checks_count_first(connection_count_str,
         return MagicMock()
 
     call_mock.side_effect = api_call_router
+    stream_mock = mock_router_entry.api_connection.stream
+    stream_mock.side_effect = lambda path, command, params: iter(api_call_router(path, params))
 
     # Test the method of focus
     result = IPConnectionStatsDatasource.metric_records(mock_router_entry)
     if should_make_stats_call:
-        # This one should have been called four times, twice for count (IPv4+IPv6) and twice for the stats (IPv4+IPv6)
-        assert call_mock.call_count == 4
+        # Twice for count (IPv4+IPv6), then the stats (IPv4+IPv6) are streamed
+        assert call_mock.call_count == 2
+        assert stream_mock.call_count == 2
         assert result is not None
         assert len(result) > 0
         assert result[0]['src_address'] == '1.1.1.1'
     else:
         # And this twice for the count (IPv4+IPv6)
         assert call_mock.call_count == 2
+        assert stream_mock.call_count == 0
         assert result == []
 
 def test_ip_connection_stats_datasource_without_destinations():
@@ -74,6 +79,7 @@ def test_ip_connection_stats_datasource_without_destinations():
     mock_router_entry.router_name = "TestRouter"
     mock_router_entry.config_entry = MagicMock()
     mock_router_entry.config_entry.hostname = "testhost"
+    mock_router_entry.config_entry.connection_stats_top_k = 0
     mock_router_entry.config_entry.connection_stats_destinations = False
     mock_router_entry.api_connection = MagicMock()
     mock_router_entry.router_id = {'routerboard_name': 'test_router'}
@@ -97,10 +103,13 @@ def test_ip_connection_stats_datasource_without_destinations():
         return MagicMock()
 
     call_mock.side_effect = api_call_router
+    stream_mock = mock_router_entry.api_connection.stream
+    stream_mock.side_effect = lambda path, command, params: iter(api_call_router(path, params))
 
     result = IPConnectionStatsDatasource.metric_records(mock_router_entry)
     
-    assert call_mock.call_count == 4
+    assert call_mock.call_count == 2
+    assert stream_mock.call_count == 2
     assert result is not None
     assert len(result) == 1
     assert result[0]['src_address'] == '1.1.1.1'
@@ -116,3 +125,21 @@ def test_strip_port_ipv4_and_ipv6():
     assert IPConnectionStatsDatasource.strip_port('[2001:db8::1]:443') == '2001:db8::1'
     assert IPConnectionStatsDatasource.strip_port('2001:db8::1') == '2001:db8::1'
     assert IPConnectionStatsDatasource.strip_port('') == ''
+
+
+def test_space_saving_counter_keeps_heavy_hitters():
+    """
+    Verifies that the top-K mode keeps the busiest sources within K counters, accounting for the rest as 'other'.
+    """
+    counter = SpaceSavingCounter(4)
+    sources = ['10.0.0.1'] * 50 + ['10.0.0.2'] * 30 + [f'10.0.1.{i}' for i in range(20)]
+    for i, source in enumerate(sources):
+        # interleave the heavy hitters with the one-off sources
+        counter.add(sources[(i * 7) % len(sources)], f'1.1.1.1:{i}(tcp)')
+
+    assert len(counter.counters) == 4
+    entries = dict(counter.entries())
+    # sources above 1/K of all connections are always kept
+    assert {'10.0.0.1', '10.0.0.2', 'other'} <= set(entries)
+    assert entries['10.0.0.1'].count <= 50 and entries['10.0.0.2'].count <= 30
+    assert sum(entry.count for entry in entries.values()) == len(sources)
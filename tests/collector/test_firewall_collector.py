@@ -0,0 +1,63 @@
+# coding=utf8
+## Copyright (c) 2020 Arseniy Kuznetsov
+##
+## This program is free software; you can redistribute it and/or
+## modify it under the terms of the GNU General Public License
+## as published by the Free Software Foundation; either version 2
+## of the License, or (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+
+from unittest.mock import Mock, patch
+from mktxp.collector.firewall_collector import FirewallCollector
+from mktxp.datasource.firewall_ds import FirewallMetricsDataSource
+
+FIREWALL_LABELS = ['chain', 'action', 'bytes', 'comment', 'log', 'out_interface', 'protocol']
+
+RULES = [
+    {'id': '*1', 'chain': 'forward', 'action': 'accept', 'comment': 'established', 'log': 'false', 'bytes': '100'},
+    {'id': '*2', 'chain': 'input', 'action': 'drop', 'log': 'true', 'protocol': 'tcp', 'bytes': '0'},
+]
+
+
+def _router_entry(records):
+    router_entry = Mock()
+    router_entry.router_id = {'routerboard_name': 'router', 'routerboard_address': 'localhost'}
+    router_entry.config_entry.custom_labels = None
+    router_entry.firewall_rules = {}
+
+    def call(command, arguments = None, queries = None):
+        if arguments.get('.proplist') == FirewallMetricsDataSource.COUNTERS_PROPLIST:
+            return [{'id': record['id'], 'bytes': record['bytes']} for record in records]
+        return [dict(record) for record in records]
+    resource = router_entry.api_connection.router_api.return_value.get_resource.return_value
+    resource.call.side_effect = call
+    return router_entry, resource
+
+
+@patch('mktxp.datasource.firewall_ds.config_handler')
+def test_firewall_rules_metadata_cached_by_id(mock_config_handler):
+    mock_config_handler.system_entry.firewall_rules_metadata_ttl = 300
+    records = [dict(rule) for rule in RULES]
+    router_entry, resource = _router_entry(records)
+
+    first = FirewallMetricsDataSource.metric_records(router_entry, metric_labels = FIREWALL_LABELS, matching_only = False)
+    assert [record['name'] for record in first] == ['| forward | accept | established', '| input | drop |  | tcp']
+
+    # unchanged rules: only the counters are fetched
+    records[1]['bytes'] = '42'
+    resource.call.reset_mock()
+    second = FirewallMetricsDataSource.metric_records(router_entry, metric_labels = FIREWALL_LABELS)
+    assert resource.call.call_count == 1
+    assert [(record['name'], record['bytes']) for record in second] == [('| forward | accept | established', '100'), ('| input | drop |  | tcp', '42')]
+    assert FirewallCollector.metric_record(router_entry, second[1])['name'] == '| input | drop |  | tcp'
+
+    # a new rule refreshes the metadata
+    records.append({'id': '*3', 'chain': 'output', 'action': 'accept', 'log': 'false', 'bytes': '7'})
+    resource.call.reset_mock()
+    third = FirewallMetricsDataSource.metric_records(router_entry, metric_labels = FIREWALL_LABELS)
+    assert resource.call.call_count == 2
+    assert third[-1]['name'] == '| output | accept | '
@@ -181,3 +181,96 @@ def test_bridge_vlan_metric_records_exception(capsys):
     assert result is None
     captured = capsys.readouterr()
     assert "Error in BridgeVlanMetricsDataSource: Connection Timeout" in captured.out
+
+
+def test_monitor_records_batches_numbers_into_one_call():
+    resource = Mock()
+    # RouterOS does not have to answer in the requested order
+    resource.call.return_value = [{'name': 'ether3', 'status': 'link-ok'}, {'name': 'ether1', 'status': 'no-link'}]
+
+    records = BaseDSProcessor.monitor_records(resource, [0, 2], names=['ether1', 'ether3'])
+
+    resource.call.assert_called_once_with('monitor', {'once': '', 'numbers': '0,2'})
+    assert [record['name'] for record in records] == ['ether1', 'ether3']
+
+
+def test_monitor_records_falls_back_to_single_calls_on_unmatched_names():
+    resource = Mock()
+    def call(action, args):
+        if ',' in args['numbers']:
+            # no names to match the batch records by
+            return [{'status': 'link-ok'}, {'status': 'no-link'}]
+        return [{'name': f"ether{int(args['numbers']) + 1}"}]
+    resource.call.side_effect = call
+
+    records = BaseDSProcessor.monitor_records(resource, [0, 2], names=['ether1', 'ether3'])
+
+    assert [record['name'] for record in records] == ['ether1', 'ether3']
+    assert resource.call.call_count == 3
+
+
+def test_monitor_records_falls_back_to_single_calls():
+    resource = Mock()
+    def call(action, args):
+        if ',' in args['numbers']:
+            raise Exception('invalid value for argument numbers')
+        return [{'name': f"ether{args['numbers']}"}]
+    resource.call.side_effect = call
+
+    records = BaseDSProcessor.monitor_records(resource, [0, 1, 2])
+
+    assert [record['name'] for record in records] == ['ether0', 'ether1', 'ether2']
+    assert resource.call.call_count == 4
+
+
+@pytest.mark.parametrize(
+    "metric_labels, arguments, source_fields, expected",
+    [
+        # API field names are derived from the metric labels
+        (['mac_address', 'host_name', 'id'], None, (), {'.proplist': 'mac-address,host-name,.id'}),
+        # source fields are fetched as well, without duplicates
+        (['name', 'signal_strength'], {'stats': ''}, ['signal', 'name'], {'stats': '', '.proplist': 'name,signal-strength,signal'}),
+        # no metric labels means all fields are needed
+        ([], {'detail': ''}, ['name'], {'detail': ''}),
+    ]
+)
+def test_print_arguments_proplist(metric_labels, arguments, source_fields, expected):
+    assert BaseDSProcessor.print_arguments(metric_labels, arguments, source_fields = source_fields) == expected
+
+def test_trimmed_batch_columns():
+    mock_router_entry = Mock()
+    mock_router_entry.config_entry.custom_labels = 'dc:london'
+    mock_router_entry.router_id = {'routerboard_name': 'r1', 'routerboard_address': '1.1.1.1'}
+    router_records = [{'name': 'queue1', 'bytes': '10/20', 'disabled': 'false', 'ignored': 'x'},
+                      {'name': 'queue2', 'bytes': '30/40', 'disabled': 'true'}]
+
+    batch = BaseDSProcessor.trimmed_batch(mock_router_entry, router_records = router_records, metric_labels = ['name', 'bytes', 'disabled'],
+                                          translation_table = {'disabled': lambda value: '1' if value == 'true' else '0'})
+    batch = batch.split('bytes').numeric('bytes_up', 'bytes_down', 'disabled')
+
+    assert len(batch) == 2
+    assert batch.column('name') == ('queue1', 'queue2')
+    assert list(batch.column('bytes_down')) == [20.0, 40.0]
+    assert list(batch.column('disabled')) == [0.0, 1.0]
+    assert batch.column('routerboard_name') == ('r1', 'r1')
+    assert batch.constants[MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID] == {'dc': 'london'}
+
+    enabled = batch.where('disabled', lambda value: not value)
+    assert list(enabled) == [{'routerboard_name': 'r1', 'routerboard_address': '1.1.1.1', MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID: {'dc': 'london'},
+                              'name': 'queue1', 'disabled': 0.0, 'bytes_up': 10.0, 'bytes_down': 20.0}]
+
+def test_trimmed_records_parse_custom_labels_once():
+    mock_router_entry = Mock()
+    mock_router_entry.config_entry.custom_labels = 'dc:london'
+    mock_router_entry.router_id = {'routerboard_name': 'r1', 'routerboard_address': '1.1.1.1'}
+    router_records = [{'rx-byte': '1', 'disabled': 'true'}, {'rx-byte': '2'}]
+
+    with patch.object(BaseDSProcessor, '_parse_custom_labels', wraps=BaseDSProcessor._parse_custom_labels) as parse_custom_labels:
+        for _ in range(2):
+            records = BaseDSProcessor.trimmed_records(mock_router_entry, router_records = router_records, metric_labels = ['rx_byte', 'disabled'],
+                                                      translation_table = {'disabled': lambda value: '1' if value == 'true' else '0'})
+    parse_custom_labels.assert_called_once()
+
+    assert records[0] == {'rx_byte': '1', 'disabled': '1', 'routerboard_name': 'r1', 'routerboard_address': '1.1.1.1',
+                          MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID: {'dc': 'london'}}
+    assert records[1]['disabled'] == '0'
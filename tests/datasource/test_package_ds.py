@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import Mock
 from mktxp.datasource.package_ds import PackageMetricsDataSource
+from mktxp.flow.router_entry import RouterEntry, RouterEntryFacts
 
 class TestPackageMetricsDataSource:
 
@@ -19,6 +20,11 @@ class TestPackageMetricsDataSource:
         api_conn.router_api.return_value = router_api
         router_entry.api_connection = api_conn
 
+        # enabled packages are looked up via the router entry facts
+        router_entry.facts = RouterEntryFacts()
+        router_entry._installed_packages = lambda: RouterEntry._installed_packages(router_entry)
+        router_entry.is_package_installed = lambda package_name: RouterEntry.is_package_installed(router_entry, package_name)
+
         return router_entry, resource
 
     def test_is_package_installed_v6_style(self, mock_router_entry):
@@ -63,3 +69,14 @@ class TestPackageMetricsDataSource:
         resource.get.side_effect = Exception("API connection failed")
 
         assert PackageMetricsDataSource.is_package_installed(router_entry, 'container') is False
+
+    def test_is_package_installed_uses_cached_facts(self, mock_router_entry):
+        router_entry, resource = mock_router_entry
+        resource.get.return_value = [
+            {'name': 'routeros'},
+            {'name': 'container'},
+        ]
+
+        assert PackageMetricsDataSource.is_package_installed(router_entry, 'container') is True
+        assert PackageMetricsDataSource.is_package_installed(router_entry, 'wifi-qcom') is False
+        resource.get.assert_called_once_with(disabled='false')
@@ -13,6 +13,7 @@
 
 import gzip
 import pytest
+from unittest.mock import MagicMock
 from mktxp.flow.processor.base_proc import MetricsRouter, PrometheusHeadersDeduplicatingMiddleware
 
 # A mock WSGI app to simulate the prometheus_client
@@ -108,6 +109,7 @@ def test_probe_unknown_module_returns_503(monkeypatch):
         probe_connection_pool = False
         probe_connection_pool_ttl = 0
         probe_connection_pool_max_size = 0
+        direct_exposition_encoder = False
 
     class DummyConfigHandler:
         system_entry = DummySystemEntry()
@@ -136,6 +138,7 @@ def test_probe_disabled_module_returns_503(monkeypatch):
         probe_connection_pool = False
         probe_connection_pool_ttl = 0
         probe_connection_pool_max_size = 0
+        direct_exposition_encoder = False
 
     class DummyEntry:
         enabled = False
@@ -171,6 +174,7 @@ def test_probe_valid_module_uses_probe_app(monkeypatch):
         probe_connection_pool = False
         probe_connection_pool_ttl = 0
         probe_connection_pool_max_size = 0
+        direct_exposition_encoder = False
 
     class DummyEntry:
         enabled = True
@@ -255,6 +259,7 @@ def test_probe_target_override_applies_hostname(monkeypatch):
         probe_connection_pool = False
         probe_connection_pool_ttl = 0
         probe_connection_pool_max_size = 0
+        direct_exposition_encoder = False
 
     class DummyEntry:
         enabled = True
@@ -335,6 +340,7 @@ def test_probe_module_only_requires_target(monkeypatch):
         probe_connection_pool = False
         probe_connection_pool_ttl = 0
         probe_connection_pool_max_size = 0
+        direct_exposition_encoder = False
 
     class DummyEntry:
         enabled = True
@@ -370,6 +376,7 @@ def test_probe_empty_target_returns_503(monkeypatch):
         probe_connection_pool = False
         probe_connection_pool_ttl = 0
         probe_connection_pool_max_size = 0
+        direct_exposition_encoder = False
 
     class DummyEntry:
         enabled = True
@@ -396,3 +403,162 @@ def test_probe_empty_target_returns_503(monkeypatch):
 
     assert status_headers[0][0].startswith('503')
     assert b"Invalid 'target' parameter" in body
+
+
+def test_filtered_metrics_scrape():
+    from prometheus_client.core import GaugeMetricFamily
+    from mktxp.flow.collector_registry import CollectorRegistry
+
+    router_entry = MagicMock()
+    router_entry.router_name = 'r1'
+    collector_handler = MagicMock()
+    collector_handler.collector_registry = CollectorRegistry()
+    collector_handler.entries_handler.router_entries = [router_entry]
+    collector_handler.collect_filtered.return_value = [GaugeMetricFamily('mktxp_filtered', 'Filtered', value = 1)]
+
+    def full_scrape(environ, start_response):
+        full_scrapes.append(environ)
+        start_response('200 OK', [])
+        return [b'full']
+    full_scrapes = []
+    router = MetricsRouter(full_scrape, collector_handler)
+
+    def scrape(query_string):
+        status_headers = []
+        body = b''.join(router({'PATH_INFO': '/metrics', 'REQUEST_METHOD': 'GET', 'QUERY_STRING': query_string}, lambda status, headers: status_headers.append(status)))
+        return status_headers[0], body
+
+    status, body = scrape('collect[]=interface&collect[]=FirewallCollector&router=r1')
+    assert status.startswith('200')
+    assert b'mktxp_filtered 1.0' in body
+    collector_handler.collect_filtered.assert_called_once_with(['InterfaceCollector', 'FirewallCollector'], ['r1'])
+    assert not full_scrapes
+
+    status, body = scrape('collect[]=nosuch')
+    assert status.startswith('503')
+    assert b'Unknown collectors: nosuch' in body
+
+    status, body = scrape('router=r2')
+    assert status.startswith('503')
+    assert b'r2' in body
+
+    assert scrape('')[1] == b'full'
+
+
+def test_probe_reuses_config_entries_and_collectors_registry(monkeypatch):
+    from mktxp.flow.processor import base_proc
+
+    class DummySystemEntry:
+        probe_connection_pool = False
+        probe_connection_pool_ttl = 0
+        probe_connection_pool_max_size = 0
+        direct_exposition_encoder = False
+
+    class DummyEntry:
+        enabled = True
+        hostname = 'original'
+        module_only = False
+
+        def _replace(self, **kwargs):
+            entry = DummyEntry()
+            for key, value in kwargs.items():
+                setattr(entry, key, value)
+            return entry
+
+    config_entries_read = []
+
+    class DummyConfigHandler:
+        system_entry = DummySystemEntry()
+
+        def registered_entry(self, name):
+            return True
+
+        def config_entry(self, name):
+            config_entries_read.append(name)
+            return DummyEntry()
+
+    probes = []
+
+    class DummyProbeCollectorHandler:
+        def __init__(self, entries_handler, collector_registry):
+            probes.append((entries_handler.config_entry, collector_registry))
+
+    def probe_app(environ, start_response):
+        start_response('200 OK', [('Content-Length', '2')])
+        return [b'ok']
+
+    monkeypatch.setattr(base_proc, 'config_handler', DummyConfigHandler())
+    monkeypatch.setattr(base_proc, 'ProbeCollectorHandler', DummyProbeCollectorHandler)
+    monkeypatch.setattr(base_proc, 'MKTXPCollectorRegistry', object)
+    monkeypatch.setattr(base_proc, 'make_wsgi_app', lambda registry=None: probe_app)
+
+    router = base_proc.MetricsRouter(lambda environ, start_response: [])
+    for _ in range(2):
+        for query_string in ('module=router1&target=1.2.3.4', 'module=router1'):
+            b''.join(router({'PATH_INFO': '/probe', 'QUERY_STRING': query_string}, lambda status, headers: None))
+
+    # built once per module and target
+    assert config_entries_read == ['router1', 'router1']
+    assert [config_entry.hostname for config_entry, _ in probes] == ['1.2.3.4', 'original'] * 2
+    assert probes[0][0] is probes[2][0]
+    assert len({id(collector_registry) for _, collector_registry in probes}) == 1
+
+
+def test_batch_probe_collects_each_target(monkeypatch):
+    from mktxp.flow.processor import base_proc
+
+    class DummySystemEntry:
+        probe_connection_pool = False
+        probe_connection_pool_ttl = 0
+        probe_connection_pool_max_size = 0
+        direct_exposition_encoder = False
+
+    class DummyEntry:
+        enabled = True
+        hostname = 'original'
+        module_only = True
+
+        def _replace(self, **kwargs):
+            entry = DummyEntry()
+            for key, value in kwargs.items():
+                setattr(entry, key, value)
+            return entry
+
+    class DummyConfigHandler:
+        system_entry = DummySystemEntry()
+
+        def registered_entry(self, name):
+            return True
+
+        def config_entry(self, name):
+            return DummyEntry()
+
+    batches = []
+
+    class DummyBatchProbeCollectorHandler:
+        def __init__(self, probe_entries, collector_registry):
+            batches.append(probe_entries)
+
+    def probe_app(environ, start_response):
+        start_response('200 OK', [('Content-Length', '2')])
+        return [b'ok']
+
+    monkeypatch.setattr(base_proc, 'config_handler', DummyConfigHandler())
+    monkeypatch.setattr(base_proc, 'BatchProbeCollectorHandler', DummyBatchProbeCollectorHandler)
+    monkeypatch.setattr(base_proc, 'MKTXPCollectorRegistry', object)
+    monkeypatch.setattr(base_proc, 'make_wsgi_app', lambda registry=None: probe_app)
+
+    router = base_proc.MetricsRouter(lambda environ, start_response: [])
+    status_headers = []
+
+    def start_response(status, headers):
+        status_headers.append((status, headers))
+
+    body = b''.join(router({'PATH_INFO': '/probe/batch', 'QUERY_STRING': 'module=cpe&target=cpe1&target=cpe2,cpe3,cpe1'}, start_response))
+    assert status_headers[0][0] == '200 OK'
+    assert body == b'ok'
+    assert [probe_entries.config_entry.hostname for probe_entries in batches[0]] == ['cpe1', 'cpe2', 'cpe3']
+
+    body = b''.join(router({'PATH_INFO': '/probe/batch', 'QUERY_STRING': 'module=cpe&target='}, start_response))
+    assert status_headers[1][0].startswith('503')
+    assert b"Missing 'target' parameters" in body
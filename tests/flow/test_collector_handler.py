@@ -33,6 +33,7 @@ def mock_entries_handler(mock_router_entry):
 def mock_collector_registry():
     """Fixture to create a mock CollectorRegistry"""
     registry = MagicMock()
+    registry.refresh_interval.return_value = 0
     mock_collect_func = Mock(return_value=[]) 
     registry.registered_collectors = {'mock_collector': mock_collect_func}
     registry.bandwidthCollector.collect.return_value = []
@@ -66,6 +67,7 @@ class _StubMetric:
     """Identifiable placeholder for a yielded metric family."""
     def __init__(self, label):
         self.label = label
+        self.name, self.type = label, 'untyped'
     def __eq__(self, other):
         return isinstance(other, _StubMetric) and other.label == self.label
     def __hash__(self):
@@ -95,6 +97,7 @@ def _make_handler(per_call_metrics):
     entries_handler.router_entries = [router_entry]
 
     registry = MagicMock()
+    registry.refresh_interval.return_value = 0
     registry.bandwidthCollector.collect.return_value = []
 
     iterator = iter(per_call_metrics)
@@ -123,11 +126,13 @@ def test_collect_caches_and_replays_on_mci_defer(monkeypatch):
 
     first = list(handler.collect())
     assert first == fresh, 'first scrape should yield freshly collected metrics'
+    assert handler.served_generation == 1
 
     # Second call lands well within MCI; the inner collector iterator is
     # exhausted, so without the cache the result would be empty.
     second = list(handler.collect())
     assert second == fresh, 'within-MCI scrape must replay the cached metrics'
+    assert handler.served_generation == 1
 
 
 def test_empty_collection_does_not_clobber_cache(monkeypatch):
@@ -150,3 +155,251 @@ def test_empty_collection_does_not_clobber_cache(monkeypatch):
     # Bump MCI so the next call defers; cache should still hold the seed.
     fake_cfg.system_entry = _system_entry_stub(mci=60)
     assert list(handler.collect()) == seed
+
+
+def test_background_collection_serves_latest_snapshot(monkeypatch):
+    """In background mode the scrape path must never poll routers itself,
+    it only serves the latest complete snapshot taken by the background loop."""
+    import threading
+    from mktxp.flow import collector_handler as ch_mod
+
+    snapshot = [_StubMetric('bg')]
+    handler = _make_handler([snapshot])
+    collected = threading.Event()
+    refresh = handler._refresh_metrics_cache
+    def tracking_refresh():
+        result = refresh()
+        collected.set()
+        return result
+    handler._refresh_metrics_cache = tracking_refresh
+
+    fake_cfg = MagicMock()
+    fake_cfg.system_entry = _system_entry_stub(mci=0)
+    monkeypatch.setattr(ch_mod, 'config_handler', fake_cfg)
+
+    handler.start_background_collection(interval=60)
+    try:
+        assert collected.wait(5), 'background loop should run a first collection right away'
+        assert handler.background_collection_running
+        # the collector iterator is now exhausted; scrapes must still see the snapshot
+        assert list(handler.collect()) == snapshot
+        assert list(handler.collect()) == snapshot
+    finally:
+        handler.stop_background_collection(timeout=5)
+
+    assert not handler.background_collection_running
+
+
+def test_collect_asyncio_collects_all_ready_routers(monkeypatch):
+    from mktxp.flow import collector_handler as ch_mod
+
+    fake_cfg = MagicMock()
+    fake_cfg.system_entry.max_scrape_duration = 10
+    fake_cfg.system_entry.total_max_scrape_duration = 30
+    monkeypatch.setattr(ch_mod, 'config_handler', fake_cfg)
+
+    entries = []
+    for name, ready in (('r1', True), ('r2', False), ('r3', True)):
+        entry = MagicMock()
+        entry.is_ready.return_value = ready
+        entry.time_spent = {'mock_collector': 0}
+        entry.label = name
+        entries.append(entry)
+    entries_handler = MagicMock()
+    entries_handler.router_entries = entries
+
+    registry = MagicMock()
+    registry.refresh_interval.return_value = 0
+    registry.registered_collectors = {'mock_collector': lambda entry: iter([_StubMetric(entry.label)])}
+
+    handler = CollectorHandler(entries_handler, registry)
+    assert sorted(m.label for m in handler.collect_asyncio(max_worker_threads=2)) == ['r1', 'r3']
+    entries[0].is_done.assert_called_once()
+    entries[1].is_done.assert_not_called()
+
+
+def test_slow_collectors_replay_between_refreshes(monkeypatch):
+    from mktxp.flow import collector_handler as ch_mod
+    from mktxp.flow.collector_registry import CollectorRegistry
+    from mktxp.cli.config.config import CollectorKeys
+
+    fake_cfg = MagicMock()
+    fake_cfg.system_entry = _system_entry_stub(mci=0)
+    fake_cfg.system_entry.static_collectors_interval = 3600
+    fake_cfg.system_entry.slow_collectors_interval = 0
+    monkeypatch.setattr(ch_mod, 'config_handler', fake_cfg)
+    monkeypatch.setattr('mktxp.flow.collector_registry.config_handler', fake_cfg)
+
+    router_entry = MagicMock()
+    router_entry.is_ready.return_value = True
+    router_entry.time_spent = {CollectorKeys.PACKAGE_COLLECTOR: 0, CollectorKeys.INTERFACE_COLLECTOR: 0, CollectorKeys.CONTAINER_COLLECTOR: 0}
+    router_entry.collector_cache = {}
+    router_entry.config_entry.collector_refresh_intervals = 'ContainerCollector:600, broken'
+    entries_handler = MagicMock()
+    entries_handler.router_entries = [router_entry]
+
+    calls = {collector_ID: 0 for collector_ID in router_entry.time_spent}
+    def collector(collector_ID):
+        def collect(_entry):
+            calls[collector_ID] += 1
+            yield _StubMetric(f'{collector_ID}-{calls[collector_ID]}')
+        return collect
+
+    registry = CollectorRegistry.__new__(CollectorRegistry)
+    registry.registered_collectors = {collector_ID: collector(collector_ID) for collector_ID in calls}
+    registry.bandwidthCollector = MagicMock()
+    registry.bandwidthCollector.collect.return_value = []
+
+    handler = CollectorHandler(entries_handler, registry)
+    first = [m.label for m in handler.collect()]
+    second = [m.label for m in handler.collect()]
+
+    assert first == ['PackageCollector-1', 'InterfaceCollector-1', 'ContainerCollector-1']
+    assert second == ['PackageCollector-1', 'InterfaceCollector-2', 'ContainerCollector-1']
+    assert calls == {'PackageCollector': 1, 'InterfaceCollector': 2, 'ContainerCollector': 1}
+
+
+def test_same_named_families_merged_across_routers(monkeypatch):
+    from prometheus_client import CollectorRegistry as PrometheusCollectorRegistry, generate_latest
+    from mktxp.flow import collector_handler as ch_mod
+    from mktxp.collector.base_collector import BaseCollector
+    from mktxp.cli.config.config import MKTXPConfigKeys
+
+    fake_cfg = MagicMock()
+    fake_cfg.system_entry = _system_entry_stub(mci=0)
+    monkeypatch.setattr(ch_mod, 'config_handler', fake_cfg)
+
+    entries = []
+    for name, custom_labels in (('r1', None), ('r2', {'dc': 'london'})):
+        entry = MagicMock()
+        entry.is_ready.return_value = True
+        entry.time_spent = {'mock_collector': 0}
+        entry.records = [{'name': 'ether1', 'rx_byte': 10, MKTXPConfigKeys.ROUTERBOARD_NAME: name, MKTXPConfigKeys.ROUTERBOARD_ADDRESS: name}]
+        if custom_labels:
+            entry.records[0][MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID] = custom_labels
+        entries.append(entry)
+    entries_handler = MagicMock()
+    entries_handler.router_entries = entries
+
+    cached_family = BaseCollector.gauge_collector('interface_rx_byte', 'Received bytes', entries[0].records, 'rx_byte', ['name'])
+    def collect(entry):
+        yield cached_family if entry is entries[0] else BaseCollector.gauge_collector('interface_rx_byte', 'Received bytes', entry.records, 'rx_byte', ['name'])
+        yield BaseCollector.info_collector('identity', 'Identity', entry.records, ['name'])
+
+    registry = MagicMock()
+    registry.refresh_interval.return_value = 0
+    registry.registered_collectors = {'mock_collector': collect}
+    registry.bandwidthCollector.collect.return_value = []
+
+    handler = CollectorHandler(entries_handler, registry)
+    families = list(handler.collect())
+    assert [family.name for family in families] == ['mktxp_interface_rx_byte', 'mktxp_identity']
+    assert families[0].rows == [(('ether1', 'r1', 'r1', ''), 10), (('ether1', 'r2', 'r2', 'london'), 10)]
+    # the source families are left as they were
+    assert len(cached_family.rows) == 1
+
+    prometheus_registry = PrometheusCollectorRegistry()
+    prometheus_registry.register(type('Families', (), {'collect': lambda self: iter(families)})())
+    output = generate_latest(prometheus_registry).decode()
+    assert output.count('# TYPE mktxp_interface_rx_byte gauge') == 1
+    assert output.count('# TYPE mktxp_identity_info gauge') == 1
+
+
+def test_concurrent_scrapes_join_the_collection_in_flight(monkeypatch):
+    import threading
+    from mktxp.flow import collector_handler as ch_mod
+
+    fake_cfg = MagicMock()
+    fake_cfg.system_entry = _system_entry_stub(mci=0)
+    monkeypatch.setattr(ch_mod, 'config_handler', fake_cfg)
+
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    def collect_func(_entry):
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        yield _StubMetric('slow')
+
+    handler = _make_handler([])
+    handler.collector_registry.registered_collectors = {'mock_collector': collect_func}
+
+    results = {}
+    def scrape(name):
+        results[name] = (list(handler.collect()), handler.served_generation)
+    leader = threading.Thread(target = scrape, args = ('leader',))
+    leader.start()
+    assert started.wait(5)
+    follower = threading.Thread(target = scrape, args = ('follower',))
+    follower.start()
+    # let the follower find the collection in flight
+    follower.join(0.2)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(calls) == 1
+    assert results['leader'] == results['follower'] == ([_StubMetric('slow')], 1)
+
+
+def test_collect_filtered_runs_selected_collectors_and_routers(monkeypatch):
+    from mktxp.flow import collector_handler as ch_mod
+
+    fake_cfg = MagicMock()
+    fake_cfg.system_entry = _system_entry_stub(mci=0)
+    monkeypatch.setattr(ch_mod, 'config_handler', fake_cfg)
+
+    entries = []
+    for name in ('r1', 'r2'):
+        entry = MagicMock()
+        entry.router_name = name
+        entry.is_ready.return_value = True
+        entry.time_spent = {'a': 0, 'b': 0}
+        entries.append(entry)
+    entries_handler = MagicMock()
+    entries_handler.router_entries = entries
+
+    registry = MagicMock()
+    registry.refresh_interval.return_value = 0
+    registry.registered_collectors = {collector_ID: (lambda collector_ID: lambda entry: iter([_StubMetric(f'{entry.router_name}-{collector_ID}')]))(collector_ID)
+                                      for collector_ID in ('a', 'b')}
+    registry.bandwidthCollector.collect.return_value = [_StubMetric('bandwidth')]
+
+    handler = CollectorHandler(entries_handler, registry)
+    assert [m.label for m in handler.collect_filtered(['b'], ['r2'])] == ['r2-b']
+    assert [m.label for m in handler.collect_filtered(router_names = ['r1'])] == ['bandwidth', 'r1-a', 'r1-b']
+    entries[0].start_collection.assert_called_once()
+    # filtered scrapes do not touch the full scrapes snapshot
+    assert handler.generation == 0
+
+
+def test_batch_probe_reports_success_per_target(monkeypatch):
+    import types
+    from mktxp.flow import collector_handler as ch_mod
+    from mktxp.flow.collector_handler import BatchProbeCollectorHandler
+    from mktxp.collector.base_collector import BaseCollector
+    from mktxp.cli.config.config import MKTXPConfigKeys
+
+    fake_cfg = MagicMock()
+    fake_cfg.system_entry = _system_entry_stub(mci=0)
+    fake_cfg.system_entry.max_worker_threads = 2
+    fake_cfg.system_entry.total_max_scrape_duration = 5
+    monkeypatch.setattr(ch_mod, 'config_handler', fake_cfg)
+
+    def probe_entries(hostname, ready):
+        entry = MagicMock()
+        entry.is_ready.return_value = ready
+        entry.time_spent = {'mock_collector': 0}
+        entry.router_id = {MKTXPConfigKeys.ROUTERBOARD_NAME: 'module', MKTXPConfigKeys.ROUTERBOARD_ADDRESS: hostname}
+        return types.SimpleNamespace(module_name = 'module', config_entry = types.SimpleNamespace(hostname = hostname), router_entries = [entry])
+
+    registry = MagicMock()
+    registry.refresh_interval.return_value = 0
+    registry.registered_collectors = {'mock_collector': lambda entry: [BaseCollector.gauge_collector('up', 'Up', [dict(entry.router_id, up = 1)], 'up')]}
+
+    handler = BatchProbeCollectorHandler([probe_entries('cpe1', True), probe_entries('cpe2', False)], registry)
+    families = {family.name: family for family in handler.collect()}
+
+    assert families['mktxp_up'].rows == [(('module', 'cpe1'), 1)]
+    assert families['mktxp_probe_success'].rows == [(('module', 'cpe1'), 1), (('module', 'cpe2'), 0)]
+    assert [label_values for label_values, _ in families['mktxp_probe_duration_seconds'].rows] == [('module', 'cpe1'), ('module', 'cpe2')]
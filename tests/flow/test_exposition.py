@@ -0,0 +1,152 @@
+# coding=utf8
+## Copyright (c) 2020 Arseniy Kuznetsov
+##
+## This program is free software; you can redistribute it and/or
+## modify it under the terms of the GNU General Public License
+## as published by the Free Software Foundation; either version 2
+## of the License, or (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+
+import gzip
+from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+from mktxp.cli.config.config import MKTXPConfigKeys
+from mktxp.collector.base_collector import BaseCollector
+from mktxp.flow.processor.exposition import ExpositionEncoder, ExpositionApp, CachedExpositionApp
+
+
+class FamiliesCollector:
+    def __init__(self, families):
+        self.families = families
+
+    def collect(self):
+        return iter(self.families)
+
+
+def _registry():
+    records = [{'name': 'ether1', 'comment': 'up "link"\\1\nnext', 'rx_byte': '100', 'running': '1',
+                MKTXPConfigKeys.ROUTERBOARD_NAME: 'router1', MKTXPConfigKeys.ROUTERBOARD_ADDRESS: '192.168.1.1',
+                MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID: {'dc': 'london'}},
+               {'name': 'ether2', 'rx_byte': '1e21', 'running': '0',
+                MKTXPConfigKeys.ROUTERBOARD_NAME: 'router1', MKTXPConfigKeys.ROUTERBOARD_ADDRESS: '192.168.1.1',
+                MKTXPConfigKeys.CUSTOM_LABELS_METADATA_ID: {'dc': 'london'}}]
+    plain_gauge = GaugeMetricFamily('mktxp_plain', 'Plain\\gauge', labels = ['b', 'a'])
+    plain_gauge.add_metric(['2', '1'], 3.5)
+    plain_counter = CounterMetricFamily('mktxp_plain_counter', 'Plain counter', value = 7, created = 1700000000)
+
+    registry = CollectorRegistry()
+    registry.register(FamiliesCollector([
+        BaseCollector.counter_collector('interface_rx_byte', 'Number of received bytes', records, 'rx_byte', ['name']),
+        BaseCollector.gauge_collector('interface_running', 'Running status', records, 'running', ['name']),
+        BaseCollector.info_collector('interface_comment', 'The interface comment', records, ['name', 'comment']),
+        BaseCollector.gauge_collector('empty', 'No records', [], 'value'),
+        plain_gauge,
+        plain_counter,
+    ]))
+    return registry
+
+
+def test_encoder_matches_prometheus_client_output():
+    registry = _registry()
+    assert ExpositionEncoder().encode(registry.collect()) == generate_latest(registry)
+
+    # cached label pairs give the same output
+    encoder = ExpositionEncoder()
+    encoder.encode(registry.collect())
+    assert encoder.encode(registry.collect()) == generate_latest(registry)
+
+
+def test_exposition_app_gzip():
+    registry = _registry()
+    app = ExpositionApp(registry)
+    captured = []
+
+    def start_response(status, headers):
+        captured.append((status, dict(headers)))
+
+    body = b''.join(app({'HTTP_ACCEPT_ENCODING': 'gzip, deflate'}, start_response))
+    status, headers = captured[0]
+    assert status == '200 OK'
+    assert headers['Content-Encoding'] == 'gzip'
+    assert headers['Content-Length'] == str(len(body))
+    assert gzip.decompress(body) == generate_latest(registry)
+
+
+class StubCollectorHandler(FamiliesCollector):
+    def __init__(self, families):
+        super().__init__(families)
+        self.served_generation = 1
+
+
+class ScrapesCollector:
+    def __init__(self):
+        self.scrapes = 0
+
+    def collect(self):
+        self.scrapes += 1
+        yield GaugeMetricFamily('process_scrapes', 'Stands in for the process / gc collectors', value = self.scrapes)
+
+
+def test_cached_exposition_app_encodes_once_per_generation():
+    registry = _registry()
+    collector_handler = StubCollectorHandler(list(registry.collect()))
+    registry = CollectorRegistry()
+    registry.register(collector_handler)
+    encoded = []
+    def encode(metric_families):
+        encoded.append(metric_families)
+        return CachedExpositionApp.prometheus_client_encode(metric_families)
+    app = CachedExpositionApp(registry, collector_handler, encode)
+
+    def scrape(accept_encoding = None):
+        captured = []
+        environ = {'HTTP_ACCEPT_ENCODING': accept_encoding} if accept_encoding else {}
+        body = b''.join(app(environ, lambda status, headers: captured.append(dict(headers))))
+        return captured[0], body
+
+    headers, body = scrape('gzip')
+    assert headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(body) == generate_latest(registry)
+    headers, body = scrape('gzip;q=0, identity')
+    assert 'Content-Encoding' not in headers
+    assert body == generate_latest(registry)
+    assert len(encoded) == 1
+
+    # a new metrics snapshot is encoded again, an uncached one (None) every time
+    collector_handler.served_generation = 2
+    scrape('gzip')
+    collector_handler.served_generation = None
+    scrape()
+    scrape()
+    assert len(encoded) == 4
+
+
+def test_cached_exposition_app_keeps_other_collectors_fresh():
+    collector_handler = StubCollectorHandler(list(_registry().collect()))
+    scrapes_collector = ScrapesCollector()
+    registry = CollectorRegistry()
+    registry.register(scrapes_collector)
+    registry.register(collector_handler)
+    app = CachedExpositionApp(registry, collector_handler)
+
+    def scrape(accept_encoding = None):
+        environ = {'HTTP_ACCEPT_ENCODING': accept_encoding} if accept_encoding else {}
+        return b''.join(app(environ, lambda status, headers: None))
+
+    assert b'process_scrapes 1.0' in scrape()
+    # the gzip members of the fresh and the cached output decompress as one body
+    assert gzip.decompress(scrape('gzip')) == generate_latest(registry).replace(b'process_scrapes 3.0', b'process_scrapes 2.0')
+    assert b'process_scrapes 4.0' in scrape()
+
+
+def test_content_encoding_negotiation():
+    bodies = {'identity': b'', 'gzip': b'', 'zstd': b''}
+    assert CachedExpositionApp.content_encoding('gzip, deflate, br, zstd', bodies) == 'zstd'
+    assert CachedExpositionApp.content_encoding('gzip, deflate, br, zstd', {'identity': b'', 'gzip': b''}) == 'gzip'
+    assert CachedExpositionApp.content_encoding('zstd;q=0, gzip;q=0.5', bodies) == 'gzip'
+    assert CachedExpositionApp.content_encoding('*', bodies) == 'zstd'
+    assert CachedExpositionApp.content_encoding('', bodies) == 'identity'
@@ -71,3 +71,23 @@ def test_probe_connection_pool_eviction_disconnects_oldest():
     assert conn1 is not conn2
     assert conn1.disconnected is True
     assert conn2.disconnected is False
+
+
+def test_probe_connection_pool_keeps_router_entries_with_connections():
+    created = []
+
+    def entry_factory(conn):
+        entry = types.SimpleNamespace(api_connection = conn)
+        created.append(entry)
+        return entry
+
+    pool = ProbeConnectionPool(max_size=1, ttl_seconds=300, connection_factory=lambda module, config_entry: DummyConn(config_entry.hostname))
+    entry1 = pool.router_entry('module', _config_entry('host1'), entry_factory)
+    assert pool.router_entry('module', _config_entry('host1'), entry_factory) is entry1
+
+    # evicted together with the connection
+    entry2 = pool.router_entry('module', _config_entry('host2'), entry_factory)
+    assert entry1.api_connection.disconnected is True
+    assert pool.router_entry('module', _config_entry('host1'), entry_factory) is not entry1
+    assert len(created) == 3
+    assert entry2.api_connection.disconnected is True
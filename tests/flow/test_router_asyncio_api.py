@@ -0,0 +1,111 @@
+# coding=utf8
+## Copyright (c) 2020 Arseniy Kuznetsov
+##
+## This program is free software; you can redistribute it and/or
+## modify it under the terms of the GNU General Public License
+## as published by the Free Software Foundation; either version 2
+## of the License, or (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+
+import asyncio
+import pytest
+from routeros_api import exceptions
+from routeros_api.base_api import encode_length
+# monkey patch via importing the module
+import mktxp.flow.router_connection
+from mktxp.flow.router_asyncio_api import AsyncioEventLoopThread, AsyncioRouterOsApiPool, AsyncRouterOsProtocol
+
+
+class FakeRouterOS:
+    ''' Minimal in-process RouterOS API endpoint, answers in reverse order to exercise tag demultiplexing '''
+    def __init__(self):
+        self.commands = []
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer):
+        protocol = AsyncRouterOsProtocol.__new__(AsyncRouterOsProtocol)
+        protocol.reader = reader
+        queued = []
+        try:
+            while True:
+                words = await protocol._read_sentence(None)
+                self.commands.append(words)
+                tag = next(word for word in words if word.startswith(b'.tag='))
+                if words[0] == b'/login':
+                    self._send(writer, [b'!done', tag])
+                    continue
+                queued.append((words, tag))
+                if len(queued) == 2 or words[0] == b'/system/identity/print':
+                    for words, tag in reversed(queued):
+                        for sentence in self._answer(words, tag):
+                            self._send(writer, sentence)
+                    queued.clear()
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    @staticmethod
+    def _answer(words, tag):
+        if words[0] == b'/interface/print':
+            return [[b'!re', b'=.id=*1', b'=name=ether1', tag],
+                    [b'!re', b'=.id=*2', b'=name=J\xf6rgensen', tag],
+                    [b'!done', tag]]
+        if words[0] == b'/ip/firewall/connection/print':
+            return [[b'!done', b'=ret=42', tag]]
+        return [[b'!trap', b'=message=no such command', tag], [b'!done', tag]]
+
+    @staticmethod
+    def _send(writer, words):
+        writer.write(b''.join(encode_length(len(word)) + word for word in words + [b'']))
+
+
+@pytest.fixture
+def fake_router():
+    router = FakeRouterOS()
+    port = AsyncioEventLoopThread.run(router.start())
+    yield router, port
+    AsyncioEventLoopThread.loop().call_soon_threadsafe(router.server.close)
+
+
+def test_asyncio_transport_pipelines_and_decodes_responses(fake_router):
+    router, port = fake_router
+    pool = AsyncioRouterOsApiPool('127.0.0.1', username = 'user', password = 'pass', port = port, plaintext_login = True)
+    api = pool.get_api()
+    assert pool.connected
+    assert router.commands[0][:3] == [b'/login', b'=name=user', b'=password=pass']
+
+    interfaces = api.get_resource('/interface').call_async('print')
+    count = api.get_resource('/ip/firewall/connection').call_async('print', {'count-only': ''})
+
+    assert count.get().done_message == {'ret': '42'}
+    assert list(interfaces) == [{'id': '*1', 'name': 'ether1'}, {'id': '*2', 'name': 'Jörgensen'}]
+    assert router.commands[2][:2] == [b'/ip/firewall/connection/print', b'=count-only']
+
+    with pytest.raises(exceptions.RouterOsApiCommunicationError):
+        api.get_resource('/system/identity').get()
+
+    # streamed responses raise the command error once the records are consumed
+    interfaces = api.get_resource('/interface').call_async('print')
+    identity = api.get_resource('/system/identity').call_async('print')
+    with pytest.raises(exceptions.RouterOsApiCommunicationError):
+        list(identity)
+    assert [row['name'] for row in interfaces] == ['ether1', 'Jörgensen']
+
+    pool.disconnect()
+    assert not pool.connected
+
+
+def test_asyncio_transport_connection_refused():
+    pool = AsyncioRouterOsApiPool('127.0.0.1', port = 1)
+    pool.socket_timeout = 2
+    with pytest.raises(exceptions.RouterOsApiConnectionError):
+        pool.get_api()
+    assert not pool.connected
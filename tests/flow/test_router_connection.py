@@ -133,3 +133,122 @@ def test_routeros_api_receive_monkey_patch():
 
     # Verify the tag was cleaned from the buffer despite the exception
     assert tag not in communicator.response_buffor
+
+
+def test_routeros_api_response_iterator_monkey_patch():
+    # Test that iterating a response hands over the rows without keeping them buffered
+    import routeros_api.api_communicator.base
+
+    class DummyBase:
+        pass
+
+    communicator = routeros_api.api_communicator.base.ApiCommunicatorBase(DummyBase())
+    tag = b'7'
+    response = routeros_api.api_communicator.base.AsynchronousResponse(command = b'/ip/firewall/connection/print')
+    communicator.response_buffor[tag] = response
+
+    sentences = iter([{b'src-address': b'10.0.0.1'}, {b'src-address': b'10.0.0.2'}, None])
+    def process_single_response():
+        sentence = next(sentences)
+        if sentence is None:
+            response.done = True
+        else:
+            response.append(sentence)
+    communicator.process_single_response = process_single_response
+
+    buffered = []
+    for row in communicator.receive_iterator(tag):
+        buffered.append(len(response))
+        assert row[b'src-address'].startswith(b'10.0.0.')
+
+    assert buffered == [0, 0]
+    assert tag not in communicator.response_buffor
+
+
+def test_router_connection_pipelines_previous_collection_requests():
+    pool = MagicMock()
+    pool.connected = True
+
+    sent = []
+    class Resource:
+        def __init__(self, path):
+            self.path = path
+        def call_async(self, command, arguments = None, queries = None):
+            sent.append((self.path, command, arguments, queries))
+            promise = MagicMock()
+            if self.path == '/bad/':
+                promise.get.side_effect = Exception('no such command')
+            else:
+                promise.get.return_value = [{'path': self.path, 'args': arguments, 'queries': queries}]
+            return promise
+        def call(self, command, arguments = None, queries = None):
+            return self.call_async(command, arguments, queries).get()
+
+    api = MagicMock()
+    api.get_resource.side_effect = lambda path, structure = None: Resource(path if path.endswith('/') else path + '/')
+    pool.get_api.return_value = api
+
+    with patch('mktxp.flow.router_connection.RouterOsApiPool', return_value = pool):
+        connection = RouterAPIConnection('router-a', _config_entry(use_ssl = False))
+        connection._in_connect_timeout = lambda *_: False
+        connection.connect()
+
+    # first collection: nothing to prefetch, requests are recorded
+    connection.start_collection(prefetch = True)
+    connection.router_api().get_resource('/system/resource').get()
+    connection.router_api().get_resource('/ip/route').call('print', {'count-only': ''}, {'static': 'yes'})
+    with pytest.raises(Exception):
+        connection.router_api().get_resource('/bad').get()
+    connection.collection_done()
+    assert len(sent) == 3
+
+    # next collection: all three go out as one burst before any collector runs
+    sent.clear()
+    connection.start_collection(prefetch = True)
+    assert len(sent) == 3
+    records = connection.router_api().get_resource('/ip/route/').call('print', {'count-only': ''}, {'static': 'yes'})
+    assert records == [{'path': '/ip/route/', 'args': {'count-only': ''}, 'queries': {'static': 'yes'}}]
+    with pytest.raises(Exception, match = 'no such command'):
+        connection.router_api().get_resource('/bad').get()
+    assert len(sent) == 3
+
+    # a repeated request is coalesced, callers get their own copies of the records
+    records[0]['path'] = 'changed'
+    again = connection.router_api().get_resource('/ip/route/').call('print', {'count-only': ''}, {'static': 'yes'})
+    assert again[0]['path'] == '/ip/route/'
+    assert len(sent) == 3
+    connection.collection_done()
+
+    # /system/resource was not requested this time, so it drops out of the plan
+    sent.clear()
+    connection.start_collection(prefetch = True)
+    assert sorted(path for path, *_ in sent) == ['/bad/', '/ip/route/']
+    connection.collection_done()
+    assert connection.router_api() is api
+
+
+def test_router_connection_coalesces_identical_requests_within_collection():
+    pool = MagicMock()
+    pool.connected = True
+    api = MagicMock()
+    resource = MagicMock()
+    resource.path = '/system/package/'
+    resource.call.return_value = [{'name': 'routeros'}, {'name': 'wifi-qcom'}]
+    api.get_resource.return_value = resource
+    pool.get_api.return_value = api
+
+    with patch('mktxp.flow.router_connection.RouterOsApiPool', return_value = pool):
+        connection = RouterAPIConnection('router-a', _config_entry(use_ssl = False))
+        connection._in_connect_timeout = lambda *_: False
+        connection.connect()
+
+    connection.start_collection()
+    for _ in range(4):
+        assert connection.router_api().get_resource('/system/package').get(disabled = 'false')[1]['name'] == 'wifi-qcom'
+    connection.router_api().get_resource('/system/package').get()
+    assert resource.call.call_count == 2
+    connection.collection_done()
+
+    # outside of a collection scope, the plain api is handed out
+    connection.router_api().get_resource('/system/package').get(disabled = 'false')
+    assert resource.get.call_count == 1
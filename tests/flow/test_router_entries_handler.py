@@ -67,3 +67,29 @@ def test_module_only_entries_skipped_in_default_collection(monkeypatch):
 
     assert len(entries) == 1
     assert entries[0].router_name == 'regular_entry'
+
+
+@patch('mktxp.flow.router_entries_handler.config_handler')
+def test_child_entries_shared_by_name(mock_config_handler, monkeypatch):
+    monkeypatch.setattr(RouterEntriesHandler, '_shared_child_entries', {})
+    mock_config_handler.registered_entry.side_effect = lambda name: name != 'None'
+    access_points = []
+    for name in ('AP1', 'AP2'):
+        access_point = Mock(router_name = name)
+        access_point.config_entry.remote_dhcp_entry = 'CoreRouter'
+        access_point.config_entry.remote_capsman_entry = 'CoreRouter'
+        access_points.append(access_point)
+
+    with patch('mktxp.flow.router_entries_handler.RouterEntry', side_effect=lambda name: Mock(router_name = name)) as mock_router_entry_class:
+        for access_point in access_points:
+            RouterEntriesHandler._set_child_entries(access_point)
+        private_access_point = Mock(router_name = 'AP3')
+        private_access_point.config_entry.remote_dhcp_entry = 'CoreRouter'
+        private_access_point.config_entry.remote_capsman_entry = 'None'
+        RouterEntriesHandler._set_child_entries(private_access_point, shared = False)
+
+    # a single shared child entry for all references to the same entry
+    assert access_points[0].dhcp_entry is access_points[1].dhcp_entry
+    assert access_points[0].capsman_entry is access_points[0].dhcp_entry
+    assert private_access_point.dhcp_entry is not access_points[0].dhcp_entry
+    assert mock_router_entry_class.call_count == 2
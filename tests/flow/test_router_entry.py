@@ -84,12 +84,12 @@ def test_is_done_disconnects(router_entry, mock_api_connection):
     # Setup child entries to test their disconnection as well
     dhcp_connection = MagicMock(spec=RouterAPIConnection)
     capsman_connection = MagicMock(spec=RouterAPIConnection)
-    router_entry.dhcp_entry = MagicMock()
-    router_entry.dhcp_entry.api_connection = dhcp_connection
-    router_entry.capsman_entry = MagicMock()
-    router_entry.capsman_entry.api_connection = capsman_connection
+    with patch('mktxp.flow.router_entry.RouterAPIConnection', side_effect=[dhcp_connection, capsman_connection]):
+        router_entry.dhcp_entry = RouterEntry('test_router')
+        router_entry.capsman_entry = RouterEntry('test_router')
 
     # Act
+    router_entry.start_collection()
     router_entry.is_done()
 
     # Assert
@@ -108,13 +108,122 @@ def test_is_done_dhcp_cache(router_entry):
     """
     # Arrange
     router_entry.dhcp_records = [{'mac_address': '00:00:00:00:00:01', 'address': '1.1.1.1'}]
-    assert router_entry._dhcp_records != {}
+    assert len(router_entry.dhcp_leases) == 1
 
     # Act
     router_entry.is_done()
 
     # Assert
     if not router_entry.persistent_dhcp_cache:
-        assert router_entry._dhcp_records == {}
+        assert len(router_entry.dhcp_leases) == 0
     else:
-        assert router_entry._dhcp_records != {}
+        assert len(router_entry.dhcp_leases) == 1
+
+def test_wireless_type_is_not_cached_from_failed_fetches(router_entry):
+    from mktxp.flow.router_entry import RouterEntryWirelessType
+    with patch('mktxp.flow.router_entry.PackageMetricsDataSource.installed_packages', side_effect=[None, frozenset({'routeros'})]), \
+         patch('mktxp.flow.router_entry.SystemResourceMetricsDataSource.system_facts', side_effect=[None, {'version': '7.16 (stable)', 'board_name': 'hAP ax2'}]):
+        # no packages list
+        assert router_entry.wireless_type is None
+        # no OS version
+        assert router_entry.wireless_type is None
+        assert router_entry.wireless_type == RouterEntryWirelessType.WIFI
+        assert router_entry.wireless_type == RouterEntryWirelessType.WIFI
+
+def test_router_facts_survive_scrapes_until_reboot(router_entry):
+    with patch('mktxp.flow.router_entry.PackageMetricsDataSource.installed_packages',
+               return_value=frozenset({'routeros', 'wifi-qcom'})) as installed_packages:
+        from mktxp.flow.router_entry import RouterEntryWirelessType
+        assert router_entry.wireless_type == RouterEntryWirelessType.WIFI
+        assert router_entry.is_package_installed('wifi-qcom')
+        router_entry.is_done()
+        router_entry.observe_uptime(3600)
+        router_entry.observe_uptime(3700)
+        assert router_entry.wireless_type == RouterEntryWirelessType.WIFI
+        assert installed_packages.call_count == 1
+
+        # uptime going backwards means the router was rebooted
+        router_entry.collector_cache['PackageCollector'] = object()
+        router_entry.observe_uptime(60)
+        assert router_entry.collector_cache == {}
+        assert router_entry.is_package_installed('routeros')
+        assert installed_packages.call_count == 2
+
+def test_router_facts_failed_lookups_are_retried(router_entry):
+    with patch('mktxp.flow.router_entry.SystemResourceMetricsDataSource.system_facts',
+               side_effect=[None, {'version': '7.16 (stable)', 'board_name': 'hAP ax3'}]):
+        assert router_entry.os_version is None
+        assert router_entry.os_version == '7.16 (stable)'
+        assert router_entry.board_name == 'hAP ax3'
+
+def test_dhcp_leases_refresh_incrementally(router_entry, mock_api_connection):
+    from mktxp.datasource.dhcp_ds import DHCPMetricsDataSource
+    router_entry.dhcp_records = [{'id': '*1', 'mac_address': 'AA:00:00:00:00:01', 'address': '10.0.0.1'},
+                                 {'id': '*2', 'mac_address': 'AA:00:00:00:00:02', 'address': '10.0.0.2'}]
+    assert router_entry.dhcp_record('10.0.0.2')['mac_address'] == 'AA:00:00:00:00:02'
+
+    router_entry.start_collection()
+    assert router_entry.dhcp_records is None
+
+    mock_api_connection.stream.return_value = iter([{'id': '*1'}, {'id': '*3'}])
+    mock_api_connection.pipeline.return_value = [[{'id': '*3', 'mac-address': 'AA:00:00:00:00:03', 'address': '10.0.0.3', 'host-name': 'laptop'}]]
+    records = DHCPMetricsDataSource.metric_records(router_entry)
+
+    # only the new lease is fetched, the gone one is dropped
+    requests = mock_api_connection.pipeline.call_args[0][0]
+    assert [request.queries for request in requests] == [(('.id', '*3'),)]
+    assert sorted(record['id'] for record in records) == ['*1', '*3']
+    assert router_entry.dhcp_record('AA:00:00:00:00:02') is None
+    assert router_entry.dhcp_record('AA:00:00:00:00:03')['host_name'] == 'laptop'
+    assert router_entry.dhcp_records is records
+
+def test_shared_dhcp_leases_fetched_once_per_scrape(router_entry, mock_api_connection):
+    from mktxp.datasource.dhcp_ds import DHCPMetricsDataSource
+    dhcp_connection = MagicMock(spec=RouterAPIConnection)
+    with patch('mktxp.flow.router_entry.RouterAPIConnection', side_effect=[dhcp_connection, mock_api_connection]):
+        dhcp_entry = RouterEntry('test_router')
+        other_entry = RouterEntry('test_router')
+    other_entry.router_id = {'routerboard_name': 'other_router', 'routerboard_address': 'other_host'}
+    router_entry.dhcp_entry = other_entry.dhcp_entry = dhcp_entry
+
+    dhcp_connection.stream.side_effect = lambda *args, **kwargs: iter([{'.id': '*1', 'mac-address': 'AA:00:00:00:00:01', 'address': '10.0.0.1'}])
+    # both collections are of the same scrape
+    names = []
+    for entry in (router_entry, other_entry):
+        entry.start_collection(scrape_id = 1)
+        names.extend(record['routerboard_name'] for record in DHCPMetricsDataSource.metric_records(entry))
+        assert entry.dhcp_record('10.0.0.1')['mac_address'] == 'AA:00:00:00:00:01'
+        entry.is_done()
+
+    # one lease table fetch for both router entries, labelled per router entry
+    assert dhcp_connection.stream.call_count == 1
+    assert names == ['test_router', 'other_router']
+
+def test_shared_child_entry_scope_follows_the_scrape(router_entry, mock_api_connection):
+    dhcp_connection = MagicMock(spec=RouterAPIConnection)
+    with patch('mktxp.flow.router_entry.RouterAPIConnection', side_effect=[dhcp_connection, MagicMock(spec=RouterAPIConnection), MagicMock(spec=RouterAPIConnection)]):
+        dhcp_entry = RouterEntry('test_router')
+        router_entries = [router_entry, RouterEntry('test_router'), RouterEntry('test_router')]
+    for entry in router_entries:
+        entry.dhcp_entry = dhcp_entry
+
+    # a sequential scrape taking longer than minimal_collect_interval still refreshes the shared leases once
+    mock_config_handler = MagicMock()
+    mock_config_handler.system_entry.minimal_collect_interval = 0
+    mock_config_handler.system_entry.persistent_router_connection_pool = router_entry.persistent_pool
+    mock_config_handler.system_entry.persistent_dhcp_cache = router_entry.persistent_dhcp_cache
+    with patch('mktxp.flow.router_entry.config_handler', mock_config_handler):
+        for scrape_id in (1, 2):
+            for entry in router_entries:
+                entry.start_collection(scrape_id)
+                assert dhcp_entry.dhcp_leases.stale == (entry is router_entry)
+                dhcp_entry.dhcp_leases.stale = False
+                entry.is_done()
+                # the shared scope is closed with its last user, not held on to until the next scrape
+                assert dhcp_connection.collection_done.call_count == dhcp_connection.start_collection.call_count
+            assert dhcp_connection.start_collection.call_count == 3 * scrape_id
+
+        # collections outside of a scrape always start afresh
+        router_entry.start_collection()
+        assert dhcp_entry.dhcp_leases.stale
+        router_entry.is_done()